@@ -1,9 +1,16 @@
 import streamlit as st
 from utils.gemini_client import extract_key_info, generate_workflow, estimate_value, generate_lease_from_prompt
 from utils.visualize_workflow import render_workflow
+from utils.stage_memo import StageMemo, content_hash, memoized
 import os
 
+@st.cache_resource(show_spinner=False)
+def get_stage_memo():
+    """One bounded stage memo shared by every session in this server process."""
+    return StageMemo()
+
 st.set_page_config(page_title="CRE Orchestrator AI (Prompt Mode)", layout="centered")
+memo = get_stage_memo()
 st.title("🏢 CRE Orchestrator AI")
 st.markdown("Just describe your lease deal — and let AI create the agreement, extract key info, generate a workflow, and show the value.")
 
@@ -17,16 +24,19 @@ if not user_prompt:
     default_file_path = os.path.join("utils", "rentalagreement.txt")
     with open(default_file_path, "r") as file:
         lease_text = file.read()
+    doc_key = content_hash(lease_text)
+    # After "Re-run analysis", skip the on-disk response cache once for this document
+    use_cache = st.session_state.pop("refresh_key", None) != doc_key
     st.subheader("📄 Default Lease Agreement")
     st.code(lease_text)
 
     with st.spinner("🔍 Extracting key info..."):
-        extracted_info = extract_key_info(lease_text)
+        extracted_info = memoized(memo, "extracted_info", doc_key, lambda: extract_key_info(lease_text, use_cache=use_cache))
     st.subheader("📌 Key Lease Info")
     st.code(extracted_info)
 
     with st.spinner("🔧 Generating workflow..."):
-        workflow = generate_workflow(extracted_info)
+        workflow = memoized(memo, "workflow", doc_key, lambda: generate_workflow(extracted_info, use_cache=use_cache))
     st.subheader("🛠️ Recommended Workflow")
     st.code(workflow)
 
@@ -34,24 +44,35 @@ if not user_prompt:
     render_workflow(workflow)
 
     with st.spinner("📈 Estimating value..."):
-        value = estimate_value(extracted_info, workflow)
+        value = memoized(memo, "value", doc_key, lambda: estimate_value(extracted_info, workflow, use_cache=use_cache))
     st.subheader("💡 Value Unlocked")
     st.success(value)
 
+    if st.button("🔄 Re-run analysis"):
+        memo.invalidate(doc_key)
+        st.session_state["refresh_key"] = doc_key
+        st.rerun()
+
 if user_prompt and st.button("Generate Lease + Workflow"):
+    st.session_state["generated_prompt"] = user_prompt
+
+# Keep showing the generated lease on later reruns (e.g. after "Re-run analysis") until the prompt changes
+if user_prompt and st.session_state.get("generated_prompt") == user_prompt:
+    doc_key = content_hash(user_prompt)
+    use_cache = st.session_state.pop("refresh_key", None) != doc_key
     with st.spinner("✍️ Generating lease..."):
-        lease_text = generate_lease_from_prompt(user_prompt)
+        lease_text = memoized(memo, "lease", doc_key, lambda: generate_lease_from_prompt(user_prompt, use_cache=use_cache))
 
     st.subheader("📄 AI-Generated Lease Agreement")
     st.code(lease_text)
 
     with st.spinner("🔍 Extracting key info..."):
-        extracted_info = extract_key_info(lease_text)
+        extracted_info = memoized(memo, "extracted_info", doc_key, lambda: extract_key_info(lease_text, use_cache=use_cache))
     st.subheader("📌 Key Lease Info")
     st.code(extracted_info)
 
     with st.spinner("🔧 Generating workflow..."):
-        workflow = generate_workflow(extracted_info)
+        workflow = memoized(memo, "workflow", doc_key, lambda: generate_workflow(extracted_info, use_cache=use_cache))
     st.subheader("🛠️ Recommended Workflow")
     st.code(workflow)
 
@@ -59,6 +80,11 @@ if user_prompt and st.button("Generate Lease + Workflow"):
     render_workflow(workflow)
 
     with st.spinner("📈 Estimating value..."):
-        value = estimate_value(extracted_info, workflow)
+        value = memoized(memo, "value", doc_key, lambda: estimate_value(extracted_info, workflow, use_cache=use_cache))
     st.subheader("💡 Value Unlocked")
     st.success(value)
+
+    if st.button("🔄 Re-run analysis", key="rerun_generated"):
+        memo.invalidate(doc_key)
+        st.session_state["refresh_key"] = doc_key
+        st.rerun()
@@ -1,80 +1,71 @@
+import asyncio
+import json
+import logging
 import os
-import requests
-from dotenv import load_dotenv
 
-# Load environment variables
-load_dotenv()
+# Share the pooled, retrying Gemini transport with the Streamlit app
+from utils.clause_index import relevant_text
+from utils.gemini_client import (
+    CHUNK_THRESHOLD_CHARS,
+    CLAUSE_BUDGET_CHARS,
+    STAGE_INPUT_BUDGET_CHARS,
+    extract_key_info_batch_async,
+    extract_with_fast_path,
+    fast_path_split,
+    gather_with_concurrency,
+    make_gemini_request,
+    merge_with_fast_path,
+    run_blocking,
+)
+from utils.incremental import MAX_CHANGED_FRACTION, changed_chars, diff_sections, fields_changed, get_revision_store, hash_sections
+from utils.metrics import log_event, span
+from utils.value_metrics import VALUE_CONFIG, VALUE_INSTRUCTIONS, VALUE_SCHEMA, format_value, normalize_value_metrics, parse_value
 
-# API configuration
-API_KEY = os.getenv("GEMINI_API_KEY")
-BASE_URL = "https://generativelanguage.googleapis.com/v1beta/models"
-MODEL_NAME = "gemini-2.0-flash"
+# Maximum number of documents whose stage chains run at once in the async batch path
+MAX_CONCURRENT_DOCUMENTS = int(os.getenv("CRE_MAX_CONCURRENT_DOCUMENTS", "8"))
 
-def make_gemini_request(prompt):
-    """
-    Make a request to the Gemini API with the given prompt.
-    
-    Args:
-        prompt (str): The prompt to send to the Gemini API
-        
-    Returns:
-        str: The text response from the Gemini API
-    """
-    url = f"{BASE_URL}/{MODEL_NAME}:generateContent?key={API_KEY}"
-    headers = {"Content-Type": "application/json"}
-    payload = {
-        "contents": [
-            {
-                "parts": [
-                    {"text": prompt}
-                ]
-            }
-        ]
-    }
-    
-    try:
-        response = requests.post(url, headers=headers, json=payload)
-        response.raise_for_status()  # Raise an exception for HTTP errors
-        return response.json()["candidates"][0]["content"]["parts"][0]["text"]
-    except Exception as e:
-        print(f"Error making request to Gemini API: {e}")
-        return f"Error: {str(e)}"
-
-def analyze_lease_document(document_text):
-    """
-    Analyze a lease document using a series of Gemini API calls that mimic an agent workflow.
-    
-    Args:
-        document_text (str): The raw text of the lease document
-        
-    Returns:
-        dict: A dictionary containing the extracted info, workflow, and value analysis
-    """
+# Text sections of an analysis result; "value_metrics" holds the value stage's numbers (None on failure)
+RESULT_TEXT_KEYS = ("extracted_info", "workflow", "value")
+
+# Lease Analyst checklist, keyed like utils.lease_fastpath.EXTRACTION_ITEMS
+LEASE_ANALYST_ITEMS = {
+    "address": "Property address",
+    "parties": "Parties involved (landlord and tenant)",
+    "term": "Lease term and important dates",
+    "rent": "Rent details and payment schedule",
+    "renewal_termination": "Renewal and termination clauses",
+    "deadlines": "Any key deadlines or milestones",
+}
+
+def _lease_analysis_prompt(document_text, items=tuple(LEASE_ANALYST_ITEMS)):
     # Step 1: Extract key information (Lease Analyst role)
-    lease_analysis_prompt = f"""
+    checklist = "\n".join(f"    - {LEASE_ANALYST_ITEMS[key]}" for key in items)
+    return f"""
     You are a Lease Analyst specializing in commercial real estate documents.
     
     Analyze this lease document and extract key information:
-    - Property address
-    - Parties involved (landlord and tenant)
-    - Lease term and important dates
-    - Rent details and payment schedule
-    - Renewal and termination clauses
-    - Any key deadlines or milestones
+{checklist}
     
     Format your response as a structured summary.
     
     Document: {document_text}
     """
-    
-    extracted_info = make_gemini_request(lease_analysis_prompt)
-    
+
+def _extract_parts(document_text, use_cache):
+    """Return (fast-path summary, checklist keys left to the LLM, LLM summary of those keys)."""
+    return extract_with_fast_path(document_text, _lease_analysis_prompt, use_cache=use_cache)
+
+def _extract_stage(document_text, use_cache):
+    local, missing, llm = _extract_parts(document_text, use_cache)
+    return merge_with_fast_path(local, llm) if missing else local
+
+def _workflow_prompt(extracted_info):
     # Step 2: Generate workflow recommendations (Workflow Architect role)
-    workflow_prompt = f"""
+    return f"""
     You are a Workflow Architect specializing in commercial real estate automation.
     
     Based on this lease information:
-    {extracted_info}
+    {relevant_text(extracted_info, ["workflow"], STAGE_INPUT_BUDGET_CHARS)}
     
     Design an automation workflow with 4-6 steps using tools like:
     - Salesforce
@@ -85,15 +76,14 @@ def analyze_lease_document(document_text):
     For each step, explain its purpose and how it helps automate the lease management process.
     Format as a numbered list with clear step titles and descriptions.
     """
-    
-    workflow = make_gemini_request(workflow_prompt)
-    
+
+def _value_prompt(extracted_info, workflow):
     # Step 3: Estimate business value (Value Analyst role)
-    value_prompt = f"""
+    return f"""
     You are a Value Analyst specializing in ROI of automation in commercial real estate.
     
     Based on the lease information:
-    {extracted_info}
+    {relevant_text(extracted_info, ["value"], STAGE_INPUT_BUDGET_CHARS)}
     
     And the proposed workflow:
     {workflow}
@@ -103,18 +93,326 @@ def analyze_lease_document(document_text):
     - Risk or errors avoided through automation
     - Which teams benefit most from this automation
     
-    Format your response as 3 bullet points.
+    {VALUE_INSTRUCTIONS}
+    """
+
+def _amendment_prompt(prior_info, changes, items):
+    # Incremental re-extraction: patch the previous summary with only the amended sections
+    checklist = "\n".join(f"    - {LEASE_ANALYST_ITEMS[key]}" for key in items)
+    amendments = "\n\n".join(
+        f"--- Change {i} ---\nPrevious text:\n{''.join(removed) or '(none - new section)'}\n\nNew text:\n{''.join(added) or '(section removed)'}"
+        for i, (removed, added) in enumerate(changes, 1)
+    )
+    return f"""
+    You are a Lease Analyst specializing in commercial real estate documents.
+    
+    This structured summary was extracted from the previous version of a lease:
+{checklist}
+    
+    Previous summary:
+    {prior_info}
+    
+    The lease has been amended. Only the sections below changed; the rest of the document is identical.
+    
+    {amendments}
+    
+    Return the complete updated summary in the same format. Copy every item the changes do not
+    affect exactly as it appears in the previous summary.
     """
+
+# Fused mode: one structured call that returns all three sections at once
+FUSED_EXTRACTED_FIELDS = [
+    ("property_address", "Property address"),
+    ("parties", "Parties involved"),
+    ("lease_term", "Lease term and dates"),
+    ("rent_details", "Rent details and payment schedule"),
+    ("renewal_termination", "Renewal and termination clauses"),
+    ("key_deadlines", "Key deadlines and milestones"),
+]
+def _string_object_schema(fields):
+    return {
+        "type": "OBJECT",
+        "properties": {key: {"type": "STRING"} for key, _ in fields},
+        "required": [key for key, _ in fields],
+    }
+
+FUSED_RESPONSE_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "extracted_info": _string_object_schema(FUSED_EXTRACTED_FIELDS),
+        "workflow": {
+            "type": "ARRAY",
+            "items": {
+                "type": "OBJECT",
+                "properties": {
+                    "title": {"type": "STRING"},
+                    "tool": {"type": "STRING"},
+                    "purpose": {"type": "STRING"},
+                },
+                "required": ["title", "tool", "purpose"],
+            },
+        },
+        "value": VALUE_SCHEMA,
+    },
+    "required": ["extracted_info", "workflow", "value"],
+}
+
+FUSED_GENERATION_CONFIG = {
+    "responseMimeType": "application/json",
+    "responseSchema": FUSED_RESPONSE_SCHEMA,
+}
+
+def _fused_prompt(document_text):
+    return f"""
+    You are a team of commercial real estate specialists: a Lease Analyst, a Workflow Architect and a Value Analyst.
     
-    value = make_gemini_request(value_prompt)
+    1. Extract key information from the lease document below: property address, parties (landlord and tenant),
+       lease term and important dates, rent details and payment schedule, renewal and termination clauses,
+       and any key deadlines or milestones.
+    2. Design a 4-6 step automation workflow for managing this lease using tools like Salesforce, DocuSign,
+       Google Drive and Slack. Give each step a short title, the tool it runs in, and its purpose.
+    3. Estimate the business value of that workflow: hours saved per year by automating manual tasks, a 0-10
+       score for the risk of costly errors it avoids, those risks in one sentence, and each team's share of the
+       benefit (weights summing to 1).
+    
+    Respond with a single JSON object matching the response schema.
+    
+    Document: {relevant_text(document_text, list(LEASE_ANALYST_ITEMS), CLAUSE_BUDGET_CHARS)}
+    """
+
+def _validate_fused(data):
+    """Raise ValueError unless `data` matches FUSED_RESPONSE_SCHEMA."""
+    if not isinstance(data, dict):
+        raise ValueError("fused response is not an object")
+    block = data.get("extracted_info")
+    if not isinstance(block, dict):
+        raise ValueError("fused response is missing 'extracted_info'")
+    for key, _ in FUSED_EXTRACTED_FIELDS:
+        if not isinstance(block.get(key), str):
+            raise ValueError(f"fused response field 'extracted_info.{key}' is not a string")
+    # Also brings the numbers into range
+    data["value"] = normalize_value_metrics(data.get("value"))
+    steps = data.get("workflow")
+    if not isinstance(steps, list) or not steps:
+        raise ValueError("fused response has no workflow steps")
+    for step in steps:
+        if not isinstance(step, dict) or not all(isinstance(step.get(k), str) for k in ("title", "tool", "purpose")):
+            raise ValueError("fused response has a malformed workflow step")
+
+def _format_fused(data):
+    """Render a validated fused response into the same text fields the three-step chain returns."""
+    extracted_info = "\n".join(f"- {label}: {data['extracted_info'][key]}" for key, label in FUSED_EXTRACTED_FIELDS)
+    # Numbered "N. Title" lines keep the workflow parseable by utils.visualize_workflow
+    workflow = "\n".join(
+        f"{i}. {step['title']} ({step['tool']}) - {step['purpose']}" for i, step in enumerate(data["workflow"], 1)
+    )
+    return {
+        "extracted_info": extracted_info,
+        "workflow": workflow,
+        "value": format_value(data["value"]),
+        "value_metrics": data["value"]
+    }
+
+def _parse_fused(response_text):
+    """Return the formatted fused result, or None if the response fails schema validation."""
+    if response_text.startswith("Error:"):
+        return None
+    try:
+        data = json.loads(response_text)
+        _validate_fused(data)
+    except ValueError as e:
+        log_event("stage.fused.invalid", level=logging.WARNING, error=str(e))
+        return None
+    return _format_fused(data)
+
+def analysis_failed(result):
+    """Whether any stage of an analysis result is an "Error: ..." string."""
+    return any(result[key].startswith("Error:") for key in RESULT_TEXT_KEYS)
+
+def _value_stage(extracted_info, workflow, use_cache):
+    """Run the value stage; returns (value text, metrics or None)."""
+    with span("stage.value") as record:
+        response_text = make_gemini_request(_value_prompt(extracted_info, workflow), VALUE_CONFIG, use_cache=use_cache)
+        value, value_metrics = parse_value(response_text)
+        record["structured"] = value_metrics is not None
+    return value, value_metrics
+
+def _fused_stage(document_text, use_cache):
+    """Run the fused call; returns its formatted result, or None for long documents and invalid responses."""
+    if len(document_text) > CHUNK_THRESHOLD_CHARS:
+        return None
+    with span("stage.fused") as record:
+        result = _parse_fused(make_gemini_request(_fused_prompt(document_text), FUSED_GENERATION_CONFIG, use_cache=use_cache))
+        record["valid"] = result is not None
+    return result
+
+def analyze_lease_document(document_text, use_cache=True, fused=False):
+    """
+    Analyze a lease document using a series of Gemini API calls that mimic an agent workflow.
+    
+    Identical documents are served from the shared on-disk response cache, so
+    re-analyzing an unchanged lease makes no API round-trips.
+    
+    Args:
+        document_text (str): The raw text of the lease document
+        use_cache (bool): Read and populate the response cache for each stage
+        fused (bool): Ask for all three sections in one schema-validated JSON call,
+            falling back to the three-step chain only if validation fails.
+            Documents above CHUNK_THRESHOLD_CHARS always use the chunked chain.
+        
+    Returns:
+        dict: A dictionary containing the extracted info, workflow, and value analysis
+            texts, plus the value stage's numbers as "value_metrics" (see utils.value_metrics)
+    """
+    result = _fused_stage(document_text, use_cache) if fused else None
+    if result is not None:
+        return result
+    
+    with span("stage.extract", input_chars=len(document_text)):
+        extracted_info = _extract_stage(document_text, use_cache)
+    return _workflow_and_value(extracted_info, use_cache)
+
+def failed_result(error):
+    """An analysis result whose every stage reports `error`, so analysis_failed() sees it."""
+    return dict({key: error for key in RESULT_TEXT_KEYS}, value_metrics=None)
+
+def _workflow_and_value(extracted_info, use_cache):
+    """Run the workflow and value stages on an extraction; returns the analysis result."""
+    if extracted_info.startswith("Error:"):
+        # A failed extraction is not worth two more calls built on its error text
+        return failed_result(extracted_info)
+    with span("stage.workflow"):
+        workflow = make_gemini_request(_workflow_prompt(extracted_info), use_cache=use_cache)
+    value, value_metrics = _value_stage(extracted_info, workflow, use_cache)
     
     # Return results in the same format as the agent-based approach
     return {
         "extracted_info": extracted_info,
         "workflow": workflow,
-        "value": value
+        "value": value,
+        "value_metrics": value_metrics
     }
 
+async def analyze_lease_document_async(document_text, use_cache=True, fused=False):
+    """
+    Async version of analyze_lease_document.
+    
+    The three stages stay sequential for one document (on a client worker
+    thread), but many documents' chains can be awaited concurrently on the same event loop.
+    """
+    return await run_blocking(analyze_lease_document, document_text, use_cache=use_cache, fused=fused)
+
+def analyze_lease_revision(lease_id, document_text, use_cache=True, store=None, fused=False):
+    """
+    Analyze a new version of a lease, redoing only the work its amendments require.
+    
+    The section hashes and results of the last analyzed version of `lease_id` are
+    kept in a RevisionStore. Unchanged sections are never sent again: only the
+    amended ones go to the LLM together with the previous summary, and the
+    workflow and value stages only re-run when the extracted fields changed.
+    A first version, or one where more than MAX_CHANGED_FRACTION of the text
+    changed, gets a full analysis.
+    
+    Args:
+        lease_id (str): Stable identifier of the lease across versions (e.g. its file path)
+        document_text (str): The raw text of this version
+        use_cache (bool): Read and populate the response cache for each stage
+        store (RevisionStore, optional): Defaults to the process-wide store
+        fused (bool): Run full analyses as one fused call (see analyze_lease_document);
+            amendments to a fused summary are patched like any other
+        
+    Returns:
+        dict: The same extracted info, workflow and value dictionary as analyze_lease_document
+    """
+    store = store or get_revision_store()
+    prior = store.get(lease_id)
+    sections = hash_sections(document_text)
+    
+    with span("stage.incremental", input_chars=len(document_text)) as record:
+        changes = diff_sections(prior["sections"], sections) if prior else None
+        record["changed_sections"] = None if changes is None else sum(len(added) + len(removed) for removed, added in changes)
+        if prior and not changes:
+            record["mode"] = "unchanged"
+            return dict({key: prior[key] for key in RESULT_TEXT_KEYS}, value_metrics=prior.get("value_metrics"))
+        
+        local, missing = fast_path_split(document_text)
+        if prior and prior.get("fused"):
+            # A fused summary covers every checklist item without the fast path
+            local, missing = "", list(LEASE_ANALYST_ITEMS)
+        patchable = (
+            prior is not None
+            and missing == prior["missing"]
+            and changed_chars(changes) <= MAX_CHANGED_FRACTION * max(len(document_text), 1)
+        )
+        if not patchable and fused:
+            result = _fused_stage(document_text, use_cache)
+            if result is not None:
+                record["mode"] = "fused"
+                store.put(lease_id, dict(result, sections=sections, missing=list(LEASE_ANALYST_ITEMS), llm_info=result["extracted_info"], fused=True))
+                return result
+        with span("stage.extract", input_chars=len(document_text), incremental=patchable):
+            if not patchable:
+                local, missing, llm = _extract_parts(document_text, use_cache)
+            elif missing:
+                llm = make_gemini_request(_amendment_prompt(prior["llm_info"], changes, missing), use_cache=use_cache)
+            else:
+                llm = ""
+            extracted_info = merge_with_fast_path(local, llm) if missing else local
+        record["mode"] = "patched" if patchable else "full"
+        if extracted_info.startswith("Error:"):
+            return failed_result(extracted_info)
+        
+        record["fields_changed"] = prior is None or fields_changed(prior["extracted_info"], extracted_info)
+        if record["fields_changed"]:
+            with span("stage.workflow"):
+                workflow = make_gemini_request(_workflow_prompt(extracted_info), use_cache=use_cache)
+            value, value_metrics = _value_stage(extracted_info, workflow, use_cache)
+        else:
+            # The amendment did not touch anything the later stages read
+            workflow, value, value_metrics = prior["workflow"], prior["value"], prior.get("value_metrics")
+    
+    result = {"extracted_info": extracted_info, "workflow": workflow, "value": value, "value_metrics": value_metrics}
+    # Failed stages are not stored, so the next version is compared against the last good one
+    if not analysis_failed(result):
+        store.put(lease_id, dict(result, sections=sections, missing=missing, llm_info=llm, fused=patchable and bool(prior.get("fused"))))
+    return result
+
+async def analyze_lease_revision_async(lease_id, document_text, use_cache=True, store=None, fused=False):
+    """Async version of analyze_lease_revision"""
+    return await run_blocking(analyze_lease_revision, lease_id, document_text, use_cache=use_cache, store=store, fused=fused)
+
+async def analyze_lease_documents_async(documents, max_concurrency=MAX_CONCURRENT_DOCUMENTS, use_cache=True, fused=False, pack_tokens=0):
+    """
+    Analyze many lease documents concurrently on one event loop.
+    
+    Args:
+        documents (list[str]): Raw lease texts
+        max_concurrency (int): Maximum number of document chains in flight at once
+        use_cache (bool): Read and populate the response cache for each stage
+        fused (bool): Use the single-call fused analysis for each document
+        pack_tokens (int): If set (and not fused), extract short documents together in
+            packed requests of up to this many tokens (see extract_key_info_batch)
+            before running each document's workflow and value stages
+        
+    Returns:
+        list[dict]: One analyze_lease_document result per input, in input order
+    """
+    if pack_tokens and not fused:
+        with span("stage.extract", input_chars=sum(len(text) for text in documents), documents=len(documents)):
+            extracted = await extract_key_info_batch_async(documents, pack_tokens, use_cache=use_cache)
+        return await gather_with_concurrency(
+            [run_blocking(_workflow_and_value, extracted_info, use_cache) for extracted_info in extracted],
+            max_concurrency,
+        )
+    return await gather_with_concurrency(
+        [analyze_lease_document_async(text, use_cache=use_cache, fused=fused) for text in documents],
+        max_concurrency,
+    )
+
+def analyze_lease_documents(documents, max_concurrency=MAX_CONCURRENT_DOCUMENTS, use_cache=True, fused=False, pack_tokens=0):
+    """Blocking entry point for analyze_lease_documents_async"""
+    return asyncio.run(analyze_lease_documents_async(documents, max_concurrency, use_cache, fused, pack_tokens))
+
 if __name__ == "__main__":
     # Simple test for the analyze_lease_document function
     sample_text = "This is a sample lease agreement between Landlord A and Tenant B for property at 123 Main St."
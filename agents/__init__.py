@@ -1,4 +1,13 @@
-# Import agents to make them available at the package level
-from .lease_analyst import lease_analyst
-from .workflow_architect import workflow_architect
-from .value_analyst import value_analyst
\ No newline at end of file
+# Agents are created lazily (PEP 562): importing the package does not import crewai or
+# LangChain, and the shared LLM is only built when an agent is first accessed
+from .registry import AGENT_SPECS, build_agent, get_agent, get_llm
+
+
+def __getattr__(name):
+    if name in AGENT_SPECS:
+        return get_agent(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + list(AGENT_SPECS))
@@ -0,0 +1,35 @@
+from langchain_core.language_models.llms import LLM
+
+from utils.gemini_client import make_gemini_request
+
+# Gemini accepts at most this many stop sequences per request
+MAX_STOP_SEQUENCES = 5
+
+
+class GeminiLLM(LLM):
+    """
+    LangChain LLM that sends agent prompts through utils.gemini_client.
+
+    Agents built on it share everything the plain chain uses: the pooled
+    transport, rate limiter, metrics spans, in-flight coalescing and the
+    on-disk response cache, so a crew and the chain answer identical
+    prompts from the same cache entries.
+    """
+
+    # A pydantic field, so it needs the annotation
+    use_response_cache: bool = True
+
+    @property
+    def _llm_type(self):
+        return "cre-gemini"
+
+    def _call(self, prompt, stop=None, run_manager=None, **kwargs):
+        config = {"stopSequences": stop[:MAX_STOP_SEQUENCES]} if stop else None
+        text = make_gemini_request(prompt, config, use_cache=self.use_response_cache)
+        if text.startswith("Error:"):
+            # Fail the agent step instead of letting the agent reason over an error message
+            raise ValueError(text)
+        # Servers that ignore stopSequences (or sequences past the limit) are cut here
+        for sequence in stop or []:
+            text = text.split(sequence)[0]
+        return text
@@ -0,0 +1,109 @@
+import os
+import sys
+import threading
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Role, goal and backstory of every agent the crew path can use, keyed by agent name
+AGENT_SPECS = {
+    "lease_analyst": {
+        "role": "Lease Analyst",
+        "goal": "Understand and extract structured information from commercial lease documents",
+        "backstory": "You are a legal operations AI assistant trained on thousands of lease contracts.",
+    },
+    "workflow_architect": {
+        "role": "Workflow Architect",
+        "goal": "Design SaaS automation steps based on lease terms",
+        "backstory": "You help commercial real estate teams automate manual workflows with AI and integrations.",
+    },
+    "value_analyst": {
+        "role": "Value Analyst",
+        "goal": "Summarize value delivered by automating the lease workflow",
+        "backstory": "You focus on ROI, cost savings, and value articulation for AI transformations.",
+    },
+}
+
+_llm = None
+_agents = {}
+_lock = threading.RLock()
+
+
+def _build_llm():
+    # LangChain is only imported here, the first time an agent is actually needed
+    api_key_openai = os.getenv("OPENAI_API_KEY")
+    api_key_cohere = os.getenv("COHERE_API_KEY")
+    api_key_gemini = os.getenv("GEMINI_API_KEY")
+
+    # Choose LLM provider with fallback options
+    if api_key_openai:
+        from langchain.llms import OpenAI
+        return OpenAI(api_key=api_key_openai, temperature=0.2)
+    if api_key_cohere:
+        from langchain.llms import Cohere
+        return Cohere(api_key=api_key_cohere, temperature=0.2)
+    if api_key_gemini:
+        from langchain.llms import GooglePalm
+        return GooglePalm(api_key=api_key_gemini, temperature=0.2)
+    raise ValueError("No API key found for any supported LLM provider")
+
+
+def get_llm():
+    """Return the LLM shared by every agent, building it on first use."""
+    global _llm
+    if _llm is None:
+        with _lock:
+            if _llm is None:
+                _llm = _build_llm()
+    return _llm
+
+
+def build_agent(name, llm=None, verbose=True, **options):
+    """
+    Create a new, uncached crewAI Agent called `name`.
+    
+    Agents carry per-run executor state, so callers that run several crews
+    at once (crew_backend.py) build one set per crew instead of sharing get_agent's.
+    
+    Args:
+        name (str): One of AGENT_SPECS
+        llm (optional): LangChain LLM to bind; defaults to the shared get_llm()
+        verbose (bool): Log the agent's reasoning steps
+        **options: Further crewai.Agent fields (e.g. memory=False)
+    """
+    if name not in AGENT_SPECS:
+        raise KeyError(f"Unknown agent: {name}")
+    from crewai import Agent
+    return Agent(
+        **AGENT_SPECS[name],
+        verbose=verbose,
+        allow_delegation=False,
+        llm=llm or get_llm(),
+        **options
+    )
+
+
+def get_agent(name):
+    """
+    Return the crewAI Agent called `name`, creating it on first use.
+    
+    Args:
+        name (str): One of AGENT_SPECS, e.g. "lease_analyst"
+        
+    Returns:
+        crewai.Agent: The cached agent, bound to the shared LLM
+    """
+    if name not in AGENT_SPECS:
+        raise KeyError(f"Unknown agent: {name}")
+    agent = _agents.get(name)
+    if agent is None:
+        with _lock:
+            agent = _agents.get(name)
+            if agent is None:
+                agent = build_agent(name)
+                _agents[name] = agent
+    # Importing agents.<name> binds the submodule over the package attribute of the same
+    # name; point it back at the agent, as the eager package __init__ used to
+    setattr(sys.modules[__package__], name, agent)
+    return agent
@@ -1,8 +1,218 @@
 import streamlit as st
 from utils.extract_text import extract_text_from_pdf
-from utils.gemini_client import extract_key_info, generate_workflow, estimate_value, generate_lease_from_prompt
+from utils.gemini_client import extract_key_info, generate_workflow, estimate_value_metrics, generate_lease_from_prompt
 from utils.visualize_workflow import render_workflow
+from utils.stage_memo import StageMemo, content_hash, memoized, memoized_stream
+from utils.metrics import registry, span, summarize_spans
+from utils.lease_store import get_lease_store, next_quarter
+from utils.job_queue import get_job_queue
+from utils.portfolio import PortfolioMetrics
+from utils.value_metrics import MAX_RISK_SCORE, VALUE_TEAMS
+from agent_backend import RESULT_TEXT_KEYS, analysis_failed, analyze_lease_document
 import os
+import time
+
+# Seconds between reruns while a background analysis is in progress
+JOB_POLL_SECONDS = float(os.getenv("CRE_JOB_POLL_SECONDS", "0.5"))
+
+@st.cache_resource(show_spinner=False)
+def get_stage_memo():
+    """One bounded stage memo shared by every session in this server process."""
+    return StageMemo()
+
+def analysis_active(clicked, doc_key):
+    """
+    True when the button was just clicked, or when this document's results were
+    already on screen before a rerun caused by some other widget.
+    """
+    if clicked:
+        st.session_state["analysis_key"] = doc_key
+    return st.session_state.get("analysis_key") == doc_key
+
+def refresh_requested(doc_key):
+    """True once after 'Re-run analysis' for this document; the response cache is bypassed for that run."""
+    if st.session_state.get("refresh_key") == doc_key:
+        del st.session_state["refresh_key"]
+        return True
+    return False
+
+def rerun_control(doc_key):
+    """Explicit control to drop memoized results for this document and analyze it again."""
+    if st.button("🔄 Re-run analysis", help="Ignore cached results and call the AI again for this document."):
+        get_stage_memo().invalidate(doc_key)
+        st.session_state["refresh_key"] = doc_key
+        st.rerun()
+
+def render_timing_panel(spans):
+    """Collapsible per-step timing, token and byte breakdown for the analysis just shown."""
+    with st.expander("⏱️ Timing details"):
+        rows = [
+            {
+                "step": name,
+                "calls": entry["calls"],
+                "seconds": round(entry["seconds"], 3),
+                "cache hits": entry.get("cache_hits", 0),
+                "tokens": entry.get("total_tokens", 0),
+                "request bytes": entry.get("request_bytes", 0),
+                "response bytes": entry.get("response_bytes", 0),
+            }
+            for name, entry in summarize_spans(spans).items()
+        ]
+        if rows:
+            st.table(rows)
+        else:
+            st.caption("No timed steps in this run.")
+        counters = registry.snapshot()["counters"]
+        st.caption(
+            f"Server totals: {int(counters.get('gemini.request.calls', 0))} Gemini requests, "
+            f"{int(counters.get('cache.hits', 0))} cache hits, "
+            f"{int(counters.get('gemini.retries', 0))} retries, "
+            f"{int(counters.get('gemini.request.total_tokens', 0)):,} tokens"
+        )
+
+def job_key(doc_key, fused=False, hedge=False):
+    """Identity of an analysis in the job queue: equal keys (reruns, other users) share one job."""
+    return f"{doc_key}:{'fused' if fused else 'chain'}:{'hedge' if hedge else 'direct'}"
+
+def run_analysis(job, memo, lease_text, doc_key, fused=False, use_cache=True, hedge=False):
+    """
+    Worker-side analysis chain: runs on the job queue and never touches Streamlit.
+    
+    Each stage's chunks are recorded on the job as they arrive, so any rerun
+    of any session can render the partial results. Stage results are memoized
+    by the document's content hash, so later jobs for the same document finish
+    instantly. With fused=True all three sections come from one structured call.
+    With hedge=True each stage call is hedged by the LLM router and its result
+    arrives in one piece rather than streaming.
+    """
+    if fused:
+        with span("job.fused"):
+            results = memoized(
+                memo, "fused", doc_key,
+                lambda: analyze_lease_document(lease_text, use_cache=use_cache, fused=True)
+            )
+        for name in RESULT_TEXT_KEYS:
+            job.complete(name, results[name])
+        return results
+    
+    with span("stage.extract"):
+        extracted_info = job.stream("extracted_info", memoized_stream(
+            memo, "extracted_info", doc_key,
+            lambda: extract_key_info(lease_text, stream=True, use_cache=use_cache, hedge=hedge)
+        ))
+    with span("stage.workflow"):
+        workflow = job.stream("workflow", memoized_stream(
+            memo, "workflow", doc_key,
+            lambda: generate_workflow(extracted_info, stream=True, use_cache=use_cache, hedge=hedge)
+        ))
+    with span("stage.value"):
+        # Structured numbers arrive in one piece rather than streaming
+        value, value_metrics = memoized(
+            memo, "value", doc_key,
+            lambda: estimate_value_metrics(extracted_info, workflow, use_cache=use_cache, hedge=hedge)
+        )
+        job.complete("value", value)
+    return {"extracted_info": extracted_info, "workflow": workflow, "value": value, "value_metrics": value_metrics}
+
+def render_stage(stage, render=st.code):
+    """Show a job stage's text so far, or what it is waiting for."""
+    if stage is None:
+        st.caption("⏳ Waiting for the previous step...")
+    elif stage["text"]:
+        render(stage["text"])
+    else:
+        st.caption("⏳ Working...")
+
+def render_value_metrics(metrics):
+    """Headline numbers and team split of one lease's value estimate."""
+    cols = st.columns(2)
+    cols[0].metric("Hours saved per year", f"{metrics['hours_saved_per_year']:,.0f}")
+    cols[1].metric("Error risk avoided", f"{metrics['error_risk_score']:g} / {MAX_RISK_SCORE}")
+    st.bar_chart({"Share of benefit": {label: metrics["team_weights"][key] for key, label in VALUE_TEAMS}})
+
+def render_job_tabs(tabs, job):
+    """Render the key-info, workflow and value stages of a job into tabs 2-4 as they arrive."""
+    stages = job["stages"]
+    with tabs[1]:
+        st.subheader("📌 Key Lease Information")
+        st.info("The AI has extracted the most important information from the lease, including parties, dates, financial terms, and key clauses.")
+        render_stage(stages.get("extracted_info"))
+        
+    with tabs[2]:
+        st.subheader("🛠️ Recommended Automation Workflow")
+        st.info("""
+        This workflow shows how to automate the lease management process across multiple systems.
+        Each step represents an action in a specific system, with arrows showing the flow between systems.
+        """)
+        # Show the workflow text while it streams, then the diagram (text is in its expander)
+        workflow = stages.get("workflow")
+        if workflow and workflow["status"] == "done":
+            render_workflow(workflow["text"])
+        else:
+            render_stage(workflow)
+        
+    with tabs[3]:
+        st.subheader("💡 Business Value Assessment")
+        st.info("This analysis shows the estimated ROI from implementing the proposed automation workflow.")
+        render_stage(stages.get("value"), st.success)
+        metrics = (job["result"] or {}).get("value_metrics")
+        if metrics:
+            render_value_metrics(metrics)
+    
+    if job["status"] == "error":
+        st.error(f"Analysis failed: {job['error']}")
+
+def poll_job(job):
+    """While the job is still working, rerun the script shortly so new progress is rendered."""
+    if job["status"] in ("queued", "running"):
+        time.sleep(JOB_POLL_SECONDS)
+        st.rerun()
+
+def render_portfolio_query():
+    """Query the lease store filled by batch runs and uploads; no AI calls are made."""
+    store = get_lease_store()
+    total = store.count()
+    if not total:
+        st.info("The lease store is empty. Analyze leases with `python batch_analyze.py leases/ -o results.jsonl --db leases.db`, or upload a lease on the 'Upload existing lease' page.")
+        return
+    st.caption(f"{total} leases in the store.")
+    deadlines_tab, search_tab, value_tab = st.tabs(["📅 Upcoming deadlines", "🔎 Search leases", "💰 Value rollup"])
+    
+    with deadlines_tab:
+        kinds = {"Renewal notices": "renewal_notice", "Lease expirations": "expiration", "All deadlines": None}
+        kind = st.selectbox("Deadline type", list(kinds))
+        quarter_start, quarter_end = next_quarter()
+        dates = st.date_input("Due between", (quarter_start, quarter_end))
+        if len(dates) == 2:
+            rows = store.deadlines_between(dates[0], dates[1], kinds[kind])
+            st.write(f"{len(rows)} deadlines")
+            if rows:
+                st.dataframe(rows)
+    
+    with search_tab:
+        text = st.text_input("Address, landlord or tenant contains")
+        rent_cols = st.columns(2)
+        rent_min = rent_cols[0].number_input("Monthly rent from ($)", min_value=0.0, value=0.0, step=500.0)
+        rent_max = rent_cols[1].number_input("Monthly rent up to ($, 0 = no limit)", min_value=0.0, value=0.0, step=500.0)
+        rows = store.search(text=text or None, rent_min=rent_min or None, rent_max=rent_max or None)
+        st.write(f"{len(rows)} leases")
+        if rows:
+            st.dataframe(rows)
+    
+    with value_tab:
+        summary = PortfolioMetrics.from_store(store).summary()
+        if not summary["leases"]:
+            st.caption("No stored lease has value metrics yet.")
+        else:
+            cols = st.columns(3)
+            cols[0].metric("Hours saved per year", f"{summary['total_hours_saved_per_year']:,.0f}")
+            cols[1].metric("Median per lease", f"{summary['hours_percentiles']['p50']:,.0f} h")
+            cols[2].metric("High-risk leases", f"{summary['high_risk_leases']} / {summary['leases']}")
+            st.write("Hours saved by team")
+            st.bar_chart({"Hours saved per year": {team["team"]: team["hours_saved_per_year"] for team in summary["teams"]}})
+            st.dataframe(summary["teams"])
+            st.write("Highest-value leases")
+            st.dataframe(summary["top_leases"])
 
 # Configure page settings
 st.set_page_config(page_title="CRE Orchestrator AI", layout="wide")
@@ -31,7 +241,8 @@ with st.sidebar:
         "Choose your starting point:",
         ["Generate a new lease", 
          "Upload existing lease",
-         "Use sample lease"]
+         "Use sample lease",
+         "Query lease portfolio"]
     )
     
     # Explanation of the selected option
@@ -47,12 +258,26 @@ with st.sidebar:
         **Upload Existing Lease:** 
         Upload your PDF lease document and get AI analysis on key terms, recommended workflows, and value assessment.
         """)
+    elif option == "Query lease portfolio":
+        st.info("""
+        **Query Lease Portfolio:** 
+        Find upcoming renewal notices, expirations and rent ranges across every lease already analyzed, without calling the AI again.
+        """)
     else:
         st.info("""
         **Sample Lease:** 
         Use our pre-loaded sample lease to see how the analysis works without uploading your own document.
         """)
     
+    fused_mode = st.checkbox(
+        "Fast mode (single fused call)",
+        help="Extract key info, design the workflow and estimate value in one structured Gemini call instead of three."
+    )
+    hedge_mode = st.checkbox(
+        "Hedge slow requests",
+        help="If an AI call runs longer than usual (its backend's p95 latency), send a duplicate to the next-fastest backend and use whichever answers first. Results appear when complete instead of streaming."
+    )
+    
     st.markdown("---")
     st.markdown("### About")
     st.info("""
@@ -86,7 +311,25 @@ if option == "Generate a new lease":
     # Add explanation of what happens next
     st.caption("When you click 'Generate', the AI will create a full lease agreement based on your description, extract key information, design a workflow, and estimate value.")
     
-    if user_prompt and st.button("Generate Lease Agreement"):
+    clicked = st.button("Generate Lease Agreement") if user_prompt else False
+    doc_key = content_hash(user_prompt) if user_prompt else None
+    
+    if user_prompt and analysis_active(clicked, doc_key):
+        use_cache = not refresh_requested(doc_key)
+        memo = get_stage_memo()
+        
+        def generate_and_analyze(job):
+            with span("stage.lease"):
+                lease_text = job.stream("lease", memoized_stream(
+                    memo, "lease", doc_key,
+                    lambda: generate_lease_from_prompt(user_prompt, stream=True, use_cache=use_cache, hedge=hedge_mode)
+                ))
+            return run_analysis(job, memo, lease_text, doc_key, fused=fused_mode, use_cache=use_cache, hedge=hedge_mode)
+        
+        # The chain runs on the shared job queue; this script run only renders its progress
+        queue = get_job_queue()
+        job = queue.get(queue.submit(job_key(doc_key, fused_mode, hedge_mode), generate_and_analyze, replace=not use_cache))
+        
         # Create tabs with clearer labels
         tabs = st.tabs([
             "1️⃣ Lease Agreement", 
@@ -95,40 +338,15 @@ if option == "Generate a new lease":
             "4️⃣ Business Value"
         ])
         
-        with st.spinner("Processing your request..."):
-            # Generate lease
-            lease_text = generate_lease_from_prompt(user_prompt)
-            # Extract info
-            extracted_info = extract_key_info(lease_text)
-            # Generate workflow
-            workflow = generate_workflow(extracted_info)
-            # Estimate value
-            value = estimate_value(extracted_info, workflow)
-        
-        # Display results in tabs with better explanations
         with tabs[0]:
             st.subheader("📄 AI-Generated Lease Agreement")
             st.info("This is the complete lease agreement generated from your description. It includes all standard clauses and terms.")
-            st.code(lease_text)
-            
-        with tabs[1]:
-            st.subheader("📌 Key Lease Information")
-            st.info("The AI has extracted the most important information from the lease, including parties, dates, financial terms, and key clauses.")
-            st.code(extracted_info)
-            
-        with tabs[2]:
-            st.subheader("🛠️ Recommended Automation Workflow")
-            st.info("""
-            This workflow shows how to automate the lease management process across multiple systems. 
-            Each step represents an action in a specific system, with arrows showing the flow between systems.
-            """)
-            # Display only the workflow diagram (text is in expander)
-            render_workflow(workflow)
-            
-        with tabs[3]:
-            st.subheader("💡 Business Value Assessment")
-            st.info("This analysis shows the estimated ROI from implementing the proposed automation workflow.")
-            st.success(value)
+            render_stage(job["stages"].get("lease"))
+        
+        render_job_tabs(tabs, job)
+        render_timing_panel(job["spans"])
+        rerun_control(doc_key)
+        poll_job(job)
 
 # Path 2: Upload existing lease
 elif option == "Upload existing lease":
@@ -140,7 +358,28 @@ elif option == "Upload existing lease":
     # Add explanation of what happens next
     st.caption("When you click 'Analyze', the AI will extract text from your PDF, identify key information, design a workflow, and estimate value.")
     
-    if uploaded_file and st.button("Analyze Lease"):
+    clicked = st.button("Analyze Lease") if uploaded_file else False
+    doc_key = content_hash(uploaded_file.getvalue()) if uploaded_file else None
+    
+    if uploaded_file and analysis_active(clicked, doc_key):
+        use_cache = not refresh_requested(doc_key)
+        memo = get_stage_memo()
+        
+        with st.spinner("Extracting text from your document..."):
+            raw_text = memoized(memo, "raw_text", doc_key, lambda: extract_text_from_pdf(uploaded_file))
+        # Same-named uploads with different contents are different leases in the store
+        lease_name = f"{uploaded_file.name} [{doc_key[:8]}]"
+        
+        def analyze_and_store(job):
+            results = run_analysis(job, memo, raw_text, doc_key, fused=fused_mode, use_cache=use_cache, hedge=hedge_mode)
+            if not analysis_failed(results):
+                # Keep the structured fields for the portfolio query page
+                get_lease_store().upsert(lease_name, results, raw_text)
+            return results
+        
+        queue = get_job_queue()
+        job = queue.get(queue.submit(job_key(doc_key, fused_mode, hedge_mode), analyze_and_store, replace=not use_cache))
+        
         # Create tabs with clearer labels
         tabs = st.tabs([
             "1️⃣ Extracted Text", 
@@ -149,40 +388,21 @@ elif option == "Upload existing lease":
             "4️⃣ Business Value"
         ])
         
-        with st.spinner("Processing your document..."):
-            # Extract text
-            raw_text = extract_text_from_pdf(uploaded_file)
-            # Extract info
-            extracted_info = extract_key_info(raw_text)
-            # Generate workflow
-            workflow = generate_workflow(extracted_info)
-            # Estimate value
-            value = estimate_value(extracted_info, workflow)
-        
-        # Display results in tabs with better explanations
         with tabs[0]:
             st.subheader("📄 Extracted Lease Text")
             st.info("This is the raw text extracted from your PDF document. The AI uses this text for its analysis.")
             st.code(raw_text)
-            
-        with tabs[1]:
-            st.subheader("📌 Key Lease Information")
-            st.info("The AI has extracted the most important information from the lease, including parties, dates, financial terms, and key clauses.")
-            st.code(extracted_info)
-            
-        with tabs[2]:
-            st.subheader("🛠️ Recommended Automation Workflow")
-            st.info("""
-            This workflow shows how to automate the lease management process across multiple systems.
-            Each step represents an action in a specific system, with arrows showing the flow between systems.
-            """)
-            # Display only the workflow diagram (text is in expander)
-            render_workflow(workflow)
-            
-        with tabs[3]:
-            st.subheader("💡 Business Value Assessment")
-            st.info("This analysis shows the estimated ROI from implementing the proposed automation workflow.")
-            st.success(value)
+        
+        render_job_tabs(tabs, job)
+        render_timing_panel(job["spans"])
+        rerun_control(doc_key)
+        poll_job(job)
+
+# Path 4: Query the lease store
+elif option == "Query lease portfolio":
+    st.header("Query Lease Portfolio")
+    st.write("🗂️ Search the structured fields of previously analyzed leases.")
+    render_portfolio_query()
 
 # Path 3: Use sample lease
 else:
@@ -192,7 +412,22 @@ else:
     # Add explanation of what happens next
     st.caption("When you click 'Analyze', the AI will process our sample lease, extract key information, design a workflow, and estimate value.")
     
-    if st.button("Analyze Sample Lease"):
+    # Load sample lease
+    default_file_path = os.path.join("utils", "rentalagreement.txt")
+    with open(default_file_path, "r") as file:
+        raw_text = file.read()
+    doc_key = content_hash(raw_text)
+    
+    if analysis_active(st.button("Analyze Sample Lease"), doc_key):
+        use_cache = not refresh_requested(doc_key)
+        memo = get_stage_memo()
+        queue = get_job_queue()
+        job = queue.get(queue.submit(
+            job_key(doc_key, fused_mode, hedge_mode),
+            lambda job: run_analysis(job, memo, raw_text, doc_key, fused=fused_mode, use_cache=use_cache, hedge=hedge_mode),
+            replace=not use_cache,
+        ))
+        
         # Create tabs with clearer labels
         tabs = st.tabs([
             "1️⃣ Sample Lease", 
@@ -201,40 +436,12 @@ else:
             "4️⃣ Business Value"
         ])
         
-        with st.spinner("Processing sample document..."):
-            # Load sample lease
-            default_file_path = os.path.join("utils", "rentalagreement.txt")
-            with open(default_file_path, "r") as file:
-                raw_text = file.read()
-                
-            # Extract info
-            extracted_info = extract_key_info(raw_text)
-            # Generate workflow
-            workflow = generate_workflow(extracted_info)
-            # Estimate value
-            value = estimate_value(extracted_info, workflow)
-        
-        # Display results in tabs with better explanations
         with tabs[0]:
             st.subheader("📄 Sample Lease Agreement")
             st.info("This is our sample lease agreement used for demonstration purposes.")
             st.code(raw_text)
-            
-        with tabs[1]:
-            st.subheader("📌 Key Lease Information")
-            st.info("The AI has extracted the most important information from the lease, including parties, dates, financial terms, and key clauses.")
-            st.code(extracted_info)
-            
-        with tabs[2]:
-            st.subheader("🛠️ Recommended Automation Workflow")
-            st.info("""
-            This workflow shows how to automate the lease management process across multiple systems.
-            Each step represents an action in a specific system, with arrows showing the flow between systems.
-            """)
-            # Display only the workflow diagram (text is in expander)
-            render_workflow(workflow)
-            
-        with tabs[3]:
-            st.subheader("💡 Business Value Assessment")
-            st.info("This analysis shows the estimated ROI from implementing the proposed automation workflow.")
-            st.success(value)
+        
+        render_job_tabs(tabs, job)
+        render_timing_panel(job["spans"])
+        rerun_control(doc_key)
+        poll_job(job)
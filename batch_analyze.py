@@ -0,0 +1,316 @@
+"""
+Bulk portfolio analysis: run analyze_lease_document over a directory of leases.
+
+Usage:
+    python batch_analyze.py leases/ -o results.jsonl
+    python batch_analyze.py "portfolio/**/*.pdf" -o results.jsonl --concurrency 16 --workers 8
+
+One JSON record is appended to the output file per lease as soon as it
+finishes. The output file doubles as the checkpoint: re-running the same
+command skips every lease that already has a successful record, so a crash
+part-way through only redoes the leases that were in flight.
+
+With --incremental, a lease whose file changed since its last successful
+record is re-analyzed as an amendment: only changed sections are sent to
+the LLM, and the workflow/value stages re-run only if the extracted fields
+changed.
+
+With --db PATH, the structured fields of every successful lease are also
+bulk-inserted into the SQLite lease store (utils/lease_store.py) for
+indexed queries over rent, parties and deadlines.
+
+With --portfolio PATH, the value metrics of every successful record (hours
+saved per year, error-risk score, team weights) are rolled up with NumPy
+(utils/portfolio.py) into a JSON summary of totals, percentiles and
+per-team breakdowns.
+
+With --diagrams DIR, the workflow diagram of every successful record is
+pre-rendered (in parallel) to DIR as SVG, or HTML when Graphviz is missing.
+"""
+import argparse
+import asyncio
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from agent_backend import MAX_CONCURRENT_DOCUMENTS, analysis_failed, analyze_lease_document_async, analyze_lease_revision_async
+from utils import rate_limiter
+from utils.lease_store import LeaseStore, lease_row
+from utils.metrics import collect_spans, total_tokens
+from utils.portfolio import PortfolioMetrics
+from utils.stage_memo import content_hash
+
+SUPPORTED_EXTENSIONS = (".pdf", ".txt")
+# Successful leases are written to the --db store in transactions of this many rows
+DB_BATCH_SIZE = 50
+
+
+def discover_inputs(inputs):
+    """Expand directories and glob patterns into a sorted, de-duplicated list of lease files."""
+    paths = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            for root, _, files in os.walk(item):
+                for name in files:
+                    if name.lower().endswith(SUPPORTED_EXTENSIONS):
+                        paths.add(os.path.abspath(os.path.join(root, name)))
+        else:
+            for match in glob.glob(item, recursive=True):
+                if os.path.isfile(match) and match.lower().endswith(SUPPORTED_EXTENSIONS):
+                    paths.add(os.path.abspath(match))
+    return sorted(paths)
+
+
+def load_checkpoint(output_path):
+    """Return {input path: file hash} for every path with a successful record in the output file (latest record wins)."""
+    done = {}
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A torn final line from a crash; the lease is simply re-run
+                continue
+            if record.get("status") == "ok":
+                done[record["path"]] = record.get("file_hash")
+    return done
+
+
+def file_hash(path):
+    """SHA-256 of a lease file's bytes, so an amended file is told apart from the analyzed one."""
+    with open(path, "rb") as f:
+        return content_hash(f.read())
+
+
+def read_lease_text(path):
+    """Extract lease text from a PDF or plain-text file (runs inside the process pool)."""
+    if path.lower().endswith(".pdf"):
+        from utils.extract_text import extract_text_from_pdf
+        return extract_text_from_pdf(path)
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        return f.read()
+
+
+class ThroughputMeter:
+    """Tracks completed documents and API-reported tokens and reports per-minute rates."""
+
+    def __init__(self, total, report_every=10.0, stream=sys.stderr):
+        self.total = total
+        self.report_every = report_every
+        self.stream = stream
+        self.started = time.monotonic()
+        self.last_report = self.started
+        self.docs = 0
+        self.errors = 0
+        self.tokens = 0
+
+    def record(self, ok, tokens):
+        self.docs += 1
+        self.errors += 0 if ok else 1
+        self.tokens += tokens
+        now = time.monotonic()
+        if now - self.last_report >= self.report_every or self.docs == self.total:
+            self.last_report = now
+            self.report()
+
+    def rates(self):
+        minutes = max(time.monotonic() - self.started, 1e-9) / 60
+        return self.docs / minutes, self.tokens / minutes
+
+    def report(self):
+        docs_per_min, tokens_per_min = self.rates()
+        print(
+            f"[batch] {self.docs}/{self.total} leases ({self.errors} errors) | "
+            f"{docs_per_min:.1f} docs/min | {tokens_per_min:,.0f} tokens/min",
+            file=self.stream,
+            flush=True,
+        )
+
+
+async def _analyze_one(path, pool, semaphore, use_cache, fused, incremental=False, with_row=False):
+    loop = asyncio.get_running_loop()
+    started = time.monotonic()
+    record = {"path": path}
+    async with semaphore:
+        # Each lease runs in its own task context, so only its own Gemini spans are collected
+        with collect_spans() as spans:
+            try:
+                record["file_hash"] = await loop.run_in_executor(pool, file_hash, path)
+                text = await loop.run_in_executor(pool, read_lease_text, path)
+                if incremental:
+                    # The path identifies the lease across versions
+                    result = await analyze_lease_revision_async(path, text, use_cache=use_cache, fused=fused)
+                else:
+                    result = await analyze_lease_document_async(text, use_cache=use_cache, fused=fused)
+            except Exception as e:
+                record.update({"status": "error", "error": str(e)})
+                return record, total_tokens(spans), None
+    record.update(result)
+    # make_gemini_request reports failures as "Error: ..." strings; keep them retryable
+    failed = analysis_failed(result)
+    record["status"] = "error" if failed else "ok"
+    record["chars"] = len(text)
+    record["elapsed_s"] = round(time.monotonic() - started, 3)
+    # Token usage as reported by the API (usageMetadata); cache hits cost nothing
+    record["tokens"] = total_tokens(spans)
+    record["api_calls"] = sum(1 for s in spans if s["name"] == "gemini.request" and not s.get("cache_hit"))
+    # The store's structured columns are parsed from the lease text, which the JSONL record does not keep
+    row = lease_row(path, result, text) if with_row and not failed else None
+    return record, record["tokens"], row
+
+
+async def run_batch(paths, output_path, workers=None, concurrency=MAX_CONCURRENT_DOCUMENTS, use_cache=True, fused=False, incremental=False, store=None):
+    """
+    Analyze `paths` and append one JSONL record per lease to `output_path`.
+
+    Args:
+        paths (list[str]): Lease files still to be analyzed
+        output_path (str): JSONL file that receives (and checkpoints) the results
+        workers (int, optional): Processes used for PDF text extraction
+        concurrency (int): Maximum number of leases in flight at once
+        use_cache (bool): Read and populate the response cache for each stage
+        fused (bool): Use the single-call fused analysis instead of the three-step chain
+        incremental (bool): Re-analyze previously seen leases as amendments (see analyze_lease_revision)
+        store (LeaseStore, optional): Also bulk-insert successful leases into this store
+
+    Returns:
+        ThroughputMeter: Final counters for the run
+    """
+    meter = ThroughputMeter(len(paths))
+    semaphore = asyncio.Semaphore(concurrency)
+    with ProcessPoolExecutor(max_workers=workers) as pool, open(output_path, "a", encoding="utf-8") as out:
+        tasks = [asyncio.create_task(_analyze_one(path, pool, semaphore, use_cache, fused, incremental, store is not None)) for path in paths]
+        rows = []
+        try:
+            for finished in asyncio.as_completed(tasks):
+                record, tokens, row = await finished
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+                meter.record(record["status"] == "ok", tokens)
+                if row is not None:
+                    rows.append(row)
+                    if len(rows) >= DB_BATCH_SIZE:
+                        store.upsert_many(rows)
+                        rows = []
+        finally:
+            # Leases already checkpointed in the JSONL file must not be missing from the store
+            if rows:
+                store.upsert_many(rows)
+    return meter
+
+
+def _diagram_stem(path):
+    # Leases in different folders may share a file name
+    name = os.path.splitext(os.path.basename(path))[0]
+    return f"{name}-{content_hash(path)[:8]}"
+
+
+def write_diagrams(output_path, diagram_dir, workers=None):
+    """
+    Pre-render the workflow diagram of every successful record in `output_path`.
+
+    Diagrams that already exist in `diagram_dir` are skipped, so re-running a
+    resumed batch only renders the new leases.
+
+    Returns:
+        int: Number of diagrams written
+    """
+    # Imported here so plain batch runs do not pay for Streamlit/Graphviz imports
+    from utils.visualize_workflow import prerender_workflows
+
+    os.makedirs(diagram_dir, exist_ok=True)
+    existing = {os.path.splitext(name)[0] for name in os.listdir(diagram_dir)}
+    records = {}
+    if os.path.exists(output_path):
+        with open(output_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if record.get("status") == "ok" and _diagram_stem(record["path"]) not in existing:
+                    records[record["path"]] = record["workflow"]
+    paths = list(records)
+    diagrams = prerender_workflows([records[path] for path in paths], max_workers=workers)
+    for path, (kind, markup) in zip(paths, diagrams):
+        with open(os.path.join(diagram_dir, f"{_diagram_stem(path)}.{kind}"), "w", encoding="utf-8") as f:
+            f.write(markup)
+    return len(paths)
+
+
+def write_portfolio(output_path, portfolio_path):
+    """
+    Roll up the value metrics of every successful record in `output_path`
+    (the latest record per lease) and write the summary to `portfolio_path` as JSON.
+
+    Returns:
+        dict: The PortfolioMetrics summary
+    """
+    records = {}
+    if os.path.exists(output_path):
+        with open(output_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if record.get("status") == "ok":
+                    records[record["path"]] = record
+    summary = PortfolioMetrics.from_results(records.items()).summary()
+    with open(portfolio_path, "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analyze a portfolio of lease documents into a JSONL file.")
+    parser.add_argument("inputs", nargs="+", help="Directories or glob patterns of .pdf/.txt leases")
+    parser.add_argument("-o", "--output", required=True, help="JSONL output file (also used as the resume checkpoint)")
+    parser.add_argument("--workers", type=int, default=None, help="Processes for PDF text extraction (default: CPU count)")
+    parser.add_argument("--concurrency", type=int, default=MAX_CONCURRENT_DOCUMENTS, help="Leases analyzed concurrently")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the on-disk response cache")
+    parser.add_argument("--fused", action="store_true", help="Analyze each lease with one structured call instead of three")
+    parser.add_argument("--incremental", action="store_true", help="Re-analyze changed leases, sending only their amended sections")
+    parser.add_argument("--db", metavar="PATH", default=None, help="Also store structured lease fields in this SQLite lease store")
+    parser.add_argument("--rpm", type=float, default=None, help="Gemini requests/min quota to pace to (default: GEMINI_RPM)")
+    parser.add_argument("--tpm", type=float, default=None, help="Gemini tokens/min quota to pace to (default: GEMINI_TPM)")
+    parser.add_argument("--portfolio", metavar="PATH", default=None, help="Write a value rollup (hours saved, risk, teams) of all successful leases to PATH")
+    parser.add_argument("--diagrams", metavar="DIR", default=None, help="Pre-render workflow diagrams for successful leases into DIR")
+    args = parser.parse_args(argv)
+    if args.rpm is not None or args.tpm is not None:
+        # Quota pacing and AIMD concurrency are shared by every request in this process
+        rate_limiter.configure(rpm=args.rpm, tpm=args.tpm)
+
+    paths = discover_inputs(args.inputs)
+    done = load_checkpoint(args.output)
+    if args.incremental:
+        # A lease is done only if its file is unchanged since the last successful record
+        pending = [path for path in paths if path not in done or done[path] != file_hash(path)]
+    else:
+        pending = [path for path in paths if path not in done]
+    print(f"[batch] {len(paths)} leases found, {len(paths) - len(pending)} already done, {len(pending)} to analyze", file=sys.stderr)
+    errors = 0
+    if pending:
+        store = LeaseStore(args.db) if args.db else None
+        meter = asyncio.run(run_batch(pending, args.output, args.workers, args.concurrency, not args.no_cache, args.fused, args.incremental, store))
+        errors = meter.errors
+    if args.portfolio:
+        summary = write_portfolio(args.output, args.portfolio)
+        print(
+            f"[batch] portfolio of {summary['leases']} leases: {summary['total_hours_saved_per_year']:,.0f} hours saved/year, "
+            f"rollup written to {args.portfolio}",
+            file=sys.stderr,
+        )
+    if args.diagrams:
+        written = write_diagrams(args.output, args.diagrams, args.workers)
+        print(f"[batch] {written} workflow diagrams written to {args.diagrams}", file=sys.stderr)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,69 @@
+"""
+Measure cold import time of the app and its heavy dependencies.
+
+Usage:
+    python bench/import_time.py
+    python bench/import_time.py app agents agent_backend --top 15
+
+Each module is imported in a fresh interpreter with `python -X importtime`,
+so results are not skewed by modules already loaded in this process.
+Importing `app` executes the Streamlit script in bare mode, which is the
+same work `streamlit run app.py` does before the first page render.
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure(module):
+    """
+    Import `module` in a fresh interpreter and parse its -X importtime report.
+
+    Returns:
+        tuple: (total seconds for the module, list of (cumulative seconds, imported name))
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr.strip().splitlines()[-1]}")
+    entries = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|", 2)
+        entries.append((int(cumulative) / 1e6, name.rstrip()))
+    # -X importtime prints children before their parent; keep only the entries for `module`
+    end = max(i for i, (_, name) in enumerate(entries) if name == f" {module}")
+    start = end
+    while start > 0 and entries[start - 1][1].startswith("  "):
+        start -= 1
+    return entries[end][0], entries[start:end]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report cold import times.")
+    parser.add_argument("modules", nargs="*", default=["agents", "agent_backend", "app"])
+    parser.add_argument("--top", type=int, default=10, help="Slowest top-level imports to list per module")
+    args = parser.parse_args(argv)
+
+    for module in args.modules:
+        try:
+            total, entries = measure(module)
+        except RuntimeError as e:
+            print(e)
+            continue
+        print(f"{module}: {total:.3f}s")
+        # Only direct dependencies (one level of indentation) so nested imports are not double counted
+        direct = [(seconds, name.strip()) for seconds, name in entries if name.startswith("   ") and not name.startswith("    ")]
+        for seconds, name in sorted(direct, reverse=True)[:args.top]:
+            print(f"  {seconds:8.3f}s  {name}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,235 @@
+"""
+Local stand-in for the Gemini generateContent / streamGenerateContent API.
+
+Usage:
+    python bench/mock_gemini_server.py --port 8765 --latency-ms 400 --jitter-ms 150 --error-rate 0.02
+    GEMINI_BASE_URL=http://127.0.0.1:8765/v1beta/models streamlit run app.py
+
+Responses are deterministic for a given --seed: text answers are numbered
+workflow-style steps padded to --response-chars, and requests whose
+generationConfig carries a responseSchema get a JSON body that satisfies it.
+Every response includes usageMetadata so token accounting can be exercised.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WORDS = (
+    "lease tenant landlord rent renewal notice deadline escalation premises term "
+    "salesforce docusign drive slack email record signature reminder review approval"
+).split()
+STEP_TOOLS = ["Google Drive", "Salesforce", "DocuSign", "Slack", "Email", "Salesforce"]
+
+
+class MockSettings:
+    """Latency, failure and payload knobs shared by every request handler."""
+
+    def __init__(self, latency_ms=200.0, jitter_ms=50.0, error_rate=0.0, response_chars=1200, stream_chunks=8, seed=0, rpm_quota=0, max_concurrent=0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.response_chars = response_chars
+        self.stream_chunks = stream_chunks
+        self.seed = seed
+        self.rpm_quota = rpm_quota
+        self.max_concurrent = max_concurrent
+        self._window = deque()
+        self.in_flight = 0
+        self.throttled = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+
+    def admit(self):
+        """Apply the simulated quota: False means answer 429 (over requests/min or concurrent requests)."""
+        with self._lock:
+            now = time.monotonic()
+            while self._window and now - self._window[0] >= 60:
+                self._window.popleft()
+            if (self.rpm_quota and len(self._window) >= self.rpm_quota) or (self.max_concurrent and self.in_flight >= self.max_concurrent):
+                self.throttled += 1
+                return False
+            self._window.append(now)
+            self.in_flight += 1
+            return True
+
+    def done(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def draw(self):
+        """Return (delay seconds, fail?) for the next request from the seeded generator."""
+        with self._lock:
+            self.requests += 1
+            delay = max(0.0, self.latency_ms + self._random.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+            fail = self._random.random() < self.error_rate
+            if fail:
+                self.errors += 1
+            return delay, fail
+
+
+def _filler(rng, chars):
+    words = []
+    length = 0
+    while length < chars:
+        word = rng.choice(WORDS)
+        words.append(word)
+        length += len(word) + 1
+    return " ".join(words)[:chars]
+
+
+def make_text(prompt, chars):
+    """Numbered workflow steps (so diagrams have something to draw), padded to about `chars`."""
+    rng = random.Random(prompt)
+    lines = ["Proposed automation workflow for this lease:"]
+    per_step = max(20, chars // len(STEP_TOOLS))
+    for i, tool in enumerate(STEP_TOOLS, 1):
+        lines.append(f"{i}. {tool} step - {_filler(rng, per_step)}")
+    return "\n".join(lines)[:max(chars, 1)]
+
+
+def make_from_schema(schema, rng, chars):
+    """Build a value that satisfies a Gemini responseSchema (OBJECT/ARRAY/STRING/NUMBER/...)."""
+    kind = schema.get("type", "STRING").upper()
+    if kind == "OBJECT":
+        return {name: make_from_schema(sub, rng, chars) for name, sub in schema.get("properties", {}).items()}
+    if kind == "ARRAY":
+        count = max(schema.get("minItems", 4), 1)
+        return [make_from_schema(schema.get("items", {}), rng, chars) for _ in range(count)]
+    if kind == "INTEGER":
+        return rng.randint(1, 100)
+    if kind == "NUMBER":
+        return round(rng.uniform(0, 100), 2)
+    if kind == "BOOLEAN":
+        return rng.random() < 0.5
+    if "enum" in schema:
+        return rng.choice(schema["enum"])
+    return _filler(rng, max(12, chars // 20))
+
+
+def _usage(prompt, text):
+    prompt_tokens = (len(prompt) + 3) // 4
+    output_tokens = (len(text) + 3) // 4
+    return {"promptTokenCount": prompt_tokens, "candidatesTokenCount": output_tokens, "totalTokenCount": prompt_tokens + output_tokens}
+
+
+def _response(text, usage):
+    return {"candidates": [{"content": {"parts": [{"text": text}], "role": "model"}, "finishReason": "STOP"}], "usageMetadata": usage}
+
+
+def make_handler(settings):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            if ":generateContent" not in self.path and ":streamGenerateContent" not in self.path:
+                self._send_json(404, {"error": {"code": 404, "message": "Unknown method"}})
+                return
+            if not settings.admit():
+                self._send_json(429, {"error": {"code": 429, "message": "Resource has been exhausted (e.g. check quota)."}})
+                return
+            try:
+                delay, fail = settings.draw()
+                time.sleep(delay)
+            finally:
+                settings.done()
+            if fail:
+                self._send_json(503, {"error": {"code": 503, "message": "The model is overloaded."}})
+                return
+
+            prompt = "".join(part.get("text", "") for content in body.get("contents", []) for part in content.get("parts", []))
+            config = body.get("generationConfig") or {}
+            if "responseSchema" in config:
+                rng = random.Random(f"{settings.seed}:{prompt}")
+                text = json.dumps(make_from_schema(config["responseSchema"], rng, settings.response_chars))
+            else:
+                text = make_text(prompt, settings.response_chars)
+                if "Final Answer:" in prompt:
+                    # crewAI agents (crew_backend.py) parse a ReAct-style reply
+                    text = f"Thought: Do I need to use a tool? No\nFinal Answer: {text}"
+            usage = _usage(prompt, text)
+
+            if ":streamGenerateContent" in self.path:
+                self._send_stream(text, usage)
+            else:
+                self._send_json(200, _response(text, usage))
+
+        def _send_json(self, status, payload):
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _send_stream(self, text, usage):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            step = max(1, -(-len(text) // settings.stream_chunks))
+            for start in range(0, len(text), step):
+                event = _response(text[start:start + step], usage)
+                self.wfile.write(f"data: {json.dumps(event)}\r\n\r\n".encode("utf-8"))
+                self.wfile.flush()
+            self.close_connection = True
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def start_server(host="127.0.0.1", port=0, settings=None):
+    """
+    Start the mock server on a background thread.
+
+    Returns:
+        tuple: (server, base_url) where base_url is suitable for GEMINI_BASE_URL;
+            call server.shutdown() to stop it
+    """
+    settings = settings or MockSettings()
+    server = ThreadingHTTPServer((host, port), make_handler(settings))
+    server.daemon_threads = True
+    server.settings = settings
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/v1beta/models"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve a local mock of the Gemini generateContent API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=200.0, help="Mean response latency")
+    parser.add_argument("--jitter-ms", type=float, default=50.0, help="Uniform +/- jitter around the mean latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 503")
+    parser.add_argument("--response-chars", type=int, default=1200, help="Approximate size of each text response")
+    parser.add_argument("--stream-chunks", type=int, default=8, help="SSE events per streamed response")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--rpm-quota", type=int, default=0, help="Answer 429 beyond this many requests per rolling minute")
+    parser.add_argument("--max-concurrent", type=int, default=0, help="Answer 429 beyond this many requests in flight")
+    args = parser.parse_args(argv)
+
+    settings = MockSettings(
+        args.latency_ms, args.jitter_ms, args.error_rate, args.response_chars, args.stream_chunks, args.seed,
+        args.rpm_quota, args.max_concurrent,
+    )
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(settings))
+    server.daemon_threads = True
+    print(f"Mock Gemini API on http://{args.host}:{args.port}/v1beta/models (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
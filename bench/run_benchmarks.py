@@ -0,0 +1,299 @@
+"""
+Offline benchmark suite: pipeline throughput/latency, PDF extraction and diagram rendering.
+
+Usage:
+    python bench/run_benchmarks.py
+    python bench/run_benchmarks.py --suite analyze --concurrency 1 4 16 --documents 64
+    python bench/run_benchmarks.py --compare bench/results/bench-20250101T000000Z.json
+    python bench/run_benchmarks.py --suite crew --concurrency 1 8 --documents 16
+
+The analyze benchmark talks to an in-process bench/mock_gemini_server.py
+(pass --base-url to target another server instead), with the response
+cache and the local fast path disabled so every stage makes a request.
+Inputs, mock latencies and the random seed are fixed by the command-line
+settings, which are stored with the results; --compare only reports deltas
+against a previous run made with the same settings. The crew suite runs
+agent_backend's chain and crew_backend.py's crewAI path over the same
+leases against the same server (it is skipped when crewAI is not installed).
+"""
+import argparse
+import asyncio
+import functools
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+# Run from anywhere: make the repository root importable
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import fitz  # PyMuPDF
+
+import agent_backend
+import utils.gemini_client as gemini_client
+from mock_gemini_server import MockSettings, make_text, start_server
+from utils import visualize_workflow
+from utils.extract_text import extract_text_from_pdf
+from utils.metrics import Histogram, registry
+from utils.stage_memo import content_hash
+
+RESULTS_DIR = os.path.join(ROOT, "bench", "results")
+LEASE_PARAGRAPH = (
+    "The Tenant shall pay monthly base rent on the first day of each month. The Landlord shall maintain "
+    "the structural elements of the building. Either party may terminate this lease with written notice. "
+)
+
+
+def _latency_summary(samples):
+    histogram = Histogram(max_samples=len(samples) or 1)
+    for sample in samples:
+        histogram.observe(sample)
+    summary = histogram.summary()
+    return {key: round(summary[key], 6) for key in ("mean", "p50", "p95", "p99", "max")} if samples else {}
+
+
+def synthetic_lease(index, paragraphs=12):
+    """A distinct lease-like document per index, so no two documents share a cache or memo entry."""
+    return f"LEASE AGREEMENT No. {index}\n\n" + "\n\n".join(f"{n}. {LEASE_PARAGRAPH}" for n in range(1, paragraphs + 1))
+
+
+def bench_analyze(concurrency_levels, documents, fused=False, analyze=None, label="analyze"):
+    """
+    Time analyze_lease_document_async (or `analyze`, a coroutine function of
+    the lease text) over `documents` leases at each concurrency level.
+    """
+    analyze = analyze or functools.partial(agent_backend.analyze_lease_document_async, use_cache=False, fused=fused)
+    results = []
+    for level in concurrency_levels:
+        texts = [synthetic_lease(i) for i in range(documents)]
+        latencies = []
+
+        async def timed(text):
+            started = time.perf_counter()
+            result = await analyze(text)
+            latencies.append(time.perf_counter() - started)
+            return result
+
+        async def run():
+            return await gemini_client.gather_with_concurrency([timed(text) for text in texts], level)
+
+        registry.reset()
+        started = time.perf_counter()
+        outputs = asyncio.run(run())
+        wall = time.perf_counter() - started
+        counters = registry.snapshot()["counters"]
+        results.append({
+            "concurrency": level,
+            "documents": documents,
+            "errors": sum(1 for output in outputs if agent_backend.analysis_failed(output)),
+            "wall_s": round(wall, 4),
+            "docs_per_s": round(documents / wall, 3),
+            "requests": int(counters.get("gemini.request.calls", 0)),
+            "retries": int(counters.get("gemini.retries", 0)),
+            "tokens": int(counters.get("gemini.request.total_tokens", 0)),
+            "latency_s": _latency_summary(latencies),
+        })
+        print(f"  {label} c={level:<3} {results[-1]['docs_per_s']:>8.2f} docs/s  p95={results[-1]['latency_s'].get('p95', 0):.3f}s", file=sys.stderr)
+    return results
+
+
+def bench_crew(concurrency_levels, documents):
+    """Run the plain chain and the crewAI backend over the same leases at each concurrency level."""
+    try:
+        # crewAI and LangChain are optional; the other suites run without them
+        import crew_backend
+    except ImportError as e:
+        print(f"  crew suite skipped: {e}", file=sys.stderr)
+        return []
+    results = []
+    backends = (
+        ("chain", functools.partial(agent_backend.analyze_lease_document_async, use_cache=False)),
+        ("crew", functools.partial(crew_backend.analyze_lease_document_crew_async, use_cache=False)),
+    )
+    for backend, analyze in backends:
+        for row in bench_analyze(concurrency_levels, documents, analyze=analyze, label=backend):
+            results.append(dict(row, backend=backend))
+    return results
+
+
+def make_synthetic_pdf(path, pages, lines_per_page=40):
+    """Write a text-only PDF of `pages` pages of lease boilerplate."""
+    doc = fitz.open()
+    for page_number in range(pages):
+        page = doc.new_page()
+        text = "\n".join(f"{page_number + 1}.{line} {LEASE_PARAGRAPH[:90]}" for line in range(lines_per_page))
+        page.insert_text((36, 36), text, fontsize=8)
+    doc.save(path)
+    doc.close()
+
+
+def bench_pdf(page_counts, repeats, workers):
+    """Time extract_text_from_pdf serially and across `workers` processes for synthetic PDFs."""
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for pages in page_counts:
+            path = os.path.join(tmp, f"lease-{pages}.pdf")
+            make_synthetic_pdf(path, pages)
+            row = {"pages": pages, "bytes": os.path.getsize(path)}
+            for label, worker_count in (("serial", None), ("parallel", workers)):
+                timings = []
+                for _ in range(repeats):
+                    started = time.perf_counter()
+                    text = extract_text_from_pdf(path, workers=worker_count)
+                    timings.append(time.perf_counter() - started)
+                row[f"{label}_s"] = round(statistics.median(timings), 6)
+                row["chars"] = len(text)
+            row["workers"] = workers
+            row["pages_per_s_serial"] = round(pages / row["serial_s"], 1)
+            results.append(row)
+            print(f"  pdf {pages:>5} pages  serial={row['serial_s']:.3f}s  parallel={row['parallel_s']:.3f}s", file=sys.stderr)
+    return results
+
+
+def bench_render(repeats, response_chars):
+    """Time cold (uncached) and warm (cached) workflow diagram rendering."""
+    workflows = [make_text(f"workflow {i}", response_chars) for i in range(repeats)]
+    for text in workflows:
+        visualize_workflow._diagram_cache.invalidate(content_hash(text))
+    cold = []
+    for text in workflows:
+        started = time.perf_counter()
+        visualize_workflow.render_diagram(text)
+        cold.append(time.perf_counter() - started)
+    warm = []
+    for text in workflows:
+        started = time.perf_counter()
+        visualize_workflow.render_diagram(text)
+        warm.append(time.perf_counter() - started)
+    started = time.perf_counter()
+    visualize_workflow.prerender_workflows([text + "\n" for text in workflows])
+    prerender_wall = time.perf_counter() - started
+    result = {
+        "workflows": repeats,
+        "graphviz": visualize_workflow.graphviz_available(),
+        "cold_s": _latency_summary(cold),
+        "warm_s": _latency_summary(warm),
+        "prerender_wall_s": round(prerender_wall, 6),
+    }
+    print(f"  render cold p50={result['cold_s']['p50'] * 1000:.2f}ms  warm p50={result['warm_s']['p50'] * 1000:.3f}ms  graphviz={result['graphviz']}", file=sys.stderr)
+    return result
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _headline(results):
+    """Flatten a results file into {metric: value} pairs for comparison."""
+    flat = {}
+    for row in results.get("analyze", []):
+        flat[f"analyze c={row['concurrency']} docs/s"] = row["docs_per_s"]
+        for q in ("p50", "p95", "p99"):
+            flat[f"analyze c={row['concurrency']} {q} s"] = row["latency_s"].get(q)
+    for row in results.get("crew", []):
+        flat[f"{row['backend']} c={row['concurrency']} docs/s"] = row["docs_per_s"]
+        flat[f"{row['backend']} c={row['concurrency']} requests"] = row["requests"]
+    for row in results.get("pdf", []):
+        flat[f"pdf {row['pages']}p serial s"] = row["serial_s"]
+        flat[f"pdf {row['pages']}p parallel s"] = row["parallel_s"]
+    render = results.get("render")
+    if render:
+        flat["render cold p50 s"] = render["cold_s"].get("p50")
+        flat["render warm p50 s"] = render["warm_s"].get("p50")
+    return flat
+
+
+def compare(current, baseline_path):
+    """Print per-metric changes against a previous results file made with the same settings."""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline["meta"]["settings"] != current["meta"]["settings"]:
+        print(f"Not comparable: {baseline_path} was run with different settings", file=sys.stderr)
+        return
+    before, after = _headline(baseline["results"]), _headline(current["results"])
+    print(f"{'metric':<32}{'baseline':>12}{'current':>12}{'change':>10}")
+    for metric, value in after.items():
+        old = before.get(metric)
+        change = f"{(value - old) / old * 100:+.1f}%" if old and value is not None else "n/a"
+        print(f"{metric:<32}{old if old is not None else '-':>12}{value if value is not None else '-':>12}{change:>10}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the offline performance benchmarks.")
+    parser.add_argument("--suite", nargs="+", choices=["analyze", "crew", "pdf", "render"], default=["analyze", "pdf", "render"])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--documents", type=int, default=32, help="Leases analyzed per concurrency level")
+    parser.add_argument("--fused", action="store_true", help="Benchmark the single-call fused analysis")
+    parser.add_argument("--pages", type=int, nargs="+", default=[50, 400], help="Synthetic PDF sizes")
+    parser.add_argument("--pdf-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--repeats", type=int, default=5, help="Repetitions for PDF timings and workflows for rendering")
+    parser.add_argument("--base-url", default=None, help="Benchmark against this server instead of the in-process mock")
+    parser.add_argument("--latency-ms", type=float, default=200.0)
+    parser.add_argument("--jitter-ms", type=float, default=50.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--response-chars", type=int, default=1200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", default=None, help="Results JSON (default: bench/results/bench-<UTC time>.json)")
+    parser.add_argument("--compare", default=None, help="Previous results JSON to compare against")
+    args = parser.parse_args(argv)
+
+    # Measure the request path itself: no response cache, no local fast path
+    gemini_client.FAST_PATH_ENABLED = False
+    settings = {key: value for key, value in vars(args).items() if key not in ("output", "compare")}
+    server = None
+    if "analyze" in args.suite or "crew" in args.suite:
+        if args.base_url:
+            gemini_client.BASE_URL = args.base_url
+        else:
+            server, gemini_client.BASE_URL = start_server(settings=MockSettings(
+                args.latency_ms, args.jitter_ms, args.error_rate, args.response_chars, seed=args.seed,
+            ))
+
+    results = {}
+    try:
+        if "analyze" in args.suite:
+            results["analyze"] = bench_analyze(args.concurrency, args.documents, args.fused)
+        if "crew" in args.suite:
+            results["crew"] = bench_crew(args.concurrency, args.documents)
+        if "pdf" in args.suite:
+            results["pdf"] = bench_pdf(args.pages, args.repeats, args.pdf_workers)
+        if "render" in args.suite:
+            results["render"] = bench_render(max(args.repeats, 20), args.response_chars)
+    finally:
+        if server is not None:
+            server.shutdown()
+
+    now = datetime.now(timezone.utc)
+    report = {
+        "meta": {
+            "timestamp": now.isoformat(),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "settings": settings,
+        },
+        "results": results,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"bench-{now.strftime('%Y%m%dT%H%M%SZ')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}", file=sys.stderr)
+    if args.compare:
+        compare(report, args.compare)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,157 @@
+"""
+crewAI execution path: the Lease Analyst, Workflow Architect and Value Analyst
+agents from agents/ run as crew tasks with explicit dependencies.
+
+Each document gets its own crew (extraction -> workflow -> value, each task
+reading its predecessors' output as context); crews for different documents
+are independent and run concurrently. The agents' LLM is GeminiLLM, so every
+agent call goes through utils.gemini_client and shares its response cache
+with agent_backend. Results have the same shape as analyze_lease_document,
+so the two backends can be benchmarked on the same inputs
+(bench/run_benchmarks.py --suite crew).
+"""
+import asyncio
+import functools
+import json
+import logging
+import re
+
+from crewai import Crew, Process, Task
+
+from agent_backend import LEASE_ANALYST_ITEMS, MAX_CONCURRENT_DOCUMENTS, failed_result
+from agents.gemini_llm import GeminiLLM
+from agents.registry import build_agent
+from utils.clause_index import relevant_text
+from utils.gemini_client import CLAUSE_BUDGET_CHARS, gather_with_concurrency
+from utils.metrics import log_event, run_in_context, span
+from utils.value_metrics import VALUE_INSTRUCTIONS, format_value, normalize_value_metrics
+
+_JSON_OBJECT = re.compile(r"\{.*\}", re.DOTALL)
+
+
+def _extract_description(document_text):
+    checklist = "\n".join(f"    - {item}" for item in LEASE_ANALYST_ITEMS.values())
+    return f"""
+    Analyze this lease document and extract key information:
+{checklist}
+
+    Format your answer as a structured summary with one "- Label: value" line per item.
+
+    Document: {relevant_text(document_text, list(LEASE_ANALYST_ITEMS), CLAUSE_BUDGET_CHARS)}
+    """
+
+
+WORKFLOW_DESCRIPTION = """
+    Based on the lease information in your context, design an automation workflow with 4-6 steps
+    using tools like Salesforce, DocuSign, Google Drive and Slack.
+
+    For each step, explain its purpose and how it helps automate the lease management process.
+    Format your answer as a numbered list with clear step titles and descriptions.
+    """
+
+VALUE_DESCRIPTION = f"""
+    Based on the lease information and the proposed workflow in your context, estimate:
+    - Hours saved by automating manual tasks
+    - Risk or errors avoided through automation
+    - Which teams benefit most from this automation
+
+    {VALUE_INSTRUCTIONS}
+    Your final answer must be only that JSON object.
+    """
+
+
+def build_crew(document_text, use_cache=True, verbose=False):
+    """
+    Build the three-task crew for one document.
+
+    Agents are built fresh for every crew (their executors hold per-run state),
+    all bound to one GeminiLLM. Conversation memory is off: it costs a
+    summarization call after every task, and a crew's agents never see a second task.
+
+    Returns:
+        tuple: (Crew, (extract task, workflow task, value task))
+    """
+    llm = GeminiLLM(use_response_cache=use_cache)
+    analyst, architect, value_analyst = (
+        build_agent(name, llm, verbose=verbose, memory=False) for name in ("lease_analyst", "workflow_architect", "value_analyst")
+    )
+    extract = Task(description=_extract_description(document_text), agent=analyst, expected_output="A structured lease summary")
+    workflow = Task(description=WORKFLOW_DESCRIPTION, agent=architect, context=[extract], expected_output="A numbered workflow")
+    value = Task(description=VALUE_DESCRIPTION, agent=value_analyst, context=[extract, workflow], expected_output="A JSON value estimate")
+    crew = Crew(
+        agents=[analyst, architect, value_analyst],
+        tasks=[extract, workflow, value],
+        process=Process.sequential,
+        verbose=verbose,
+    )
+    return crew, (extract, workflow, value)
+
+
+def _task_text(task):
+    return task.output.result.strip()
+
+
+def _parse_crew_value(text):
+    """Return (value text, metrics); an answer without valid JSON is kept as free text with no metrics."""
+    match = _JSON_OBJECT.search(text)
+    try:
+        metrics = normalize_value_metrics(json.loads(match.group(0) if match else text))
+    except ValueError:
+        return text, None
+    return format_value(metrics), metrics
+
+
+def analyze_lease_document_crew(document_text, use_cache=True, verbose=False):
+    """
+    Analyze a lease document with a crewAI crew.
+
+    Args:
+        document_text (str): The raw text of the lease document
+        use_cache (bool): Read and populate the shared response cache for every agent call
+        verbose (bool): Log the agents' reasoning steps
+
+    Returns:
+        dict: The same extracted info, workflow, value and value_metrics
+            dictionary as agent_backend.analyze_lease_document
+    """
+    with span("crew.analyze", input_chars=len(document_text)) as record:
+        crew, (extract, workflow, value) = build_crew(document_text, use_cache=use_cache, verbose=verbose)
+        try:
+            crew.kickoff()
+        except Exception as e:
+            # Reported like make_gemini_request failures, so callers treat both backends alike
+            log_event("crew.failed", level=logging.WARNING, error=str(e))
+            return failed_result(f"Error: crew failed: {e}")
+        value_text, value_metrics = _parse_crew_value(_task_text(value))
+        record["structured"] = value_metrics is not None
+    return {
+        "extracted_info": _task_text(extract),
+        "workflow": _task_text(workflow),
+        "value": value_text,
+        "value_metrics": value_metrics
+    }
+
+
+async def analyze_lease_document_crew_async(document_text, use_cache=True, verbose=False):
+    """Async version of analyze_lease_document_crew (the crew runs on a worker thread)."""
+    loop = asyncio.get_running_loop()
+    call = functools.partial(analyze_lease_document_crew, document_text, use_cache=use_cache, verbose=verbose)
+    return await loop.run_in_executor(None, run_in_context(call))
+
+
+async def analyze_lease_documents_crew_async(documents, max_concurrency=MAX_CONCURRENT_DOCUMENTS, use_cache=True):
+    """
+    Analyze many lease documents with one crew each, up to `max_concurrency` crews at once.
+
+    Returns:
+        list[dict]: One analyze_lease_document_crew result per input, in input order
+    """
+    return await gather_with_concurrency(
+        [analyze_lease_document_crew_async(text, use_cache=use_cache) for text in documents],
+        max_concurrency,
+    )
+
+
+def analyze_lease_documents_crew(documents, max_concurrency=MAX_CONCURRENT_DOCUMENTS, use_cache=True):
+    """Blocking entry point for analyze_lease_documents_crew_async"""
+    return asyncio.run(analyze_lease_documents_crew_async(documents, max_concurrency, use_cache))
@@ -0,0 +1,18 @@
+import agent_backend
+from agent_backend import analysis_failed, analyze_lease_document
+
+
+def test_failed_extraction_stops_the_chain(monkeypatch):
+    prompts = []
+
+    def failing_request(prompt, generation_config=None, use_cache=True, **kwargs):
+        prompts.append(prompt)
+        return "Error: API request failed with status code 503"
+
+    monkeypatch.setattr("utils.gemini_client.make_gemini_request", failing_request)
+    monkeypatch.setattr(agent_backend, "make_gemini_request", failing_request)
+    result = analyze_lease_document("Lease between A and B.", use_cache=False)
+    assert len(prompts) == 1
+    assert analysis_failed(result)
+    assert result["workflow"] == result["value"] == "Error: API request failed with status code 503"
+    assert result["value_metrics"] is None
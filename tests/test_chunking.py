@@ -0,0 +1,66 @@
+import pytest
+
+from utils.chunking import PAGE_BREAK, chunk_text, split_into_sections
+from utils.gemini_client import CHUNK_THRESHOLD_CHARS, CLAUSE_BUDGET_CHARS, extraction_text
+
+LEASE = (
+    "COMMERCIAL LEASE\n"
+    "1. Premises\nSuite 300, 1200 Market Street.\n"
+    "2. Term\nFive years from April 1, 2024.\n"
+    f"{PAGE_BREAK}ARTICLE III Rent\nTenant pays $12,000 per month.\n"
+    "Section 4.1 Renewal\nOne option to renew for three years.\n"
+)
+
+
+def test_sections_round_trip():
+    sections = split_into_sections(LEASE)
+    assert "".join(sections) == LEASE
+    assert [s.split("\n")[0] for s in sections] == [
+        "COMMERCIAL LEASE", "1. Premises", "2. Term", "ARTICLE III Rent", "Section 4.1 Renewal",
+    ]
+
+
+def test_page_break_starts_a_section():
+    text = "first page text\nmore text\fsecond page text\n"
+    assert split_into_sections(text) == ["first page text\nmore text\f", "second page text\n"]
+
+
+def test_chunks_respect_size_and_section_boundaries():
+    chunks = chunk_text(LEASE, 80)
+    assert "".join(chunks) == LEASE
+    assert all(len(chunk) <= 80 for chunk in chunks)
+    assert all(chunk.startswith(("COMMERCIAL", "1.", "2.", "ARTICLE", "Section")) for chunk in chunks)
+
+
+def test_oversized_section_is_split_on_paragraphs():
+    section = "1. Rules\n" + "\n\n".join("x" * 30 for _ in range(10))
+    chunks = chunk_text(section, 70)
+    assert "".join(chunks) == section
+    assert all(len(chunk) <= 70 for chunk in chunks)
+
+
+def test_long_documents_reach_the_chunked_path_whole():
+    section = "1. Maintenance\nTenant shall keep the premises in good repair.\n"
+    long_lease = section * (CHUNK_THRESHOLD_CHARS // len(section) + 1)
+    assert extraction_text(long_lease, ["rent"]) == long_lease
+
+
+def test_shorter_documents_are_cut_to_the_clause_budget():
+    section = "1. Maintenance\nTenant shall keep the premises in good repair.\n"
+    lease = section * ((CLAUSE_BUDGET_CHARS * 2) // len(section))
+    assert len(lease) < CHUNK_THRESHOLD_CHARS
+    assert len(extraction_text(lease, ["rent"])) <= CLAUSE_BUDGET_CHARS
+
+
+def test_pdf_pages_are_separated_by_page_breaks(tmp_path):
+    fitz = pytest.importorskip("fitz")
+    from utils.extract_text import extract_text_from_pdf
+
+    path = tmp_path / "lease.pdf"
+    with fitz.open() as doc:
+        for text in ("Page one rent clause", "Page two renewal clause"):
+            doc.new_page().insert_text((72, 72), text)
+        doc.save(path)
+    text = extract_text_from_pdf(str(path))
+    assert text.count(PAGE_BREAK) == 1
+    assert len(split_into_sections(text)) == 2
@@ -0,0 +1,65 @@
+from collections import OrderedDict
+
+from utils import clause_index
+from utils.clause_index import ClauseIndex, get_clause_index, relevant_text, segment_clauses, tokenize
+
+LEASE = (
+    "COMMERCIAL LEASE between Riverside Properties LLC (Landlord) and Velocity Logistics Inc. (Tenant).\n"
+    "1. Premises\nSuite 300, 1200 Market Street, San Francisco.\n"
+    "2. Rent\nTenant shall pay a monthly base rent of $12,000, due on the first day of each month.\n"
+    "3. Insurance\nTenant shall carry general liability insurance of $1,000,000.\n"
+    "4. Renewal\nTenant has one option to renew for three years by written notice 180 days prior to expiration.\n"
+    "5. Signage\nTenant may install signage approved by Landlord.\n"
+)
+
+
+def test_stemming_joins_word_forms():
+    assert tokenize("renewal renewed renews") == ["renew"] * 3
+    assert tokenize("termination terminate")[0] == tokenize("termination terminate")[1]
+
+
+def test_segments_round_trip():
+    assert "".join(segment_clauses(LEASE)) == LEASE
+    assert len(segment_clauses(LEASE)) == 6
+
+
+def test_rank_puts_the_matching_clause_first():
+    index = ClauseIndex(LEASE)
+    _, best = index.rank("renew renewal option notice")[0]
+    assert index.clauses[best].startswith("4. Renewal")
+    _, best = index.rank("monthly rent payment")[0]
+    assert index.clauses[best].startswith("2. Rent")
+
+
+def test_select_keeps_preamble_budget_and_document_order():
+    index = ClauseIndex(LEASE)
+    budget = len(index.clauses[0]) + len(index.clauses[2]) + len(index.clauses[4])
+    text = index.select(["monthly rent payment", "renew option notice"], budget)
+    assert text == index.clauses[0] + index.clauses[2] + index.clauses[4]
+    assert len(text) <= budget
+
+
+def test_relevant_text_returns_short_text_unchanged():
+    assert relevant_text(LEASE, ["rent"], len(LEASE)) == LEASE
+
+
+def test_relevant_text_cuts_to_topics():
+    text = relevant_text(LEASE, ["rent"], 250)
+    assert "$12,000" in text
+    assert len(text) <= 250
+
+
+def test_index_is_cached_by_content():
+    assert get_clause_index(LEASE) is get_clause_index(str(LEASE))
+
+
+def test_index_cache_evicts_least_recently_used(monkeypatch):
+    monkeypatch.setattr(clause_index, "CLAUSE_INDEX_ENTRIES", 2)
+    monkeypatch.setattr(clause_index, "_indexes", OrderedDict())
+    first = get_clause_index("1. Rent\nfirst")
+    second = get_clause_index("1. Rent\nsecond")
+    assert get_clause_index("1. Rent\nfirst") is first
+    get_clause_index("1. Rent\nthird")
+    assert get_clause_index("1. Rent\nfirst") is first
+    assert get_clause_index("1. Rent\nsecond") is not second
+    assert len(clause_index._indexes) == 2
@@ -0,0 +1,55 @@
+import asyncio
+import os
+
+from utils import gemini_client
+from utils.gemini_client import extract_key_info, merge_stream_with_fast_path
+from utils.stage_memo import StageMemo, memoized_stream
+
+SAMPLE_LEASE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "utils", "rentalagreement.txt")
+
+
+def sample_lease():
+    with open(SAMPLE_LEASE, encoding="utf-8") as f:
+        return f.read()
+
+
+def test_stream_merge_prefixes_the_summary():
+    assert "".join(merge_stream_with_fast_path("- Rent: $1", iter(["- Deadlines: ", "none"]))) == "- Rent: $1\n- Deadlines: none"
+
+
+def test_stream_merge_keeps_errors_bare():
+    assert list(merge_stream_with_fast_path("- Rent: $1", iter(["Error: Connection refused"]))) == ["Error: Connection refused"]
+
+
+def test_failed_streaming_extraction_is_a_bare_error(monkeypatch):
+    monkeypatch.setattr(gemini_client, "FAST_PATH_ENABLED", True)
+    monkeypatch.setattr(gemini_client, "make_gemini_request", lambda *args, **kwargs: iter(["Error: Connection refused"]))
+    memo = StageMemo()
+    stream = memoized_stream(memo, "extracted_info", "doc", lambda: extract_key_info(sample_lease(), stream=True))
+    text = "".join(stream)
+    assert text == "Error: Connection refused"
+    # A failed stage is not memoized, so the next run calls the API again
+    assert memo.get("extracted_info", "doc") is None
+
+
+def test_successful_streaming_extraction_keeps_the_fast_path_summary(monkeypatch):
+    monkeypatch.setattr(gemini_client, "FAST_PATH_ENABLED", True)
+    monkeypatch.setattr(gemini_client, "make_gemini_request", lambda *args, **kwargs: iter(["- Key deadlines: ", "rent due on the 1st"]))
+    text = "".join(extract_key_info(sample_lease(), stream=True))
+    assert "Riverside Properties LLC" in text
+    assert text.endswith("- Key deadlines: rent due on the 1st")
+
+
+def test_async_api_wraps_the_sync_stage(monkeypatch):
+    calls = []
+
+    def fake_request(prompt, generation_config=None, use_cache=True, stream=False, hedge=False):
+        calls.append(use_cache)
+        return "- Key deadlines: none"
+
+    monkeypatch.setattr(gemini_client, "FAST_PATH_ENABLED", True)
+    monkeypatch.setattr(gemini_client, "make_gemini_request", fake_request)
+    lease = sample_lease()
+    result = asyncio.run(gemini_client.extract_key_info_async(lease, use_cache=False))
+    assert result == extract_key_info(lease, use_cache=False)
+    assert calls == [False, False]
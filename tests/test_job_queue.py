@@ -0,0 +1,102 @@
+import threading
+import time
+
+from utils.job_queue import JobQueue
+
+
+def wait(queue, job_id, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = queue.get(job_id)
+        if job["status"] in ("done", "error"):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def test_equal_keys_share_one_job():
+    queue = JobQueue(max_workers=2)
+    release = threading.Event()
+    calls = []
+
+    def work(job):
+        calls.append(job.id)
+        release.wait(5)
+        return {"extracted_info": "ok"}
+
+    first = queue.submit("doc:chain", work)
+    second = queue.submit("doc:chain", work)
+    release.set()
+    assert first == second
+    assert wait(queue, first)["result"] == {"extracted_info": "ok"}
+    assert queue.submit("doc:chain", work) == first
+    assert len(calls) == 1
+
+
+def test_replace_starts_a_new_job():
+    queue = JobQueue(max_workers=1)
+    first = queue.submit("doc", lambda job: {"value": "1"})
+    wait(queue, first)
+    second = queue.submit("doc", lambda job: {"value": "2"}, replace=True)
+    assert second != first
+    assert wait(queue, second)["result"] == {"value": "2"}
+
+
+def test_stream_and_complete_record_stages():
+    queue = JobQueue(max_workers=1)
+
+    def work(job):
+        text = job.stream("extracted_info", iter(["a", "b", "c"]))
+        job.complete("value", "v")
+        return {"extracted_info": text, "value": "v"}
+
+    job = wait(queue, queue.submit("doc", work))
+    assert job["stages"]["extracted_info"] == {"status": "done", "text": "abc"}
+    assert job["stages"]["value"] == {"status": "done", "text": "v"}
+
+
+def test_exception_fails_job_until_replaced():
+    queue = JobQueue(max_workers=1)
+
+    def boom(job):
+        raise RuntimeError("boom")
+
+    first = queue.submit("doc", boom)
+    job = wait(queue, first)
+    assert job["status"] == "error" and job["error"] == "boom"
+    # Reruns and polls keep getting the failed job; only an explicit re-run retries
+    assert queue.submit("doc", lambda job: {"value": "ok"}) == first
+    second = queue.submit("doc", lambda job: {"value": "ok"}, replace=True)
+    assert second != first
+    assert wait(queue, second)["status"] == "done"
+
+
+def test_error_stage_result_fails_job_until_replaced():
+    queue = JobQueue(max_workers=1)
+
+    def failing(job):
+        job.complete("extracted_info", "parties: A and B")
+        job.complete("workflow", "Error: API request failed with status code 503")
+        return {"extracted_info": "parties: A and B", "workflow": "Error: API request failed with status code 503"}
+
+    first = queue.submit("doc", failing)
+    job = wait(queue, first)
+    assert job["status"] == "error"
+    assert "workflow" in job["error"]
+    # The partial result stays visible on the failed job
+    assert job["result"]["extracted_info"] == "parties: A and B"
+    assert queue.submit("doc", lambda job: {"workflow": "1. Upload"}) == first
+    second = queue.submit("doc", lambda job: {"workflow": "1. Upload"}, replace=True)
+    assert second != first
+    assert wait(queue, second)["status"] == "done"
+
+
+def test_history_prunes_oldest_finished_jobs():
+    queue = JobQueue(max_workers=1, history=2)
+    ids = []
+    for i in range(4):
+        ids.append(queue.submit(f"doc{i}", lambda job: {}))
+        wait(queue, ids[-1])
+    # Pruning happens on submit, so the last submission can leave history + 1 jobs
+    assert queue.get(ids[0]) is None
+    assert queue.get(ids[-1]) is not None
@@ -0,0 +1,98 @@
+import os
+from datetime import date
+
+from utils.lease_fastpath import covered_items, extract_fields, parse_date, parse_number
+
+SAMPLE_LEASE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "utils", "rentalagreement.txt")
+
+
+def test_sample_lease_fields():
+    with open(SAMPLE_LEASE, encoding="utf-8") as f:
+        fields = extract_fields(f.read())
+    assert fields["landlord"]["value"] == "Riverside Properties LLC"
+    assert fields["tenant"]["value"] == "Velocity Logistics Inc."
+    assert fields["commencement_date"]["value"] == date(2024, 4, 1)
+    assert fields["expiration_date"]["value"] == date(2029, 3, 31)
+    assert fields["monthly_rent"]["value"] == 12000.0
+    assert fields["termination_notice_days"]["value"] == 120
+
+
+def test_sample_lease_late_fee_leaves_deadlines_to_the_llm():
+    with open(SAMPLE_LEASE, encoding="utf-8") as f:
+        covered = covered_items(extract_fields(f.read()))
+    assert "deadlines" not in covered
+    # The late fee is a rent term too
+    assert "rent" not in covered
+    assert {"address", "parties", "term"} <= covered
+
+
+def test_words_containing_end_are_not_expiration_dates():
+    text = "The term shall commence on February 1, 2024. This amendment dated January 15, 2024 changes the rent."
+    fields = extract_fields(text)
+    assert fields["commencement_date"]["value"] == date(2024, 2, 1)
+    assert "expiration_date" not in fields
+
+
+def test_expiration_before_commencement_is_rejected():
+    text = "The lease shall commence on March 1, 2025. The prior lease ended on June 30, 2024."
+    fields = extract_fields(text)
+    assert "expiration_date" not in fields
+    assert "term" not in covered_items(fields)
+
+
+def test_rejected_expiration_is_derived_from_term():
+    text = "The lease shall commence on March 1, 2025 for a term of two (2) years. The prior lease ended on June 30, 2024."
+    fields = extract_fields(text)
+    assert fields["expiration_date"]["value"] == date(2027, 2, 28)
+
+
+def test_negated_renewal_is_not_an_option():
+    text = "Tenant may not renew this lease. Either party may terminate with 60 days written notice."
+    fields = extract_fields(text)
+    assert "renewal_option" not in fields
+    assert "renewal_termination" not in covered_items(fields)
+
+
+def test_renewal_with_notice_supports_deadlines():
+    text = (
+        "The lease shall commence on January 1, 2024 and expire on December 31, 2026. "
+        "Tenant shall have an option to renew by giving 90 days written notice. "
+        "Either party may terminate with 60 days written notice."
+    )
+    fields = extract_fields(text)
+    assert fields["renewal_notice_days"]["value"] == 90
+    assert {"renewal_termination", "deadlines"} <= covered_items(fields)
+
+
+def test_renewal_value_drops_the_section_heading():
+    with open(SAMPLE_LEASE, encoding="utf-8") as f:
+        fields = extract_fields(f.read())
+    assert fields["renewal_option"]["value"].startswith("Tenant shall have one (1) option to renew")
+
+
+def test_increasing_rent_is_an_escalation():
+    fields = extract_fields("Base rent shall be $5,000 per month, increasing 3% annually.")
+    assert fields["monthly_rent"]["value"] == 5000.0
+    assert fields["escalation_pct"]["value"] == 3.0
+    assert "rent" in covered_items(fields)
+
+
+def test_rent_with_unextracted_terms_is_left_to_the_llm():
+    fields = extract_fields("Base rent shall be $5,000 per month, increasing 3% annually. Security deposit of $10,000.")
+    assert "rent" not in covered_items(fields)
+    fields = extract_fields("Base rent shall be $5,000 per month, subject to CPI adjustment.")
+    assert "rent" not in covered_items(fields)
+
+
+def test_articles_and_roles_are_not_party_names():
+    fields = extract_fields("This lease is made by and between The Landlord, ABC LLC, and the Tenant, XYZ Inc.")
+    assert "landlord" not in fields
+    assert "tenant" not in fields
+    assert "parties" not in covered_items(fields)
+
+
+def test_parsers():
+    assert parse_number("five (5)") == 5
+    assert parse_number("ninety") == 90
+    assert parse_date("March 31st, 2029") == date(2029, 3, 31)
+    assert parse_date("13/45/2024") is None
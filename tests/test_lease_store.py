@@ -0,0 +1,78 @@
+import os
+from datetime import date
+
+import pytest
+
+from utils.lease_store import LeaseStore, lease_row, next_quarter
+
+SAMPLE_LEASE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "utils", "rentalagreement.txt")
+METRICS = {
+    "hours_saved_per_year": 120.0,
+    "error_risk_score": 6.0,
+    "risk_avoided": "Missed renewal notice",
+    "team_weights": {"leasing": 0.5, "legal": 0.2, "finance": 0.2, "property_management": 0.1, "operations": 0.0},
+}
+
+
+def result(value_metrics=METRICS):
+    return {"extracted_info": "- Parties: ...", "workflow": "1. Upload", "value": "- Hours saved per year: 120", "value_metrics": value_metrics}
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = LeaseStore(str(tmp_path / "leases.db"))
+    yield store
+    store.close()
+
+
+@pytest.fixture
+def lease_text():
+    with open(SAMPLE_LEASE, encoding="utf-8") as f:
+        return f.read()
+
+
+def test_lease_row_reads_fields_from_the_text(lease_text):
+    row = lease_row("sample", result(), lease_text)
+    assert row["tenant"] == "Velocity Logistics Inc."
+    assert row["monthly_rent"] == 12000.0
+    assert row["expiration_date"] == "2029-03-31"
+    assert row["deadlines"][0] == ("expiration", "2029-03-31", "Lease expires 2029-03-31")
+    assert row["weight_leasing"] == 0.5
+
+
+def test_upsert_replaces_the_same_lease_id(store, lease_text):
+    store.upsert("a.pdf", result(), lease_text)
+    store.upsert("a.pdf", result(), lease_text.replace("$12,000", "$13,000"))
+    store.upsert("b.pdf", result(), lease_text)
+    assert store.count() == 2
+    assert store.get("a.pdf")["monthly_rent"] == 13000.0
+    # Re-storing a lease replaces its deadlines rather than adding more
+    assert len(store.deadlines_between("2029-01-01", "2029-12-31")) == 2
+
+
+def test_search_filters(store, lease_text):
+    store.upsert("a.pdf", result(), lease_text)
+    store.upsert("b.pdf", result(), lease_text.replace("$12,000", "$30,000"))
+    assert [row["lease_id"] for row in store.search(rent_min=20000)] == ["b.pdf"]
+    assert len(store.search(text="Velocity")) == 2
+    assert store.search(expires_before=date(2028, 1, 1)) == []
+
+
+def test_deadlines_between_by_kind(store, lease_text):
+    store.upsert("a.pdf", result(), lease_text)
+    rows = store.deadlines_between(date(2029, 3, 1), date(2029, 3, 31), kind="expiration")
+    assert [(row["lease_id"], row["due_date"]) for row in rows] == [("a.pdf", "2029-03-31")]
+    assert store.deadlines_between(date(2029, 3, 1), date(2029, 3, 31), kind="renewal_notice") == []
+
+
+def test_value_rows_skip_leases_without_metrics(store, lease_text):
+    store.upsert("a.pdf", result(), lease_text)
+    store.upsert("b.pdf", result(value_metrics=None), lease_text)
+    rows = store.value_rows()
+    assert [row[0] for row in rows] == ["a.pdf"]
+    assert rows[0][1:3] == (120.0, 6.0)
+
+
+def test_next_quarter():
+    assert next_quarter(date(2026, 10, 17)) == (date(2027, 1, 1), date(2027, 3, 31))
+    assert next_quarter(date(2026, 3, 31)) == (date(2026, 4, 1), date(2026, 6, 30))
@@ -0,0 +1,35 @@
+import json
+from datetime import date
+
+from utils.lease_templates import lease_from_terms_json, normalize_terms, resolve_start, terms_prompt
+
+TODAY = date(2026, 10, 17)
+
+
+def test_terms_prompt_is_stable_across_days():
+    # The prompt is part of the response-cache key
+    assert terms_prompt("Office in NYC for 3 years at $10K/month") == terms_prompt("Office in NYC for 3 years at $10K/month")
+    assert date.today().isoformat() not in terms_prompt("Office in NYC")
+
+
+def test_resolve_start():
+    assert resolve_start("2025-03-01", TODAY) == date(2025, 3, 1)
+    assert resolve_start("next month", TODAY) == date(2026, 11, 1)
+    assert resolve_start("in two months", TODAY) == date(2026, 12, 1)
+    assert resolve_start("June 1", TODAY) == date(2027, 6, 1)
+    assert resolve_start("November 15th", TODAY) == date(2026, 11, 15)
+    assert resolve_start("at market rate", TODAY) is None
+
+
+def test_relative_start_is_applied_after_the_call():
+    terms = normalize_terms({"commencement_date": "next month", "term_months": 12, "monthly_rent": 10000}, TODAY)
+    assert terms["commencement"] == date(2026, 11, 1)
+    assert terms["expiration"] == date(2027, 10, 31)
+
+
+def test_lease_from_terms_json_renders_the_terms():
+    response = json.dumps({"tenant": "Acme Corp", "monthly_rent": 10000, "term_months": 36, "commencement_date": "2025-01-01"})
+    lease = "".join(lease_from_terms_json(response, TODAY))
+    assert "Acme Corp" in lease
+    assert "$10,000" in lease
+    assert "December 31, 2027" in lease
@@ -0,0 +1,103 @@
+import threading
+import time
+
+from utils import rate_limiter
+from utils.rate_limiter import AIMDConcurrency, RateLimiter, TokenBucket, estimate_request_tokens, get_rate_limiter
+
+
+def test_token_bucket_paces_after_burst():
+    bucket = TokenBucket(per_minute=600, burst_seconds=0.1)  # 10/s, burst of 1
+    assert bucket.acquire() == 0.0
+    started = time.monotonic()
+    bucket.acquire()
+    assert time.monotonic() - started >= 0.05
+
+
+def test_token_bucket_adjust_charges_and_refunds():
+    bucket = TokenBucket(per_minute=60, burst_seconds=10)
+    bucket.acquire(5)
+    bucket.adjust(3)
+    assert bucket.tokens < 3
+    bucket.adjust(-100)
+    assert bucket.tokens == bucket.capacity
+
+
+def test_token_bucket_charges_requests_larger_than_a_burst_in_full():
+    bucket = TokenBucket(per_minute=6000, burst_seconds=1)  # capacity 100
+    assert bucket.acquire(250) == 0.0
+    assert bucket.tokens == -150
+    # Settling against the full estimate keeps the balance right
+    bucket.adjust(-250)
+    assert bucket.tokens == 100
+
+
+def test_long_requests_do_not_shrink_concurrency():
+    aimd = AIMDConcurrency(initial=8, maximum=64)
+    # Latency grows with the request's size: the same seconds per token throughout
+    for latency, tokens in ((0.1, 1000), (0.1, 1000), (5.0, 50000), (9.0, 90000), (0.1, 1000)):
+        aimd.acquire()
+        aimd.release(latency, tokens=tokens)
+    assert aimd.limit > 8
+
+
+def test_latency_spike_per_token_cuts_the_limit():
+    aimd = AIMDConcurrency(initial=8, maximum=64)
+    for _ in range(3):
+        aimd.acquire()
+        aimd.release(0.1, tokens=1000)
+    limit = aimd.limit
+    aimd.acquire()
+    aimd.release(2.0, tokens=1000)
+    assert aimd.limit == limit * 0.5
+
+
+def test_latency_spikes_can_be_disabled():
+    aimd = AIMDConcurrency(initial=8, maximum=64, spike_factor=0)
+    for latency in (0.1, 0.1, 5.0):
+        aimd.acquire()
+        aimd.release(latency, tokens=1000)
+    assert aimd.limit > 8
+
+
+def test_throttling_halves_once_per_round_trip():
+    aimd = AIMDConcurrency(initial=8, maximum=64)
+    aimd.acquire()
+    aimd.release(1.0)
+    limit = aimd.limit
+    for _ in range(5):
+        aimd.acquire()
+        aimd.release(1.0, throttled=True)
+    assert aimd.limit == limit * 0.5
+
+
+def test_limit_bounds_in_flight():
+    aimd = AIMDConcurrency(initial=2, maximum=2)
+    aimd.acquire()
+    aimd.acquire()
+    admitted = threading.Event()
+    threading.Thread(target=lambda: (aimd.acquire(), admitted.set()), daemon=True).start()
+    assert not admitted.wait(0.1)
+    aimd.release(0.01)
+    assert admitted.wait(1)
+
+
+def test_slot_refunds_tokens_of_throttled_attempts():
+    limiter = RateLimiter(rpm=0, tpm=6000)
+    before = limiter.tokens.tokens
+    with limiter.slot(estimated_tokens=50) as outcome:
+        outcome["throttled"] = True
+    assert limiter.tokens.tokens == before
+
+
+def test_each_backend_has_its_own_limiter():
+    gemini = get_rate_limiter("gemini")
+    openai = get_rate_limiter("openai")
+    assert gemini is get_rate_limiter()
+    assert openai is not gemini
+    configured = rate_limiter.configure(rpm=60, backend="openai")
+    assert get_rate_limiter("openai") is configured
+    assert get_rate_limiter("gemini") is gemini
+
+
+def test_estimate_request_tokens():
+    assert estimate_request_tokens(4000) == 1000 + rate_limiter.EXPECTED_OUTPUT_TOKENS
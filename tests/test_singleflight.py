@@ -0,0 +1,74 @@
+import threading
+import time
+
+from utils.singleflight import SingleFlight
+
+
+def wait_for_waiters(flight, call, count, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        with flight._lock:
+            if call.waiters >= count:
+                return
+        time.sleep(0.001)
+    raise AssertionError("followers did not join the call")
+
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "answer"
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do("key", fetch)))
+    leader.start()
+    assert started.wait(5)
+    followers = [threading.Thread(target=lambda: results.append(flight.do("key", fetch))) for _ in range(3)]
+    for thread in followers:
+        thread.start()
+    # Followers register before the leader is released
+    wait_for_waiters(flight, flight._calls["key"], 3)
+    release.set()
+    for thread in [leader] + followers:
+        thread.join(5)
+    assert len(calls) == 1
+    assert sorted(results) == [("answer", False)] + [("answer", True)] * 3
+    assert len(flight) == 0
+
+
+def test_different_keys_do_not_coalesce():
+    flight = SingleFlight()
+    assert flight.do("a", lambda: 1) == (1, False)
+    assert flight.do("b", lambda: 2) == (2, False)
+
+
+def test_completed_calls_are_not_remembered():
+    flight = SingleFlight()
+    flight.do("key", lambda: "first")
+    assert flight.do("key", lambda: "second") == ("second", False)
+
+
+def test_follower_runs_itself_when_the_leader_fails():
+    flight = SingleFlight()
+    call, leader = flight.begin("key")
+    assert leader
+    follower, follower_leads = flight.begin("key")
+    assert not follower_leads
+    flight.finish("key", call, None)
+    assert flight.wait(follower) is None
+    # do() falls back to its own call in that case
+    call, _ = flight.begin("other")
+    result = []
+    thread = threading.Thread(target=lambda: result.append(flight.do("other", lambda: "own")))
+    thread.start()
+    wait_for_waiters(flight, call, 1)
+    flight.finish("other", call, None)
+    thread.join(5)
+    assert result == [("own", False)]
@@ -0,0 +1,61 @@
+import re
+
+# Lines that open a new lease section: "12. Rent", "ARTICLE IV", "Section 3.2", "EXHIBIT B", ...
+SECTION_HEADING = re.compile(
+    r"^[ \t]*(?:\d+(?:\.\d+)*\.?[ \t]+\S|(?:ARTICLE|Article|SECTION|Section|EXHIBIT|Exhibit|SCHEDULE|Schedule|ADDENDUM|Addendum)\b)",
+    re.MULTILINE,
+)
+PAGE_BREAK = "\f"
+
+
+def split_into_sections(text):
+    """
+    Split lease text on page and section boundaries.
+
+    Pages are separated by form feeds when present; within each page a new
+    section starts at every heading line. Concatenating the result gives back
+    the original text.
+    """
+    sections = []
+    pages = text.split(PAGE_BREAK)
+    for page_number, page in enumerate(pages):
+        if page_number < len(pages) - 1:
+            page += PAGE_BREAK
+        starts = [m.start() for m in SECTION_HEADING.finditer(page)]
+        if not starts or starts[0] != 0:
+            starts.insert(0, 0)
+        for start, end in zip(starts, starts[1:] + [len(page)]):
+            if end > start:
+                sections.append(page[start:end])
+    return sections
+
+
+def split_oversized(section, max_chars):
+    """Break a section longer than max_chars on paragraph, then line, then hard boundaries."""
+    for separator in ("\n\n", "\n"):
+        parts = section.split(separator)
+        if len(parts) > 1:
+            pieces = [part + separator for part in parts[:-1]] + [parts[-1]]
+            return [piece for part in pieces for piece in (split_oversized(part, max_chars) if len(part) > max_chars else [part])]
+    return [section[i:i + max_chars] for i in range(0, len(section), max_chars)]
+
+
+def chunk_text(text, max_chars):
+    """
+    Pack consecutive sections into chunks of at most max_chars characters.
+
+    Sections are never split unless a single section is itself larger than
+    max_chars, in which case it is broken on paragraph boundaries first.
+    """
+    chunks = []
+    current = ""
+    for section in split_into_sections(text):
+        pieces = split_oversized(section, max_chars) if len(section) > max_chars else [section]
+        for piece in pieces:
+            if current and len(current) + len(piece) > max_chars:
+                chunks.append(current)
+                current = ""
+            current += piece
+    if current.strip():
+        chunks.append(current)
+    return chunks
@@ -0,0 +1,157 @@
+import hashlib
+import math
+import os
+import re
+import threading
+from collections import Counter, OrderedDict, defaultdict
+from dotenv import load_dotenv
+
+from utils.chunking import split_into_sections, split_oversized
+
+# Load environment variables
+load_dotenv()
+
+CLAUSE_INDEX_ENABLED = os.getenv("CRE_CLAUSE_INDEX", "1") != "0"
+# Clauses longer than this are split on paragraph boundaries so one giant section does not dominate
+MAX_CLAUSE_CHARS = int(os.getenv("CRE_CLAUSE_MAX_CHARS", "2000"))
+# Indexes kept per process (one per distinct document or stage input)
+CLAUSE_INDEX_ENTRIES = int(os.getenv("CRE_CLAUSE_INDEX_ENTRIES", "64"))
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# What each question looks for, keyed like utils.lease_fastpath.EXTRACTION_ITEMS plus the later stages
+CLAUSE_QUERIES = {
+    "address": "premises property located address street suite building floor square feet",
+    "parties": "between landlord tenant lessor lessee party parties company corporation llc inc",
+    "term": "term commence commencement begin expire expiration end date years months",
+    "rent": "rent base monthly annual payment pay due installment escalation increase deposit",
+    "renewal_termination": "renew renewal option extend extension terminate termination early cancel notice",
+    "deadlines": "notice days prior deadline due date expiration renewal written later than within",
+    "workflow": "renewal notice deadline expiration termination date rent due payment signature approval insurance",
+    "value": "hours manual automation rent payment renewal risk penalty late fee default notice",
+}
+
+_WORD = re.compile(r"[a-z0-9]+")
+_SUFFIXES = ("ations", "ation", "ings", "ing", "ates", "ated", "ate", "als", "al", "ed", "es", "s")
+
+# Content hash -> ClauseIndex, least recently used first
+_indexes = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def _stem(word):
+    # Crude suffix stripping: "renewal"/"renewed"/"renews" and "termination"/"terminate" meet
+    for suffix in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 4:
+            return word[:-len(suffix)]
+    return word
+
+
+def tokenize(text):
+    return [_stem(word) for word in _WORD.findall(text.lower())]
+
+
+def segment_clauses(text, max_chars=MAX_CLAUSE_CHARS):
+    """
+    Split lease text into clauses: section boundaries first, then paragraphs
+    for sections longer than `max_chars`. Concatenating the result gives back the text.
+    """
+    clauses = []
+    for section in split_into_sections(text):
+        clauses.extend(split_oversized(section, max_chars) if len(section) > max_chars else [section])
+    return clauses
+
+
+class ClauseIndex:
+    """
+    Inverted index over one document's clauses, ranked with BM25.
+
+    Built once per document text (see get_clause_index); queries only touch
+    the postings of their own terms.
+    """
+
+    def __init__(self, text, max_chars=MAX_CLAUSE_CHARS):
+        self.clauses = segment_clauses(text, max_chars)
+        self.postings = defaultdict(list)  # term -> [(clause number, term frequency)]
+        self.lengths = []
+        for number, clause in enumerate(self.clauses):
+            counts = Counter(tokenize(clause))
+            self.lengths.append(sum(counts.values()))
+            for term, frequency in counts.items():
+                self.postings[term].append((number, frequency))
+        self.average_length = sum(self.lengths) / len(self.lengths) if self.lengths else 0.0
+
+    def rank(self, query):
+        """Return [(score, clause number)] for clauses matching any query term, best first."""
+        scores = defaultdict(float)
+        total = len(self.clauses)
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+            for number, frequency in postings:
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[number] / (self.average_length or 1))
+                scores[number] += idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+        return sorted(((score, number) for number, score in scores.items()), reverse=True)
+
+    def select(self, queries, budget_chars, keep_first=True):
+        """
+        Pick the top-ranked clauses for several questions within a character budget.
+
+        Questions take turns choosing their next best clause, so each one gets
+        a share of the budget. The first clause (the preamble naming the
+        parties and premises) is kept when `keep_first` is set.
+
+        Returns:
+            str: The chosen clauses concatenated in document order
+        """
+        chosen = set()
+        used = 0
+        if keep_first and self.clauses:
+            chosen.add(0)
+            used = len(self.clauses[0])
+        rankings = [[number for _, number in self.rank(query)] for query in queries]
+        while any(rankings):
+            for ranking in rankings:
+                while ranking and ranking[0] in chosen:
+                    ranking.pop(0)
+                if not ranking:
+                    continue
+                number = ranking.pop(0)
+                if used + len(self.clauses[number]) <= budget_chars:
+                    chosen.add(number)
+                    used += len(self.clauses[number])
+        return "".join(self.clauses[number] for number in sorted(chosen))
+
+
+def get_clause_index(text):
+    """Return the ClauseIndex for `text`, building it on first use and caching it by content hash."""
+    key = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is not None:
+            _indexes.move_to_end(key)
+            return index
+    # Built outside the lock; two threads racing on a new text both build, one result is kept
+    index = ClauseIndex(text)
+    with _indexes_lock:
+        _indexes[key] = index
+        _indexes.move_to_end(key)
+        while len(_indexes) > CLAUSE_INDEX_ENTRIES:
+            _indexes.popitem(last=False)
+    return index
+
+
+def relevant_text(text, topics, budget_chars):
+    """
+    Reduce `text` to its clauses most relevant to `topics` (CLAUSE_QUERIES keys).
+
+    Text already within `budget_chars`, or any text when CRE_CLAUSE_INDEX=0,
+    is returned unchanged.
+    """
+    if not CLAUSE_INDEX_ENABLED or len(text) <= budget_chars:
+        return text
+    return get_clause_index(text).select([CLAUSE_QUERIES[topic] for topic in topics], budget_chars)
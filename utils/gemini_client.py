@@ -1,27 +1,66 @@
-import requests
+import asyncio
+import functools
+import json
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
+from utils.chunking import chunk_text
+from utils.clause_index import relevant_text
+from utils.gemini_transport import POOL_SIZE, post_json
+from utils.lease_fastpath import EXTRACTION_ITEMS, MIN_CONFIDENCE, covered_items, extract_fields, format_fields
+from utils.lease_templates import LEASE_TERMS_CONFIG, lease_from_terms_json, terms_prompt
+from utils.metrics import run_in_context, span
+from utils.rate_limiter import get_rate_limiter
+from utils.response_cache import get_default_cache, make_cache_key
+from utils.singleflight import SingleFlight
+from utils.value_metrics import VALUE_CONFIG, VALUE_INSTRUCTIONS, parse_value
+
 # Load environment variables
 load_dotenv()
 
-# Define the base URL and model name
-BASE_URL = "https://generativelanguage.googleapis.com/v1beta/models"
+# Define the base URL and model name (GEMINI_BASE_URL can point at a proxy or bench/mock_gemini_server.py)
+BASE_URL = os.getenv("GEMINI_BASE_URL", "https://generativelanguage.googleapis.com/v1beta/models")
 MODEL_NAME = "gemini-2.0-flash"
 API_KEY = os.getenv("GEMINI_API_KEY")
 
-def make_gemini_request(prompt):
-    """
-    Make a request to the Gemini API with the given prompt.
-    
-    Args:
-        prompt (str): The prompt to send to the Gemini API
-        
-    Returns:
-        str: The text response from the Gemini API
-    """
-    url = f"{BASE_URL}/{MODEL_NAME}:generateContent?key={API_KEY}"
-    headers = {"Content-Type": "application/json"}
+# Worker threads that run the async API's calls (single requests, stages or whole document chains)
+ASYNC_WORKERS = int(os.getenv("GEMINI_ASYNC_WORKERS", str(POOL_SIZE)))
+
+# Documents longer than this are extracted chunk by chunk (map) and merged (reduce)
+CHUNK_THRESHOLD_CHARS = int(os.getenv("CRE_CHUNK_THRESHOLD_CHARS", "60000"))
+CHUNK_SIZE_CHARS = int(os.getenv("CRE_CHUNK_SIZE_CHARS", "20000"))
+CHUNK_WORKERS = int(os.getenv("CRE_CHUNK_WORKERS", "8"))
+
+# Fill standard lease fields with local patterns and only ask the LLM for the rest
+FAST_PATH_ENABLED = os.getenv("CRE_FAST_PATH", "1") != "0"
+FAST_PATH_MIN_CONFIDENCE = float(os.getenv("CRE_FAST_PATH_MIN_CONFIDENCE", str(MIN_CONFIDENCE)))
+EXTRACTION_LABELS = [label for _, label, _ in EXTRACTION_ITEMS]
+
+# Long inputs are cut down to their most relevant clauses (utils.clause_index) within these budgets
+CLAUSE_BUDGET_CHARS = int(os.getenv("CRE_CLAUSE_BUDGET_CHARS", "16000"))
+STAGE_INPUT_BUDGET_CHARS = int(os.getenv("CRE_STAGE_INPUT_BUDGET_CHARS", "6000"))
+
+# Short leases are packed into one extraction request up to this many prompt tokens / documents
+PACK_TOKEN_BUDGET = int(os.getenv("CRE_PACK_TOKEN_BUDGET", "8000"))
+PACK_MAX_DOCUMENTS = int(os.getenv("CRE_PACK_MAX_DOCUMENTS", "16"))
+
+# Send calls through utils.llm_router (latency-aware model/provider selection) instead of MODEL_NAME only
+ROUTER_ENABLED = os.getenv("CRE_ROUTER", "0") == "1"
+
+# Generate leases from local clause templates, asking the LLM only for the terms in the description
+TEMPLATE_LEASES_ENABLED = os.getenv("CRE_TEMPLATE_LEASES", "1") != "0"
+
+# Concurrent identical requests (same model, config and prompt) share one API call
+SINGLE_FLIGHT_ENABLED = os.getenv("CRE_SINGLE_FLIGHT", "1") != "0"
+
+_inflight = SingleFlight()
+_executor = None
+_executor_lock = threading.Lock()
+
+def _build_payload(prompt, generation_config=None):
     payload = {
         "contents": [
             {
@@ -31,50 +70,294 @@ def make_gemini_request(prompt):
             }
         ]
     }
+    if generation_config:
+        payload["generationConfig"] = generation_config
+    return payload
+
+def _record_usage(record, data):
+    """Copy usageMetadata token counts from a GenerateContentResponse into a span record."""
+    usage = data.get("usageMetadata") or {}
+    for field, key in (("promptTokenCount", "prompt_tokens"), ("candidatesTokenCount", "output_tokens"), ("totalTokenCount", "total_tokens")):
+        if field in usage:
+            record[key] = usage[field]
+
+def _settle_tokens(record):
+    """Correct the rate limiter's tokens/min reservation with the usage the API reported."""
+    limiter = get_rate_limiter()
+    if limiter is not None and "estimated_tokens" in record:
+        limiter.settle(record["estimated_tokens"], record.get("total_tokens"))
+
+def make_gemini_request(prompt, generation_config=None, use_cache=True, stream=False, hedge=False, model=None, coalesce=True):
+    """
+    Make a request to the Gemini API with the given prompt.
     
-    try:
-        response = requests.post(url, headers=headers, json=payload)
-        response.raise_for_status()  # Raise an exception for HTTP errors
-        return response.json()["candidates"][0]["content"]["parts"][0]["text"]
-    except Exception as e:
-        print(f"Error making request to Gemini API: {e}")
-        return f"Error: {str(e)}"
-
-def generate_lease_from_prompt(prompt):
-    """Generate a lease agreement from a simple description"""
-    lease_prompt = f"""
+    Args:
+        prompt (str): The prompt to send to the Gemini API
+        generation_config (dict, optional): Gemini generationConfig for the request
+        use_cache (bool): Serve identical requests from the on-disk response cache
+        stream (bool): Use streamGenerateContent and return an iterator of text chunks
+        hedge (bool): Route through the LLM router and send a duplicate request if this one
+            runs past the backend's p95 latency (hedged calls arrive as a single chunk)
+        model (str, optional): Call this Gemini model directly, bypassing the router
+        
+    Returns:
+        str: The text response from the Gemini API (an iterator of chunks when stream=True)
+    """
+    if model is None and (hedge or ROUTER_ENABLED):
+        # Imported here because the router is built on top of this module
+        from utils.llm_router import get_router
+        router = get_router()
+        if stream and not hedge:
+            return router.stream(prompt, generation_config=generation_config, use_cache=use_cache)
+        text = router.request(prompt, generation_config, use_cache=use_cache, hedge=hedge)
+        return iter([text]) if stream else text
+    model = model or MODEL_NAME
+
+    if stream:
+        return make_gemini_request_stream(prompt, generation_config=generation_config, use_cache=use_cache, model=model, coalesce=coalesce)
+
+    with span("gemini.request", model=model, prompt_chars=len(prompt)) as record:
+        cache_key = make_cache_key(model, generation_config, prompt)
+        cache = get_default_cache() if use_cache else None
+        if cache is not None:
+            cached = cache.get(cache_key)
+            record["cache_hit"] = cached is not None
+            if cached is not None:
+                record["response_chars"] = len(cached)
+                return cached
+
+        def fetch():
+            url = f"{BASE_URL}/{model}:generateContent?key={API_KEY}"
+            payload = _build_payload(prompt, generation_config)
+            try:
+                # Pooled session with timeouts; retries 429/5xx before giving up
+                response = post_json(url, payload, record=record)
+                record["response_bytes"] = len(response.content)
+                data = response.json()
+                _record_usage(record, data)
+                _settle_tokens(record)
+                text = data["candidates"][0]["content"]["parts"][0]["text"]
+            except Exception as e:
+                record["error"] = str(e)
+                return f"Error: {str(e)}"
+            record["response_chars"] = len(text)
+
+            # Only successful responses are cached so transient failures are retried next time
+            if cache is not None:
+                cache.set(cache_key, text, model=model)
+            return text
+
+        if not (SINGLE_FLIGHT_ENABLED and coalesce):
+            return fetch()
+        # Identical calls already in flight (other sessions, duplicate batch documents) wait for that one
+        text, record["coalesced"] = _inflight.do(cache_key, fetch)
+        if record["coalesced"]:
+            record["response_chars"] = len(text)
+        return text
+
+def make_gemini_request_stream(prompt, generation_config=None, use_cache=True, model=None, coalesce=True):
+    """
+    Stream a Gemini response chunk by chunk via streamGenerateContent.
+    
+    A cache hit yields the whole cached response as a single chunk. A completed
+    stream is written to the same cache entry as the non-streaming call, so the
+    two modes share results.
+    
+    Yields:
+        str: Text chunks in arrival order (a single "Error: ..." chunk on failure)
+    """
+    started = time.perf_counter()
+    model = model or MODEL_NAME
+    with span("gemini.request", model=model, prompt_chars=len(prompt), stream=True) as record:
+        cache_key = make_cache_key(model, generation_config, prompt)
+        cache = get_default_cache() if use_cache else None
+        if cache is not None:
+            cached = cache.get(cache_key)
+            record["cache_hit"] = cached is not None
+            if cached is not None:
+                record["response_chars"] = len(cached)
+                yield cached
+                return
+
+        call, leader = _inflight.begin(cache_key) if SINGLE_FLIGHT_ENABLED and coalesce else (None, True)
+        if not leader:
+            # An identical request is already in flight: its full text arrives as one chunk
+            shared = _inflight.wait(call)
+            if shared is not None:
+                record["coalesced"] = True
+                record["response_chars"] = len(shared)
+                yield shared
+                return
+            call = None
+
+        url = f"{BASE_URL}/{model}:streamGenerateContent?alt=sse&key={API_KEY}"
+        chunks = []
+        result = None
+        try:
+            try:
+                response = post_json(url, _build_payload(prompt, generation_config), stream=True, record=record)
+                with response:
+                    # SSE bodies are UTF-8; requests would otherwise assume ISO-8859-1 for text/event-stream
+                    response.encoding = "utf-8"
+                    response_bytes = 0
+                    # Server-sent events: each "data:" line carries one GenerateContentResponse
+                    for line in response.iter_lines(decode_unicode=True):
+                        if not line or not line.startswith("data:"):
+                            continue
+                        response_bytes += len(line)
+                        event = json.loads(line[len("data:"):])
+                        if "time_to_first_chunk_s" not in record:
+                            record["time_to_first_chunk_s"] = round(time.perf_counter() - started, 6)
+                        # Usage is cumulative; the last event carries the final counts
+                        _record_usage(record, event)
+                        for candidate in event.get("candidates", [])[:1]:
+                            for part in candidate.get("content", {}).get("parts", []):
+                                text = part.get("text")
+                                if text:
+                                    chunks.append(text)
+                                    yield text
+                    record["response_bytes"] = response_bytes
+                    _settle_tokens(record)
+            except Exception as e:
+                record["error"] = str(e)
+                result = f"Error: {str(e)}"
+                yield result
+                return
+            result = "".join(chunks)
+            record["response_chars"] = len(result)
+
+            if cache is not None and chunks:
+                cache.set(cache_key, result, model=model)
+        finally:
+            # A stream abandoned by its consumer publishes None, so waiters make their own call
+            if call is not None and leader:
+                _inflight.finish(cache_key, call, result)
+
+def estimate_tokens(text):
+    """Rough token count for budgeting and throughput reporting (about 4 characters per token)."""
+    return (len(text) + 3) // 4
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=ASYNC_WORKERS, thread_name_prefix="gemini")
+    return _executor
+
+async def run_blocking(func, *args, **kwargs):
+    """
+    Await a blocking client call on the shared worker pool.
+
+    Every async API is a thin wrapper over its sync counterpart run this way:
+    the calls share the pooled session, cache and retry policy, and many
+    coroutines can have calls in flight without blocking the event loop.
+    The caller's context is carried into the worker thread, so its spans are collected.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), run_in_context(functools.partial(func, *args, **kwargs)))
+
+async def make_gemini_request_async(prompt, generation_config=None, use_cache=True, hedge=False):
+    """Async version of make_gemini_request"""
+    return await run_blocking(make_gemini_request, prompt, generation_config, use_cache=use_cache, hedge=hedge)
+
+async def gather_with_concurrency(coroutines, max_concurrency):
+    """Await coroutines concurrently, at most `max_concurrency` at a time, preserving order."""
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def run(coroutine):
+        async with semaphore:
+            return await coroutine
+
+    return await asyncio.gather(*(run(c) for c in coroutines))
+
+def _lease_prompt(prompt):
+    return f"""
 You're a commercial real estate legal assistant. Based on this description, generate a realistic lease agreement:
 
 {prompt}
 
 Format as a standard lease agreement with all the typical sections and clauses.
 """
-    return make_gemini_request(lease_prompt)
 
-def extract_key_info(document_text):
-    """Extract key information from a lease document"""
-    prompt = f"""
+def _checklist(items):
+    return "\n".join(f"- {item}" for item in items)
+
+def _extract_prompt(document_text, items=EXTRACTION_LABELS):
+    return f"""
 You're an AI assistant for commercial real estate.
 
 Extract key info from the following lease agreement:
-- Property address
-- Parties involved
-- Lease term and dates
-- Rent details
-- Any renewal or termination clauses
-- Any key deadlines
+{_checklist(items)}
 
 Document:
 {document_text}
 """
-    return make_gemini_request(prompt)
 
-def generate_workflow(extracted_info):
-    """Generate a workflow based on extracted lease information"""
-    prompt = f"""
+def _extract_chunk_prompt(chunk, index, total, items=EXTRACTION_LABELS):
+    return f"""
+You're an AI assistant for commercial real estate.
+
+This is part {index} of {total} of a longer lease agreement. Extract any of the following
+that appear in this part, quoting amounts, dates and notice periods exactly:
+{_checklist(items)}
+
+Skip items that do not appear in this part. Do not guess.
+
+Lease excerpt:
+{chunk}
+"""
+
+def _reduce_prompt(partials, items=EXTRACTION_LABELS):
+    sections = "\n\n".join(f"--- Part {i} ---\n{partial}" for i, partial in enumerate(partials, 1))
+    return f"""
+You're an AI assistant for commercial real estate.
+
+The notes below were extracted from consecutive parts of one lease agreement.
+Merge them into a single summary of key info, resolving duplicates and keeping
+the most specific values:
+{_checklist(items)}
+
+{sections}
+"""
+
+def _packed_extract_prompt(entries):
+    documents = "\n\n".join(
+        f"=== Document {document_id} ===\nExtract:\n{_checklist(items)}\n\n{text}"
+        for document_id, text, items in entries
+    )
+    return f"""
+You're an AI assistant for commercial real estate.
+
+Below are {len(entries)} separate lease agreements, each introduced by its document id and
+the checklist of key info to extract from it. Treat every document on its own.
+
+Return a JSON array with one object per document: its "document_id" and, as "key_info",
+a bullet-point summary of the requested items for that document only.
+
+{documents}
+"""
+
+PACKED_EXTRACTION_CONFIG = {
+    "responseMimeType": "application/json",
+    "responseSchema": {
+        "type": "ARRAY",
+        "items": {
+            "type": "OBJECT",
+            "properties": {
+                "document_id": {"type": "STRING"},
+                "key_info": {"type": "STRING"},
+            },
+            "required": ["document_id", "key_info"],
+        },
+    },
+}
+
+def _workflow_prompt(extracted_info):
+    return f"""
 Based on this lease agreement info:
 
-{extracted_info}
+{relevant_text(extracted_info, ["workflow"], STAGE_INPUT_BUDGET_CHARS)}
 
 Suggest a 4–6 step automation workflow using tools like:
 - Salesforce
@@ -85,11 +368,9 @@ Suggest a 4–6 step automation workflow using tools like:
 Include the purpose of each step.
 Format as a numbered list with clear step titles.
 """
-    return make_gemini_request(prompt)
 
-def estimate_value(extracted_info, workflow_text):
-    """Estimate the business value of the proposed workflow"""
-    prompt = f"""
+def _value_prompt(extracted_info, workflow_text):
+    return f"""
 Based on the following workflow:
 
 {workflow_text}
@@ -98,6 +379,296 @@ Estimate:
 - Hours saved
 - Risk or error avoided
 - Which teams benefit most
-Return in 3 bullet points.
+
+{VALUE_INSTRUCTIONS}
 """
-    return make_gemini_request(prompt)
+
+def _template_lease(terms_text):
+    """Render the lease for a terms-parsing response; None when the response is unusable."""
+    with span("stage.lease.template") as record:
+        try:
+            parts = lease_from_terms_json(terms_text)
+        except ValueError:
+            record["fallback"] = True
+            return None
+        record["output_chars"] = sum(len(part) for part in parts)
+        return parts
+
+def generate_lease_from_prompt(prompt, stream=False, use_cache=True, hedge=False):
+    """
+    Generate a lease agreement from a simple description.
+
+    With CRE_TEMPLATE_LEASES on (the default) the LLM only returns the terms
+    as a small JSON object and the agreement is assembled from
+    utils.lease_templates; a response that cannot be parsed falls back to
+    free-form generation.
+
+    Args:
+        prompt (str): Description of the lease (parties, property, rent, term, ...)
+        stream (bool): Return an iterator of text chunks instead of the full text
+        use_cache (bool): Serve and store responses in the response cache
+        hedge (bool): Race a duplicate request after a delay
+
+    Returns:
+        str | iterator: The lease text, or its chunks when streaming
+    """
+    if TEMPLATE_LEASES_ENABLED:
+        terms_text = make_gemini_request(terms_prompt(prompt), LEASE_TERMS_CONFIG, use_cache=use_cache, hedge=hedge)
+        parts = [terms_text] if terms_text.startswith("Error:") else _template_lease(terms_text)
+        if parts is not None:
+            return iter(parts) if stream else "".join(parts)
+    return make_gemini_request(_lease_prompt(prompt), use_cache=use_cache, stream=stream, hedge=hedge)
+
+def fast_path_split(document_text):
+    """
+    Run the local rule-based extractor over a lease.
+    
+    Returns:
+        tuple: (local summary text for confidently filled items,
+            EXTRACTION_ITEMS keys still needing the LLM)
+    """
+    if not FAST_PATH_ENABLED:
+        return "", [key for key, _, _ in EXTRACTION_ITEMS]
+    fields = extract_fields(document_text)
+    covered = covered_items(fields, FAST_PATH_MIN_CONFIDENCE)
+    missing = [key for key, _, _ in EXTRACTION_ITEMS if key not in covered]
+    return format_fields(fields, covered), missing
+
+def extraction_labels(keys):
+    return [label for key, label, _ in EXTRACTION_ITEMS if key in keys]
+
+def merge_with_fast_path(local, llm_text):
+    """Prepend the fast-path summary to the LLM's answer for the remaining items."""
+    # Errors stay bare so callers can still detect the "Error: ..." convention
+    if not local or llm_text.startswith("Error:"):
+        return llm_text
+    return f"{local}\n{llm_text}"
+
+def merge_stream_with_fast_path(local, chunks):
+    """Streaming merge_with_fast_path: the summary is only sent once the LLM's first chunk is not an error."""
+    chunks = iter(chunks)
+    first = next(chunks, "")
+    # A failed call streams a bare "Error: ..." so memoized_stream and the job queue still see it
+    if local and not first.startswith("Error:"):
+        yield f"{local}\n"
+    yield first
+    yield from chunks
+
+def extraction_text(document_text, keys):
+    """
+    The part of a lease the extraction stage sends for checklist `keys`.
+
+    Leases past CHUNK_THRESHOLD_CHARS are returned whole for the chunked
+    map-reduce path; shorter ones are cut to the clauses that answer `keys`,
+    up to CLAUSE_BUDGET_CHARS.
+    """
+    if len(document_text) > CHUNK_THRESHOLD_CHARS:
+        return document_text
+    return relevant_text(document_text, keys, CLAUSE_BUDGET_CHARS)
+
+def extract_with_fast_path(document_text, build_prompt=None, stream=False, use_cache=True, hedge=False):
+    """
+    The extraction stage shared by the app and agent_backend.
+
+    Fast-path fields come first; the LLM is only asked for the checklist items
+    the patterns could not fill, with the clauses that answer them, or through
+    the chunked map-reduce for long leases.
+
+    Args:
+        document_text (str): The raw lease text
+        build_prompt (callable, optional): (document text, missing keys) -> prompt;
+            defaults to this module's extraction prompt
+        stream (bool): Return the LLM part as an iterator of text chunks
+
+    Returns:
+        tuple: (fast-path summary, EXTRACTION_ITEMS keys left to the LLM,
+            LLM text or chunk iterator; "" when no key is missing)
+    """
+    local, missing_keys = fast_path_split(document_text)
+    if not missing_keys:
+        return local, missing_keys, ""
+    # Only the clauses that answer the missing checklist items are sent, unless the lease is chunked
+    document_text = extraction_text(document_text, missing_keys)
+    if len(document_text) > CHUNK_THRESHOLD_CHARS:
+        llm = extract_key_info_chunked(document_text, stream=stream, use_cache=use_cache, items=extraction_labels(missing_keys), hedge=hedge)
+    else:
+        prompt = build_prompt(document_text, missing_keys) if build_prompt else _extract_prompt(document_text, extraction_labels(missing_keys))
+        llm = make_gemini_request(prompt, use_cache=use_cache, stream=stream, hedge=hedge)
+    return local, missing_keys, llm
+
+def extract_key_info(document_text, stream=False, use_cache=True, hedge=False):
+    """Extract key information from a lease document"""
+    local, missing_keys, llm = extract_with_fast_path(document_text, stream=stream, use_cache=use_cache, hedge=hedge)
+    if not missing_keys:
+        # Every checklist item was filled confidently by the local fast path: no API call
+        return iter([local]) if stream else local
+    if stream:
+        return merge_stream_with_fast_path(local, llm)
+    return merge_with_fast_path(local, llm)
+
+def pack_documents(token_counts, token_budget=PACK_TOKEN_BUDGET, max_documents=PACK_MAX_DOCUMENTS):
+    """
+    Group documents, in order, into packs whose token counts sum to at most `token_budget`.
+    
+    Returns:
+        list[list[int]]: Indexes into `token_counts`, one list per request
+    """
+    packs = []
+    current, used = [], 0
+    for index, tokens in enumerate(token_counts):
+        if current and (used + tokens > token_budget or len(current) >= max_documents):
+            packs.append(current)
+            current, used = [], 0
+        current.append(index)
+        used += tokens
+    if current:
+        packs.append(current)
+    return packs
+
+def _parse_packed(response_text, document_ids):
+    """Map document id -> key info for every well-formed entry of a packed response; malformed ones are dropped."""
+    if response_text.startswith("Error:"):
+        return {}
+    try:
+        entries = json.loads(response_text)
+    except ValueError:
+        return {}
+    parsed = {}
+    for entry in entries if isinstance(entries, list) else []:
+        if not isinstance(entry, dict):
+            continue
+        document_id, key_info = entry.get("document_id"), entry.get("key_info")
+        if document_id in document_ids and document_id not in parsed and isinstance(key_info, str) and key_info.strip():
+            parsed[document_id] = key_info
+    return parsed
+
+def _extract_pack(pack, use_cache):
+    """Extract one pack of (document text, fast-path summary, missing labels) entries; returns their key info in order."""
+    if len(pack) == 1:
+        text, local, missing = pack[0]
+        return [merge_with_fast_path(local, make_gemini_request(_extract_prompt(text, missing), use_cache=use_cache))]
+    document_ids = [f"doc-{i}" for i in range(1, len(pack) + 1)]
+    with span("stage.extract.packed", documents=len(pack)) as record:
+        entries = [(document_id, text, missing) for document_id, (text, _, missing) in zip(document_ids, pack)]
+        response_text = make_gemini_request(_packed_extract_prompt(entries), PACKED_EXTRACTION_CONFIG, use_cache=use_cache)
+        parsed = _parse_packed(response_text, document_ids)
+        record["fallbacks"] = len(pack) - len(parsed)
+    results = []
+    for document_id, (text, local, missing) in zip(document_ids, pack):
+        # A document whose entry is missing or malformed gets its own request
+        llm = parsed.get(document_id) or make_gemini_request(_extract_prompt(text, missing), use_cache=use_cache)
+        results.append(merge_with_fast_path(local, llm))
+    return results
+
+def _extract_alone(text, use_cache):
+    return [extract_key_info(text, use_cache=use_cache)]
+
+def extract_key_info_batch(documents, token_budget=PACK_TOKEN_BUDGET, use_cache=True, max_documents=PACK_MAX_DOCUMENTS):
+    """
+    Extract key information from many leases, packing short ones into shared requests.
+    
+    Short documents are dominated by per-request overhead, so documents are
+    grouped in order into requests of up to `token_budget` prompt tokens that
+    ask for a keyed JSON array, and the answer is split back per document.
+    Documents larger than the budget go through extract_key_info on their own,
+    and any document whose entry fails to parse falls back to an individual call.
+    
+    Args:
+        documents (list[str]): Raw lease texts
+        token_budget (int): Maximum estimated document tokens per packed request
+        use_cache (bool): Read and populate the response cache
+        max_documents (int): Maximum documents per packed request
+        
+    Returns:
+        list[str]: One extract_key_info result per document, in input order
+    """
+    results = [None] * len(documents)
+    small = []
+    jobs = []
+    for index, text in enumerate(documents):
+        local, missing_keys = fast_path_split(text)
+        if not missing_keys:
+            results[index] = local
+        elif estimate_tokens(text) > token_budget:
+            jobs.append(([index], functools.partial(_extract_alone, text, use_cache)))
+        else:
+            small.append((index, (text, local, extraction_labels(missing_keys))))
+    for pack in pack_documents([estimate_tokens(entry[0]) for _, entry in small], token_budget, max_documents):
+        jobs.append(([small[i][0] for i in pack], functools.partial(_extract_pack, [small[i][1] for i in pack], use_cache)))
+    if jobs:
+        with ThreadPoolExecutor(max_workers=min(CHUNK_WORKERS, len(jobs))) as pool:
+            futures = [(indexes, pool.submit(run_in_context(job))) for indexes, job in jobs]
+            for indexes, future in futures:
+                for index, value in zip(indexes, future.result()):
+                    results[index] = value
+    return results
+
+def _first_error(partials):
+    return next((p for p in partials if p.startswith("Error:")), None)
+
+def extract_key_info_chunked(document_text, chunk_chars=CHUNK_SIZE_CHARS, stream=False, use_cache=True, items=EXTRACTION_LABELS, hedge=False):
+    """
+    Map-reduce extraction for long leases.
+    
+    The text is split on page and section boundaries into chunks of at most
+    `chunk_chars`, each chunk is extracted in parallel, and a final reduce
+    call merges the partial results. Only the reduce step is streamed.
+    """
+    chunks = chunk_text(document_text, chunk_chars)
+    if len(chunks) == 1:
+        return make_gemini_request(_extract_prompt(document_text, items), use_cache=use_cache, stream=stream, hedge=hedge)
+    prompts = [_extract_chunk_prompt(chunk, i, len(chunks), items) for i, chunk in enumerate(chunks, 1)]
+    # A private pool: the shared executor may already be running this call for the async path
+    with ThreadPoolExecutor(max_workers=min(CHUNK_WORKERS, len(prompts))) as pool:
+        partials = list(pool.map(run_in_context(functools.partial(make_gemini_request, use_cache=use_cache, hedge=hedge)), prompts))
+    error = _first_error(partials)
+    if error:
+        return iter([error]) if stream else error
+    return make_gemini_request(_reduce_prompt(partials, items), use_cache=use_cache, stream=stream, hedge=hedge)
+
+def generate_workflow(extracted_info, stream=False, use_cache=True, hedge=False):
+    """Generate a workflow based on extracted lease information"""
+    return make_gemini_request(_workflow_prompt(extracted_info), use_cache=use_cache, stream=stream, hedge=hedge)
+
+def estimate_value_metrics(extracted_info, workflow_text, use_cache=True, hedge=False):
+    """
+    Estimate the business value of the proposed workflow as numbers.
+
+    Returns:
+        tuple: (bullet-point text, metrics dict from utils.value_metrics or None on error)
+    """
+    return parse_value(make_gemini_request(_value_prompt(extracted_info, workflow_text), VALUE_CONFIG, use_cache=use_cache, hedge=hedge))
+
+def estimate_value(extracted_info, workflow_text, stream=False, use_cache=True, hedge=False):
+    """Estimate the business value of the proposed workflow"""
+    # The structured response only becomes text once complete, so a stream is a single chunk
+    text, _ = estimate_value_metrics(extracted_info, workflow_text, use_cache=use_cache, hedge=hedge)
+    return iter([text]) if stream else text
+
+async def generate_lease_from_prompt_async(prompt, use_cache=True, hedge=False):
+    """Async version of generate_lease_from_prompt"""
+    return await run_blocking(generate_lease_from_prompt, prompt, use_cache=use_cache, hedge=hedge)
+
+async def extract_key_info_async(document_text, use_cache=True, hedge=False):
+    """Async version of extract_key_info"""
+    return await run_blocking(extract_key_info, document_text, use_cache=use_cache, hedge=hedge)
+
+async def extract_key_info_batch_async(documents, token_budget=PACK_TOKEN_BUDGET, use_cache=True, max_documents=PACK_MAX_DOCUMENTS):
+    """Async version of extract_key_info_batch"""
+    return await run_blocking(extract_key_info_batch, documents, token_budget, use_cache=use_cache, max_documents=max_documents)
+
+async def extract_key_info_chunked_async(document_text, chunk_chars=CHUNK_SIZE_CHARS, use_cache=True, items=EXTRACTION_LABELS, hedge=False):
+    """Async version of extract_key_info_chunked"""
+    return await run_blocking(extract_key_info_chunked, document_text, chunk_chars, use_cache=use_cache, items=items, hedge=hedge)
+
+async def generate_workflow_async(extracted_info, use_cache=True, hedge=False):
+    """Async version of generate_workflow"""
+    return await run_blocking(generate_workflow, extracted_info, use_cache=use_cache, hedge=hedge)
+
+async def estimate_value_metrics_async(extracted_info, workflow_text, use_cache=True, hedge=False):
+    """Async version of estimate_value_metrics"""
+    return await run_blocking(estimate_value_metrics, extracted_info, workflow_text, use_cache=use_cache, hedge=hedge)
+
+async def estimate_value_async(extracted_info, workflow_text, use_cache=True, hedge=False):
+    """Async version of estimate_value"""
+    return await run_blocking(estimate_value, extracted_info, workflow_text, use_cache=use_cache, hedge=hedge)
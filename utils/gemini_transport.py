@@ -0,0 +1,155 @@
+import json
+import os
+import random
+import threading
+import time
+from contextlib import nullcontext
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+
+from utils.metrics import incr, log_event
+from utils.rate_limiter import estimate_request_tokens, get_rate_limiter
+
+# Load environment variables
+load_dotenv()
+
+# Connection pool and timeout settings (seconds)
+POOL_SIZE = int(os.getenv("GEMINI_POOL_SIZE", "10"))
+CONNECT_TIMEOUT = float(os.getenv("GEMINI_CONNECT_TIMEOUT", "5"))
+READ_TIMEOUT = float(os.getenv("GEMINI_READ_TIMEOUT", "120"))
+
+# Retry settings for 429 and 5xx responses
+MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", "4"))
+BACKOFF_BASE = float(os.getenv("GEMINI_BACKOFF_BASE", "0.5"))
+BACKOFF_MAX = float(os.getenv("GEMINI_BACKOFF_MAX", "30"))
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """Return the process-wide keep-alive session, creating it on first use."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE, max_retries=0)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                session.headers.update({"Content-Type": "application/json"})
+                _session = session
+    return _session
+
+
+def configure(pool_size=None, connect_timeout=None, read_timeout=None, max_retries=None):
+    """
+    Override transport settings at runtime.
+
+    Changing the pool size drops the current session so the next request
+    builds a new one with the requested number of pooled connections.
+    """
+    global POOL_SIZE, CONNECT_TIMEOUT, READ_TIMEOUT, MAX_RETRIES, _session
+    with _session_lock:
+        if pool_size is not None and pool_size != POOL_SIZE:
+            POOL_SIZE = pool_size
+            if _session is not None:
+                _session.close()
+            _session = None
+        if connect_timeout is not None:
+            CONNECT_TIMEOUT = connect_timeout
+        if read_timeout is not None:
+            READ_TIMEOUT = read_timeout
+        if max_retries is not None:
+            MAX_RETRIES = max_retries
+
+
+def _retry_after_seconds(response):
+    """Parse a Retry-After header given either as seconds or as an HTTP date."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt, retry_after=None):
+    """
+    Compute the sleep before retry number `attempt` (0-based).
+
+    Uses full-jitter exponential backoff, but never waits less than the
+    server's Retry-After hint.
+    """
+    delay = random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+    if retry_after is not None:
+        delay = max(delay, min(retry_after, BACKOFF_MAX))
+    return delay
+
+
+def post_json(url, payload, stream=False, record=None, headers=None, backend="gemini"):
+    """
+    POST a JSON payload through the pooled session, retrying transient failures.
+
+    Retries connection errors, timeouts, 429 and 5xx responses with jittered
+    exponential backoff. Other HTTP errors are raised immediately. Every
+    attempt is admitted by the backend's rate limiter, which paces requests
+    to the configured quotas and adapts concurrency to 429 and 5xx responses.
+
+    Args:
+        url (str): Fully qualified request URL
+        payload (dict): JSON body
+        stream (bool): Leave the response body unread for incremental consumption
+        record (dict, optional): Span record that receives request_bytes, retries and
+            estimated_tokens (the quota reserved; settle it with the reported usage)
+        headers (dict, optional): Extra request headers, e.g. Authorization for other providers
+        backend (str): Provider whose rate limiter admits the request (see get_rate_limiter)
+
+    Returns:
+        requests.Response: The successful response
+    """
+    session = get_session()
+    # Serialize once: the same body is re-sent on every retry and its size is recorded
+    body = json.dumps(payload).encode("utf-8")
+    limiter = get_rate_limiter(backend)
+    estimated_tokens = estimate_request_tokens(len(body))
+    if record is not None:
+        record["request_bytes"] = len(body)
+        record["retries"] = 0
+        record["estimated_tokens"] = estimated_tokens
+    attempt = 0
+    while True:
+        retry_after = None
+        try:
+            # Streaming responses give their slot back once the headers arrive
+            with limiter.slot(estimated_tokens) if limiter else nullcontext({}) as admission:
+                response = session.post(url, data=body, headers=headers, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT), stream=stream)
+                # Server overload, not a slow answer, is what shrinks concurrency
+                admission["throttled"] = response.status_code in RETRY_STATUS_CODES
+        except (requests.ConnectionError, requests.Timeout) as e:
+            if attempt >= MAX_RETRIES:
+                raise
+            reason = type(e).__name__
+        else:
+            if response.status_code not in RETRY_STATUS_CODES or attempt >= MAX_RETRIES:
+                response.raise_for_status()
+                return response
+            reason = response.status_code
+            retry_after = _retry_after_seconds(response)
+            response.close()
+        delay = backoff_delay(attempt, retry_after)
+        incr("gemini.retries")
+        if record is not None:
+            record["retries"] = attempt + 1
+        log_event("gemini.retry", attempt=attempt + 1, reason=reason, delay_s=round(delay, 3))
+        time.sleep(delay)
+        attempt += 1
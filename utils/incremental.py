@@ -0,0 +1,129 @@
+import difflib
+import json
+import os
+import re
+import tempfile
+import threading
+from dotenv import load_dotenv
+
+from utils.chunking import split_into_sections
+from utils.stage_memo import content_hash
+
+# Load environment variables
+load_dotenv()
+
+# Per-lease revision records (kept apart from the response cache so LRU eviction never drops them)
+REVISIONS_DIR = os.getenv("CRE_REVISIONS_DIR", ".cre_revisions")
+# Above this fraction of changed text a full re-extraction is cheaper and safer than a patch
+MAX_CHANGED_FRACTION = float(os.getenv("CRE_INCREMENTAL_MAX_CHANGED", "0.5"))
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def _normalize(text):
+    # PDF re-extraction often reflows whitespace; that alone is not an amendment
+    return " ".join(text.split())
+
+
+def hash_sections(text):
+    """
+    Split lease text into sections and hash each one.
+
+    Returns:
+        list: [hash, section text] pairs in document order
+    """
+    return [[content_hash(_normalize(section)), section] for section in split_into_sections(text) if section.strip()]
+
+
+def diff_sections(old_sections, new_sections):
+    """
+    Align two revisions' sections by hash.
+
+    Returns:
+        list: One (removed texts, added texts) pair per changed run of sections;
+            empty when every section is unchanged
+    """
+    old_hashes = [h for h, _ in old_sections]
+    new_hashes = [h for h, _ in new_sections]
+    changes = []
+    matcher = difflib.SequenceMatcher(None, old_hashes, new_hashes, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag != "equal":
+            changes.append(([text for _, text in old_sections[i1:i2]], [text for _, text in new_sections[j1:j2]]))
+    return changes
+
+
+def changed_chars(changes):
+    return sum(len(text) for removed, added in changes for text in removed + added)
+
+
+_FIELD_LINE = re.compile(r"^[\s>*#\-•\d.)]*(?P<key>[^:]{1,80}):\s*(?P<value>.*)$")
+
+
+def extracted_fields(text):
+    """
+    Parse an extraction summary ("- Label: value" lines, possibly markdown) into
+    {normalized label: normalized value}; lines without a label continue the previous field.
+    """
+    fields = {}
+    key = ""
+    for line in text.splitlines():
+        match = _FIELD_LINE.match(line.replace("**", ""))
+        if match:
+            key = _normalize(match.group("key")).lower()
+            fields[key] = _normalize(match.group("value"))
+        elif line.strip():
+            fields[key] = _normalize(f"{fields.get(key, '')} {line.strip(' -*•')}")
+    return fields
+
+
+def fields_changed(old_text, new_text):
+    """Whether two extraction summaries differ in any field, ignoring formatting and whitespace."""
+    return extracted_fields(old_text) != extracted_fields(new_text)
+
+
+class RevisionStore:
+    """
+    Last analyzed revision of each lease, keyed by a caller-chosen lease id
+    (file path, document number, ...). One JSON file per lease.
+    """
+
+    def __init__(self, directory=REVISIONS_DIR):
+        self.directory = directory
+        self._lock = threading.Lock()
+
+    def _path(self, lease_id):
+        return os.path.join(self.directory, f"{content_hash(lease_id)}.json")
+
+    def get(self, lease_id):
+        """Return the stored record for `lease_id`, or None if it was never analyzed."""
+        try:
+            with open(self._path(lease_id), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def put(self, lease_id, record):
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(dict(record, lease_id=lease_id), f, ensure_ascii=False)
+            os.replace(tmp_path, self._path(lease_id))
+
+    def delete(self, lease_id):
+        try:
+            os.remove(self._path(lease_id))
+        except FileNotFoundError:
+            pass
+
+
+def get_revision_store():
+    """Return the process-wide revision store."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = RevisionStore()
+    return _store
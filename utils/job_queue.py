@@ -0,0 +1,180 @@
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+
+from utils.metrics import collect_spans, incr, log_event
+
+# Load environment variables
+load_dotenv()
+
+# Analyses running at once across every session in the server process
+JOB_WORKERS = int(os.getenv("CRE_JOB_WORKERS", "4"))
+# Finished jobs kept for polling and reuse before the oldest are dropped
+JOB_HISTORY = int(os.getenv("CRE_JOB_HISTORY", "256"))
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+class Job:
+    """
+    One background analysis: its status, per-stage progress and partial results.
+
+    The worker reports progress through stream() and complete(); readers
+    only ever see consistent copies via snapshot().
+    """
+
+    def __init__(self, job_id, key):
+        self.id = job_id
+        self.key = key
+        self.status = "queued"
+        self.error = None
+        self.result = None
+        self.stages = OrderedDict()  # stage name -> {"status", "text"}
+        self.spans = []
+        self.created = time.time()
+        self.finished = None
+        self._lock = threading.Lock()
+
+    def _stage(self, name):
+        return self.stages.setdefault(name, {"status": "running", "text": ""})
+
+    def stream(self, name, chunks):
+        """Record a stage's chunks as they arrive; returns the full text once the stage is done."""
+        with self._lock:
+            self._stage(name)
+        for chunk in chunks:
+            with self._lock:
+                self.stages[name]["text"] += chunk
+        with self._lock:
+            self.stages[name]["status"] = "done"
+            return self.stages[name]["text"]
+
+    def complete(self, name, text):
+        """Record a stage that produced its result in one piece."""
+        with self._lock:
+            self.stages[name] = {"status": "done", "text": text}
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "id": self.id,
+                "key": self.key,
+                "status": self.status,
+                "error": self.error,
+                "result": self.result,
+                "stages": {name: dict(stage) for name, stage in self.stages.items()},
+                "spans": list(self.spans),
+                "elapsed_s": round((self.finished or time.time()) - self.created, 3),
+            }
+
+    @property
+    def done(self):
+        return self.status in ("done", "error")
+
+    def failed_stage(self, result=None):
+        """Name of the first stage (or string result field) that is an "Error: ..." string, else None."""
+        with self._lock:
+            texts = [(name, stage["text"]) for name, stage in self.stages.items()]
+        if isinstance(result, dict):
+            texts += [(name, value) for name, value in result.items() if isinstance(value, str)]
+        return next((name for name, text in texts if text.startswith("Error:")), None)
+
+
+class JobQueue:
+    """
+    In-process worker pool for long-running analyses.
+
+    Jobs are keyed (e.g. by document hash and options): submitting a key that
+    already has a queued, running or finished job returns that job instead of
+    starting another, so reruns and other users reuse its progress and results.
+    """
+
+    def __init__(self, max_workers=JOB_WORKERS, history=JOB_HISTORY):
+        self.history = history
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs = OrderedDict()  # job id -> Job, oldest first
+        self._by_key = {}
+        self._lock = threading.Lock()
+
+    def submit(self, key, func, replace=False):
+        """
+        Run `func(job)` on the worker pool unless a job for `key` already exists.
+
+        Args:
+            key (str): Identity of the work; equal keys share one job
+            func (callable): Called with the Job on a worker thread; its return value becomes job.result
+            replace (bool): Start a new job even if one exists for `key`, finished, failed
+                or not (e.g. an explicit re-run)
+
+        Returns:
+            str: The job id to poll with get()
+        """
+        with self._lock:
+            existing = self._jobs.get(self._by_key.get(key))
+            # Failed jobs are reused too: the app submits on every rerun and poll, so
+            # only an explicit re-run (replace=True) may spend API calls on a retry
+            if existing is not None and not replace:
+                incr("jobs.reused")
+                return existing.id
+            job = Job(uuid.uuid4().hex[:12], key)
+            self._jobs[job.id] = job
+            self._by_key[key] = job.id
+            self._prune()
+        incr("jobs.submitted")
+        self._executor.submit(self._run, job, func)
+        return job.id
+
+    def _run(self, job, func):
+        job.status = "running"
+        # Spans land on the job so the app can show timings while the job is still running
+        with collect_spans() as spans:
+            job.spans = spans
+            try:
+                job.result = func(job)
+                failed = job.failed_stage(job.result)
+                if failed:
+                    # Stage calls report failures as "Error: ..." text; keep the partial
+                    # result for display, but mark the job failed
+                    job.error = f"{failed} stage failed"
+                    job.status = "error"
+                    log_event("jobs.failed", job=job.id, key=job.key, error=job.error)
+                else:
+                    job.status = "done"
+            except Exception as e:
+                job.error = str(e)
+                job.status = "error"
+                log_event("jobs.failed", job=job.id, key=job.key, error=str(e))
+        job.finished = time.time()
+
+    def _prune(self):
+        finished = [job for job in self._jobs.values() if job.done]
+        for job in finished[:max(0, len(finished) - self.history)]:
+            del self._jobs[job.id]
+            if self._by_key.get(job.key) == job.id:
+                del self._by_key[job.key]
+
+    def get(self, job_id):
+        """Return a snapshot of the job, or None if it is unknown (or was pruned)."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        return job.snapshot() if job is not None else None
+
+    def stats(self):
+        with self._lock:
+            statuses = [job.status for job in self._jobs.values()]
+        return {status: statuses.count(status) for status in ("queued", "running", "done", "error")}
+
+
+def get_job_queue():
+    """Return the process-wide job queue shared by every Streamlit session."""
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                _queue = JobQueue()
+    return _queue
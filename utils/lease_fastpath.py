@@ -0,0 +1,327 @@
+import calendar
+import re
+from datetime import date, datetime, timedelta
+
+# Fields at or above this confidence are used without asking the LLM
+MIN_CONFIDENCE = 0.8
+
+# Extraction checklist items shared by the stage prompts, with the fast-path fields each one needs
+EXTRACTION_ITEMS = [
+    ("address", "Property address", ["property_address"]),
+    ("parties", "Parties involved", ["landlord", "tenant"]),
+    ("term", "Lease term and dates", ["commencement_date", "expiration_date"]),
+    ("rent", "Rent details", ["monthly_rent"]),
+    ("renewal_termination", "Any renewal or termination clauses", ["renewal_option", "termination_notice_days"]),
+    ("deadlines", "Any key deadlines", ["key_deadlines"]),
+]
+
+_MONTHS = "January|February|March|April|May|June|July|August|September|October|November|December"
+_MONTH_ABBR = "Jan|Feb|Mar|Apr|Jun|Jul|Aug|Sep|Sept|Oct|Nov|Dec"
+DATE = (
+    rf"(?:(?:{_MONTHS}|{_MONTH_ABBR})\.?\s+\d{{1,2}}(?:st|nd|rd|th)?,?\s+\d{{4}}"
+    rf"|\d{{1,2}}(?:st|nd|rd|th)?\s+(?:day\s+of\s+)?(?:{_MONTHS}|{_MONTH_ABBR}),?\s+\d{{4}}"
+    r"|\d{1,2}/\d{1,2}/\d{2,4}"
+    r"|\d{4}-\d{2}-\d{2})"
+)
+MONEY = r"\$\s?(?P<amount>\d[\d,]*(?:\.\d{1,2})?)(?:\s*(?P<scale>[kKmM]\b|thousand|million))?"
+
+_NUMBER_WORDS = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7, "eight": 8, "nine": 9,
+    "ten": 10, "eleven": 11, "twelve": 12, "fifteen": 15, "eighteen": 18, "twenty": 20, "twenty-four": 24,
+    "thirty": 30, "thirty-six": 36, "forty-five": 45, "sixty": 60, "ninety": 90,
+    "one hundred twenty": 120, "one hundred eighty": 180,
+}
+_WORDS = "|".join(sorted((re.escape(w) for w in _NUMBER_WORDS), key=len, reverse=True))
+NUMBER = rf"(?:(?:\b(?:{_WORDS})\b\s*)?\(\d+\)|\b\d+\b|\b(?:{_WORDS})\b)"
+
+_PATTERNS = {
+    "property_address": [
+        (re.compile(r"located\s+at\s+(?P<v>[^\n(;]+?)(?=\s*\(|;|\.\s|\.?\s*$|\n\n)", re.I | re.M), 0.9),
+        (re.compile(r"(?:premises|property)\s+(?:known\s+as|at)\s+(?P<v>[^\n(;]+?)(?=\s*\(|;|\.\s|\.?\s*$|\n\n)", re.I | re.M), 0.85),
+        (re.compile(
+            r"(?P<v>\b\d+\s+[A-Z][\w.]*(?:\s+[A-Z][\w.]*)*\s+(?:Street|St|Avenue|Ave|Road|Rd|Boulevard|Blvd|Way|Drive|Dr|Lane|Ln|Place|Pl)\b"
+            r"[^\n]*?\b[A-Z]{2}\s+\d{5}(?:-\d{4})?)"
+        ), 0.6),
+    ],
+    "landlord": [
+        (re.compile(r"^\s*Landlord\s*:\s*(?P<v>[^\n]+)", re.M), 0.9),
+        (re.compile(r"between\s+(?P<v>[^,(\n]+?)(?:,\s*an?\s+[^(\n]{0,60}?)?,?\s*\(?\s*(?:as\s+)?(?:the\s+)?[\"“]?Landlord", re.I), 0.85),
+        (re.compile(r"between\s+(?P<v>.+?)\s+and\s+.+?(?:\s+for\b|,|\.\s|\n)", re.I), 0.6),
+    ],
+    "tenant": [
+        (re.compile(r"^\s*Tenant\s*:\s*(?P<v>[^\n]+)", re.M), 0.9),
+        (re.compile(r"\band\s+(?P<v>[^,(\n]+?)(?:,\s*an?\s+[^(\n]{0,60}?)?,?\s*\(?\s*(?:as\s+)?(?:the\s+)?[\"“]?Tenant", re.I), 0.85),
+        (re.compile(r"between\s+.+?\s+and\s+(?P<v>.+?)(?:\s+for\b|,|\.\s|\n)", re.I), 0.6),
+    ],
+    "commencement_date": [
+        (re.compile(rf"\b(?:commenc\w*|begin(?:s|ning)?|start(?:s|ing)?)\b[^.]{{0,40}}?(?P<v>{DATE})", re.I), 0.9),
+    ],
+    "expiration_date": [
+        (re.compile(rf"\b(?:expir\w*|end(?:s|ing)?)\b[^.]{{0,40}}?(?P<v>{DATE})", re.I), 0.9),
+        (re.compile(rf"through\s+(?:and\s+including\s+)?(?P<v>{DATE})", re.I), 0.8),
+    ],
+    "term_months": [
+        (re.compile(rf"(?:term|period)\b[^.]{{0,40}}?(?P<v>{NUMBER})\s*(?P<unit>years?|months?)", re.I), 0.85),
+        (re.compile(rf"(?P<v>\d+|\b(?:{_WORDS}))[- ](?P<unit>year|month)\s+term", re.I), 0.8),
+    ],
+    "monthly_rent": [
+        (re.compile(rf"(?<!annual )(?<!yearly )(?:monthly|base|minimum)\s+(?:base\s+)?rent\s+(?:of|shall\s+be|is|in\s+the\s+amount\s+of)?\s*{MONEY}", re.I), 0.9),
+        (re.compile(rf"{MONEY}\s*(?:per|/|a|each)\s*month", re.I), 0.85),
+    ],
+    "annual_rent": [
+        (re.compile(rf"annual\s+(?:base\s+)?rent\s+(?:of|shall\s+be|is)?\s*{MONEY}", re.I), 0.85),
+        (re.compile(rf"{MONEY}\s*(?:per|/|a|each)\s*(?:year|annum)", re.I), 0.8),
+    ],
+    "escalation_pct": [
+        (re.compile(r"(?P<v>\d+(?:\.\d+)?)\s*(?:%|percent)\s*(?:annual|per\s+annum|per\s+year|each\s+year|yearly)?\s*(?:increas|escalat)", re.I), 0.85),
+        (re.compile(r"\b(?:increas|escalat)\w*\s+(?:of|by|at)?\s*(?P<v>\d+(?:\.\d+)?)\s*(?:%|percent)", re.I), 0.85),
+        (re.compile(r"(?:annual|yearly)\s+(?P<v>\d+(?:\.\d+)?)\s*%", re.I), 0.8),
+    ],
+    "rent_due_day": [
+        (re.compile(r"due\s+on\s+(?:or\s+before\s+)?the\s+(?P<v>first|1st|\d{1,2}(?:st|nd|rd|th)?)\s+(?:day\s+)?of\s+each\s+(?:calendar\s+)?month", re.I), 0.9),
+    ],
+}
+_NOTICE = re.compile(rf"(?P<v>{NUMBER})\s*days?['’]?\s+(?:prior\s+|advance\s+)?(?:written\s+)?notice", re.I)
+_SENTENCE_SPLIT = re.compile(r"(?<=[.;])\s+|\n\s*\n")
+# "Tenant may not renew", "no option to renew", "non-renewable": not a renewal option
+_NEGATION = re.compile(r"\b(?:not|no|never|neither|nor|cannot|non)\b|n['’]t\b", re.I)
+# Wording that grants a renewal rather than merely mentioning one
+_RENEWAL_GRANT = re.compile(r"\b(?:option|right|may|automatic\w*)\b", re.I)
+# Sentences carrying a deadline the fast path may not have captured (late fees, "within 30 days", ...)
+_DEADLINE_CLAUSE = re.compile(rf"\blate\b|\bno\s+later\s+than\b|\bgrace\s+period\b|\bdeadline\b|{NUMBER}\s*(?:business\s+|calendar\s+)?days?\b", re.I)
+# Rent terms the fast path never extracts; their presence leaves the rent item to the LLM
+_UNEXTRACTED_RENT_TERMS = re.compile(r"\bdeposit\b|\blate\s+(?:fee|charge|payment)s?\b|\binterest\b", re.I)
+_ESCALATION_TERMS = re.compile(r"\b(?:increas|escalat)\w*|\bCPI\b|\bconsumer\s+price\s+index\b", re.I)
+# Words the party patterns can catch in "the Landlord, ABC LLC, and the Tenant, ..." that are not names
+_NOT_A_NAME = {"a", "an", "the", "this", "that", "such", "said", "it", "its", "he", "she", "his", "her", "they", "their", "each", "either"}
+_PARTY_ROLES = {"landlord", "tenant", "lessor", "lessee"}
+# A title-case heading line at the start of a sentence ("Renewal Option"), not part of the clause
+_LEADING_HEADING = re.compile(r"^\s*(?:[A-Z][\w&'-]*|and|of|the|to|or|for|&)(?:[ \t]+(?:[A-Z][\w&'-]*|and|of|the|to|or|for|&)){0,7}[ \t]*:?[ \t]*\n(?=\s*\S)")
+# Confidence given to fields that were found but cannot be relied on (below MIN_CONFIDENCE)
+UNSUPPORTED_CONFIDENCE = 0.6
+
+
+def parse_number(text):
+    """Parse '5', '(5)', 'five (5)' or 'ninety' into an int, or None."""
+    digits = re.search(r"\d+", text)
+    if digits:
+        return int(digits.group())
+    return _NUMBER_WORDS.get(" ".join(text.lower().split()))
+
+
+def parse_money(amount, scale=None):
+    """Normalize '$12,000', '$1.2 million' or '$10K' parts into a float."""
+    value = float(amount.replace(",", ""))
+    scale = (scale or "").lower()
+    if scale in ("k", "thousand"):
+        value *= 1_000
+    elif scale in ("m", "million"):
+        value *= 1_000_000
+    return value
+
+
+def parse_date(text):
+    """Normalize a date in any of the DATE formats to a datetime.date, or None."""
+    cleaned = re.sub(r"(\d)(st|nd|rd|th)\b", r"\1", text.strip())
+    cleaned = re.sub(r"\s+day\s+of\s+", " ", cleaned)
+    cleaned = cleaned.replace(",", "").replace(".", "")
+    cleaned = re.sub(r"\bSept\b", "Sep", cleaned)
+    for fmt in ("%B %d %Y", "%b %d %Y", "%d %B %Y", "%d %b %Y", "%m/%d/%Y", "%m/%d/%y", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(cleaned, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def add_months(start, months):
+    """Add calendar months to a date, clamping to the end of the month."""
+    month_index = start.month - 1 + months
+    year, month = start.year + month_index // 12, month_index % 12 + 1
+    return date(year, month, min(start.day, calendar.monthrange(year, month)[1]))
+
+
+def _field(value, raw, confidence):
+    return {"value": value, "raw": raw, "confidence": confidence}
+
+
+def _matches(name, text):
+    for pattern, confidence in _PATTERNS[name]:
+        match = pattern.search(text)
+        if match:
+            yield match, confidence
+
+
+def _first_match(name, text):
+    return next(_matches(name, text), (None, 0.0))
+
+
+def _is_party_name(value):
+    words = value.lower().split()
+    if words[0] in _NOT_A_NAME:
+        words = words[1:]
+    return bool(words) and words[0].strip(",") not in _PARTY_ROLES
+
+
+def _sentences(text, *keywords):
+    for sentence in _SENTENCE_SPLIT.split(text):
+        sentence = _LEADING_HEADING.sub("", sentence)
+        lowered = sentence.lower()
+        if all(keyword in lowered for keyword in keywords):
+            yield " ".join(sentence.split())
+
+
+def extract_fields(text):
+    """
+    Extract standard lease fields with compiled patterns.
+
+    Args:
+        text (str): Lease text, e.g. from extract_text_from_pdf
+
+    Returns:
+        dict: field name -> {"value", "raw", "confidence"} for every field found.
+            Dates are datetime.date, money is float, periods are int.
+    """
+    fields = {}
+
+    for name in ("property_address", "landlord", "tenant"):
+        for match, confidence in _matches(name, text):
+            # Keep "Inc." on party names; a trailing period on an address is sentence punctuation
+            value = match.group("v").strip().rstrip(".,; " if name == "property_address" else ",; ")
+            # An article, pronoun or role ("the Tenant") caught in place of a party name: try the next pattern
+            if value and (name == "property_address" or _is_party_name(value)):
+                fields[name] = _field(value, match.group(0), confidence)
+                break
+
+    for name in ("commencement_date", "expiration_date"):
+        match, confidence = _first_match(name, text)
+        if match:
+            parsed = parse_date(match.group("v"))
+            if parsed:
+                fields[name] = _field(parsed, match.group("v"), confidence)
+
+    match, confidence = _first_match("term_months", text)
+    if match:
+        count = parse_number(match.group("v"))
+        if count:
+            months = count * 12 if match.group("unit").lower().startswith("year") else count
+            fields["term_months"] = _field(months, match.group(0), confidence)
+
+    # An end date on or before the start date was picked up from the wrong clause
+    if "commencement_date" in fields and "expiration_date" in fields:
+        if fields["expiration_date"]["value"] <= fields["commencement_date"]["value"]:
+            del fields["expiration_date"]
+
+    # Derive a missing end date from start + term, at slightly lower confidence
+    if "expiration_date" not in fields and "commencement_date" in fields and "term_months" in fields:
+        start = fields["commencement_date"]
+        end = add_months(start["value"], fields["term_months"]["value"]) - timedelta(days=1)
+        confidence = round(min(start["confidence"], fields["term_months"]["confidence"]) - 0.05, 2)
+        fields["expiration_date"] = _field(end, "derived from commencement date and term", confidence)
+
+    match, confidence = _first_match("monthly_rent", text)
+    if match:
+        fields["monthly_rent"] = _field(parse_money(match.group("amount"), match.group("scale")), match.group(0), confidence)
+    else:
+        match, confidence = _first_match("annual_rent", text)
+        if match:
+            annual = parse_money(match.group("amount"), match.group("scale"))
+            fields["monthly_rent"] = _field(round(annual / 12, 2), match.group(0), round(confidence - 0.05, 2))
+
+    match, confidence = _first_match("escalation_pct", text)
+    if match:
+        fields["escalation_pct"] = _field(float(match.group("v")), match.group(0), confidence)
+
+    # Rent is only complete without deposit, late-fee or escalation terms the patterns missed
+    if "monthly_rent" in fields and (
+        _UNEXTRACTED_RENT_TERMS.search(text)
+        or ("escalation_pct" not in fields and _ESCALATION_TERMS.search(text))
+    ):
+        fields["monthly_rent"]["confidence"] = min(fields["monthly_rent"]["confidence"], UNSUPPORTED_CONFIDENCE)
+
+    match, confidence = _first_match("rent_due_day", text)
+    if match:
+        day = match.group("v").lower()
+        fields["rent_due_day"] = _field(1 if day == "first" else int(re.match(r"\d+", day).group()), match.group(0), confidence)
+
+    # Negated sentences ("Tenant may not renew") are left to the LLM
+    renewal = next((sentence for sentence in _sentences(text, "renew") if not _NEGATION.search(sentence)), None)
+    captured = set()
+    if renewal:
+        confidence = 0.85 if _RENEWAL_GRANT.search(renewal) else UNSUPPORTED_CONFIDENCE
+        fields["renewal_option"] = _field(renewal[:300], renewal, confidence)
+        notice = _NOTICE.search(renewal)
+        if notice:
+            fields["renewal_notice_days"] = _field(parse_number(notice.group("v")), notice.group(0), 0.85)
+            captured.add(renewal)
+
+    for sentence in _sentences(text, "terminat"):
+        notice = _NOTICE.search(sentence)
+        if notice:
+            fields["termination_notice_days"] = _field(parse_number(notice.group("v")), sentence[:300], 0.85)
+            captured.add(sentence)
+            break
+
+    if "expiration_date" in fields:
+        confidence = fields["expiration_date"]["confidence"]
+        # The derived list is only complete when no deadline in the text went uncaptured
+        uncaptured = [sentence for sentence in _sentences(text) if sentence not in captured and _DEADLINE_CLAUSE.search(sentence)]
+        if uncaptured or ("renewal_option" in fields and "renewal_notice_days" not in fields):
+            confidence = min(confidence, UNSUPPORTED_CONFIDENCE)
+        fields["key_deadlines"] = _field(_derive_deadlines(fields), "derived", confidence)
+
+    return fields
+
+
+def _derive_deadlines(fields):
+    expiration = fields["expiration_date"]["value"]
+    deadlines = [f"Lease expires {expiration.isoformat()}"]
+    if "renewal_notice_days" in fields:
+        days = fields["renewal_notice_days"]["value"]
+        deadlines.append(f"Renewal notice due {(expiration - timedelta(days=days)).isoformat()} ({days} days before expiration)")
+    if "termination_notice_days" in fields:
+        deadlines.append(f"Termination requires {fields['termination_notice_days']['value']} days' written notice")
+    if "rent_due_day" in fields:
+        deadlines.append(f"Rent due on day {fields['rent_due_day']['value']} of each month")
+    return deadlines
+
+
+def covered_items(fields, min_confidence=MIN_CONFIDENCE):
+    """Return the EXTRACTION_ITEMS keys whose required fields were all found confidently."""
+    return {
+        key
+        for key, _, required in EXTRACTION_ITEMS
+        if all(fields.get(name, {}).get("confidence", 0) >= min_confidence for name in required)
+    }
+
+
+def _describe(key, fields):
+    if key == "address":
+        return fields["property_address"]["value"]
+    if key == "parties":
+        return f"Landlord: {fields['landlord']['value']}; Tenant: {fields['tenant']['value']}"
+    if key == "term":
+        text = f"{fields['commencement_date']['value'].isoformat()} to {fields['expiration_date']['value'].isoformat()}"
+        if "term_months" in fields:
+            text += f" ({fields['term_months']['value']} months)"
+        return text
+    if key == "rent":
+        text = f"${fields['monthly_rent']['value']:,.2f} per month"
+        if "escalation_pct" in fields:
+            text += f"; {fields['escalation_pct']['value']:g}% escalation"
+        return text
+    if key == "renewal_termination":
+        return (
+            f"Renewal: {fields['renewal_option']['value']} "
+            f"Termination: {fields['termination_notice_days']['value']} days' written notice"
+        )
+    if key == "deadlines":
+        return "; ".join(fields["key_deadlines"]["value"])
+    raise KeyError(key)
+
+
+def format_fields(fields, items):
+    """Render the given covered item keys as a bullet list matching the extraction checklist."""
+    return "\n".join(
+        f"- {label}: {_describe(key, fields)}" for key, label, _ in EXTRACTION_ITEMS if key in items
+    )
@@ -0,0 +1,250 @@
+import os
+import sqlite3
+import threading
+import time
+from datetime import date, timedelta
+from dotenv import load_dotenv
+
+from utils.lease_fastpath import add_months, extract_fields
+from utils.stage_memo import content_hash
+from utils.value_metrics import VALUE_TEAMS
+
+# Load environment variables
+load_dotenv()
+
+# SQLite file holding the structured fields of every analyzed lease
+LEASE_DB_PATH = os.getenv("CRE_LEASE_DB", "leases.db")
+
+# Structured columns, filled from the lease text by utils.lease_fastpath (then from the extracted summary)
+FIELD_COLUMNS = [
+    ("property_address", "TEXT"),
+    ("landlord", "TEXT"),
+    ("tenant", "TEXT"),
+    ("commencement_date", "TEXT"),
+    ("expiration_date", "TEXT"),
+    ("term_months", "INTEGER"),
+    ("monthly_rent", "REAL"),
+    ("escalation_pct", "REAL"),
+    ("rent_due_day", "INTEGER"),
+    ("renewal_notice_days", "INTEGER"),
+    ("termination_notice_days", "INTEGER"),
+]
+TEXT_COLUMNS = ["extracted_info", "workflow", "value"]
+# The value stage's numbers (utils.value_metrics), one column per team weight so rollups read plain floats
+VALUE_COLUMNS = ["hours_saved_per_year", "error_risk_score"] + [f"weight_{key}" for key, _ in VALUE_TEAMS]
+DEADLINE_KINDS = ("expiration", "renewal_notice")
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS leases (
+    id INTEGER PRIMARY KEY,
+    lease_id TEXT NOT NULL UNIQUE,
+    content_hash TEXT,
+    {", ".join(f"{name} {kind}" for name, kind in FIELD_COLUMNS)},
+    {", ".join(f"{name} TEXT" for name in TEXT_COLUMNS)},
+    {", ".join(f"{name} REAL" for name in VALUE_COLUMNS)},
+    analyzed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS leases_address ON leases (property_address);
+CREATE INDEX IF NOT EXISTS leases_landlord ON leases (landlord);
+CREATE INDEX IF NOT EXISTS leases_tenant ON leases (tenant);
+CREATE INDEX IF NOT EXISTS leases_rent ON leases (monthly_rent);
+CREATE INDEX IF NOT EXISTS leases_expiration ON leases (expiration_date);
+CREATE TABLE IF NOT EXISTS deadlines (
+    lease INTEGER NOT NULL REFERENCES leases (id) ON DELETE CASCADE,
+    kind TEXT NOT NULL,
+    due_date TEXT NOT NULL,
+    description TEXT
+);
+CREATE INDEX IF NOT EXISTS deadlines_due ON deadlines (kind, due_date);
+CREATE INDEX IF NOT EXISTS deadlines_date ON deadlines (due_date);
+CREATE INDEX IF NOT EXISTS deadlines_lease ON deadlines (lease);
+"""
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def _column_value(value):
+    # Dates are stored as ISO strings so they sort and range-compare correctly
+    return value.isoformat() if isinstance(value, date) else value
+
+
+def next_quarter(today=None):
+    """Return (first day, last day) of the calendar quarter after `today`."""
+    today = today or date.today()
+    start = add_months(date(today.year, (today.month - 1) // 3 * 3 + 1, 1), 3)
+    return start, add_months(start, 3) - timedelta(days=1)
+
+
+def lease_row(lease_id, result, document_text=None):
+    """
+    Turn one analyze_lease_document result into a store row.
+
+    The structured columns come from the rule-based extractor run over the
+    lease text; fields it cannot find there are looked for in the LLM's
+    extracted summary.
+
+    Returns:
+        dict: Column values plus a "deadlines" list of (kind, ISO date, description)
+    """
+    fields = extract_fields(document_text) if document_text else {}
+    summary_fields = extract_fields(result.get("extracted_info") or "")
+    row = {"lease_id": lease_id, "content_hash": content_hash(document_text) if document_text else None}
+    for name, _ in FIELD_COLUMNS:
+        field = fields.get(name) or summary_fields.get(name)
+        row[name] = _column_value(field["value"]) if field else None
+    for name in TEXT_COLUMNS:
+        row[name] = result.get(name)
+    metrics = result.get("value_metrics") or {}
+    row["hours_saved_per_year"] = metrics.get("hours_saved_per_year")
+    row["error_risk_score"] = metrics.get("error_risk_score")
+    for key, _ in VALUE_TEAMS:
+        row[f"weight_{key}"] = metrics.get("team_weights", {}).get(key)
+
+    deadlines = []
+    if row["expiration_date"]:
+        expiration = date.fromisoformat(row["expiration_date"])
+        deadlines.append(("expiration", row["expiration_date"], f"Lease expires {row['expiration_date']}"))
+        if row["renewal_notice_days"]:
+            due = expiration - timedelta(days=row["renewal_notice_days"])
+            deadlines.append(("renewal_notice", due.isoformat(), f"Renewal notice due ({row['renewal_notice_days']} days before expiration)"))
+    row["deadlines"] = deadlines
+    return row
+
+
+class LeaseStore:
+    """
+    Persistent SQLite store of analyzed leases with indexed structured fields.
+
+    Leases are keyed by a caller-chosen lease id (file path, upload name);
+    storing the same id again replaces the previous version. Deadlines live
+    in their own indexed table so date-range queries never scan lease text.
+    """
+
+    def __init__(self, path=LEASE_DB_PATH):
+        self.path = path
+        # One connection shared across threads; the lock serializes its use
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA foreign_keys=ON")
+            self._connection.executescript(_SCHEMA)
+            # Stores created before the value columns existed gain them (empty) in place
+            existing = {row["name"] for row in self._connection.execute("PRAGMA table_info(leases)")}
+            for name in VALUE_COLUMNS:
+                if name not in existing:
+                    self._connection.execute(f"ALTER TABLE leases ADD COLUMN {name} REAL")
+
+    def upsert_many(self, rows):
+        """Insert or replace many lease_row() rows in one transaction; returns the number written."""
+        columns = ["lease_id", "content_hash"] + [name for name, _ in FIELD_COLUMNS] + TEXT_COLUMNS + VALUE_COLUMNS + ["analyzed_at"]
+        placeholders = ", ".join("?" for _ in columns)
+        updates = ", ".join(f"{name} = excluded.{name}" for name in columns[1:])
+        now = time.time()
+        with self._lock, self._connection:
+            for row in rows:
+                lease = self._connection.execute(
+                    f"INSERT INTO leases ({', '.join(columns)}) VALUES ({placeholders}) "
+                    f"ON CONFLICT (lease_id) DO UPDATE SET {updates} RETURNING id",
+                    [row.get(name) for name in columns[:-1]] + [now],
+                ).fetchone()[0]
+                self._connection.execute("DELETE FROM deadlines WHERE lease = ?", (lease,))
+                self._connection.executemany(
+                    "INSERT INTO deadlines (lease, kind, due_date, description) VALUES (?, ?, ?, ?)",
+                    [(lease, kind, due, description) for kind, due, description in row["deadlines"]],
+                )
+        return len(rows)
+
+    def upsert(self, lease_id, result, document_text=None):
+        """Store one analysis result (see lease_row)."""
+        return self.upsert_many([lease_row(lease_id, result, document_text)])
+
+    def _select(self, sql, params):
+        with self._lock:
+            return [dict(row) for row in self._connection.execute(sql, params).fetchall()]
+
+    def deadlines_between(self, start, end, kind=None):
+        """
+        Deadlines falling between two dates (inclusive), soonest first.
+
+        Args:
+            start (date | str): First day of the range
+            end (date | str): Last day of the range
+            kind (str, optional): "expiration" or "renewal_notice"; all kinds when None
+
+        Returns:
+            list[dict]: Deadline rows joined with their lease's address, parties and rent
+        """
+        where = "d.kind = ? AND d.due_date BETWEEN ? AND ?" if kind else "d.due_date BETWEEN ? AND ?"
+        params = ([kind] if kind else []) + [_column_value(start), _column_value(end)]
+        return self._select(
+            "SELECT d.kind, d.due_date, d.description, l.lease_id, l.property_address, l.landlord, l.tenant, l.monthly_rent "
+            f"FROM deadlines d JOIN leases l ON l.id = d.lease WHERE {where} ORDER BY d.due_date",
+            params,
+        )
+
+    def search(self, text=None, rent_min=None, rent_max=None, expires_after=None, expires_before=None, limit=200):
+        """
+        Leases matching every given filter, ordered by expiration date.
+
+        Args:
+            text (str, optional): Substring of the address, landlord or tenant
+            rent_min, rent_max (float, optional): Monthly rent range
+            expires_after, expires_before (date | str, optional): Expiration date range
+            limit (int): Maximum rows returned
+
+        Returns:
+            list[dict]: Lease rows without the long text columns
+        """
+        clauses, params = [], []
+        if text:
+            clauses.append("(property_address LIKE ? OR landlord LIKE ? OR tenant LIKE ?)")
+            params += [f"%{text}%"] * 3
+        for column, operator, value in (
+            ("monthly_rent", ">=", rent_min), ("monthly_rent", "<=", rent_max),
+            ("expiration_date", ">=", expires_after), ("expiration_date", "<=", expires_before),
+        ):
+            if value is not None:
+                clauses.append(f"{column} {operator} ?")
+                params.append(_column_value(value))
+        columns = ", ".join(["lease_id"] + [name for name, _ in FIELD_COLUMNS])
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        return self._select(f"SELECT {columns} FROM leases{where} ORDER BY expiration_date IS NULL, expiration_date LIMIT ?", params + [limit])
+
+    def value_rows(self):
+        """
+        Value metrics of every lease that has them, for utils.portfolio.
+
+        Returns:
+            list[tuple]: (lease_id, *VALUE_COLUMNS) tuples
+        """
+        with self._lock:
+            rows = self._connection.execute(
+                f"SELECT lease_id, {', '.join(VALUE_COLUMNS)} FROM leases WHERE hours_saved_per_year IS NOT NULL"
+            ).fetchall()
+        return [tuple(row) for row in rows]
+
+    def get(self, lease_id):
+        """Return the full stored row for `lease_id`, or None."""
+        rows = self._select("SELECT * FROM leases WHERE lease_id = ?", [lease_id])
+        return rows[0] if rows else None
+
+    def count(self):
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM leases").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+def get_lease_store():
+    """Return the process-wide lease store, opening CRE_LEASE_DB on first use."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = LeaseStore()
+    return _store
@@ -0,0 +1,302 @@
+import json
+import re
+from datetime import date, timedelta
+
+from utils.lease_fastpath import add_months, parse_date, parse_number
+
+# Terms the LLM reads out of a one-line description; everything else is rendered locally
+LEASE_TERMS_FIELDS = [
+    ("property_address", "STRING", "Street address of the premises"),
+    ("property_type", "STRING", "office, retail, industrial, warehouse, medical or mixed-use"),
+    ("landlord", "STRING", "Landlord name"),
+    ("tenant", "STRING", "Tenant name"),
+    ("commencement_date", "STRING", "Start date as stated: YYYY-MM-DD if the year is given, else the words used (e.g. 'June 1', 'next month')"),
+    ("term_months", "INTEGER", "Lease term in months"),
+    ("monthly_rent", "NUMBER", "Monthly base rent in dollars (divide annual rent by 12)"),
+    ("escalation_pct", "NUMBER", "Annual rent increase in percent"),
+    ("security_deposit_months", "NUMBER", "Security deposit as a number of months of rent"),
+    ("termination_notice_days", "INTEGER", "Days of written notice required to terminate"),
+    ("renewal_years", "INTEGER", "Length of one renewal option in years"),
+    ("renewal_notice_days", "INTEGER", "Days before expiration by which renewal notice is due"),
+    ("permitted_use", "STRING", "What the premises may be used for"),
+]
+
+LEASE_TERMS_CONFIG = {
+    "responseMimeType": "application/json",
+    "responseSchema": {
+        "type": "OBJECT",
+        "properties": {name: {"type": kind, "nullable": True, "description": description} for name, kind, description in LEASE_TERMS_FIELDS},
+    },
+}
+
+# Used where the description is silent
+DEFAULT_TERMS = {
+    "property_address": "[Property Address]",
+    "property_type": "office",
+    "landlord": "[Landlord Name]",
+    "tenant": "[Tenant Name]",
+    "term_months": 36,
+    "monthly_rent": None,
+    "escalation_pct": 0,
+    "security_deposit_months": 1,
+    "termination_notice_days": 60,
+    "renewal_years": 0,
+    "renewal_notice_days": 180,
+    "permitted_use": None,
+}
+
+PERMITTED_USE_BY_TYPE = {
+    "office": "general office purposes",
+    "retail": "the retail sale of goods and services",
+    "industrial": "light industrial, manufacturing and distribution purposes",
+    "warehouse": "warehousing, storage and distribution purposes",
+    "medical": "medical and professional office purposes",
+    "mixed-use": "office and retail purposes",
+}
+
+# Clause templates in document order: (heading, template, condition on the normalized terms)
+CLAUSES = [
+    ("Premises", (
+        "Landlord hereby leases to Tenant the {property_type} space located at {property_address} (the \"Premises\"), "
+        "together with the non-exclusive right to use the common areas of the building."
+    ), None),
+    ("Term", (
+        "The lease term shall commence on {commencement} and shall continue for a period of {term_text}, "
+        "expiring on {expiration} (the \"Term\")."
+    ), None),
+    ("Rent", (
+        "Tenant shall pay a monthly base rent of {monthly_rent_text} due on the first day of each month, "
+        "without demand, deduction or offset. Rent for any partial month shall be prorated. "
+        "Payments received more than five (5) days late shall incur a late fee of five percent (5%) of the amount due."
+    ), lambda t: t["monthly_rent"] is not None),
+    ("Rent", (
+        "Tenant shall pay monthly base rent in the amount of [Monthly Rent] due on the first day of each month, "
+        "without demand, deduction or offset."
+    ), lambda t: t["monthly_rent"] is None),
+    ("Rent Escalation", (
+        "Base rent shall be subject to a {escalation_pct:g}% annual increase over the base rent then in effect, "
+        "effective on each anniversary of the commencement date, according to the following schedule:\n{rent_schedule}"
+    ), lambda t: t["escalation_pct"] and t["monthly_rent"] is not None),
+    ("Security Deposit", (
+        "Upon execution of this Lease, Tenant shall deposit with Landlord {deposit_text} as security for the performance "
+        "of Tenant's obligations. Landlord shall return the deposit, less any amounts applied to cure Tenant's defaults, "
+        "within thirty (30) days after the end of the Term."
+    ), lambda t: t["security_deposit_months"]),
+    ("Use", (
+        "The Premises shall be used for {permitted_use} and for no other purpose without Landlord's prior written consent. "
+        "Tenant shall comply with all laws, ordinances and regulations applicable to its use of the Premises."
+    ), None),
+    ("Maintenance and Repairs", (
+        "Landlord shall maintain the roof, foundation, structural elements and building systems serving the Premises. "
+        "Tenant shall keep the interior of the Premises in good condition and repair, reasonable wear and tear excepted."
+    ), None),
+    ("Alterations", (
+        "Tenant shall not make any structural alterations to the Premises without Landlord's prior written consent, "
+        "which shall not be unreasonably withheld."
+    ), None),
+    ("Insurance and Indemnity", (
+        "Tenant shall maintain commercial general liability insurance of not less than $1,000,000 per occurrence naming "
+        "Landlord as additional insured. Each party shall indemnify the other against claims arising from its own negligence."
+    ), None),
+    ("Assignment and Subletting", (
+        "Tenant shall not assign this Lease or sublet any part of the Premises without Landlord's prior written consent, "
+        "which shall not be unreasonably withheld, conditioned or delayed."
+    ), None),
+    ("Renewal Option", (
+        "Tenant shall have one (1) option to renew this Lease for an additional term of {renewal_years_text} at a rent "
+        "to be negotiated in good faith, exercisable by giving {renewal_notice_text} written notice prior to expiration of the Term."
+    ), lambda t: t["renewal_years"]),
+    ("Termination", (
+        "Either party may terminate this Lease upon {termination_notice_text} written notice to the other party if the "
+        "other party commits a material breach that remains uncured at the end of the notice period."
+    ), None),
+    ("Default", (
+        "If Tenant fails to pay rent within ten (10) days after written notice of non-payment, Landlord may pursue any "
+        "remedy available at law or in equity, including termination of this Lease."
+    ), None),
+    ("Governing Law", (
+        "This Lease shall be governed by the laws of the state in which the Premises are located."
+    ), None),
+]
+
+_NUMBER_WORDS = {
+    1: "one", 2: "two", 3: "three", 4: "four", 5: "five", 6: "six", 7: "seven", 8: "eight", 9: "nine", 10: "ten",
+    12: "twelve", 15: "fifteen", 18: "eighteen", 20: "twenty", 24: "twenty-four", 30: "thirty", 36: "thirty-six",
+    45: "forty-five", 60: "sixty", 90: "ninety", 120: "one hundred twenty", 180: "one hundred eighty",
+}
+
+
+def _spelled(number, unit):
+    """'five (5) years', or '7 months' when there is no word form."""
+    unit = unit if number == 1 else unit + "s"
+    word = _NUMBER_WORDS.get(number)
+    return f"{word} ({number}) {unit}" if word else f"{number} {unit}"
+
+
+def _money(amount):
+    return f"${amount:,.2f}".replace(".00", "")
+
+
+def _long_date(day):
+    return f"{day.strftime('%B')} {day.day}, {day.year}"
+
+
+def terms_prompt(description):
+    # No date in the prompt, so its cached response stays valid; relative starts are resolved by resolve_start()
+    fields = "\n".join(f"- {name}: {description}" for name, _, description in LEASE_TERMS_FIELDS)
+    return f"""
+You're a commercial real estate legal assistant. Read this description of a lease and extract its terms:
+
+{description}
+
+Fields:
+{fields}
+
+Convert years to months and amounts to plain numbers. Use null for anything the description does not
+state; do not invent values, and never add a year to a date that is given without one.
+"""
+
+
+_MONTH_NAMES = ["january", "february", "march", "april", "may", "june", "july", "august", "september", "october", "november", "december"]
+_MONTH_DAY = re.compile(
+    rf"\b({'|'.join(_MONTH_NAMES)}|{'|'.join(name[:3] for name in _MONTH_NAMES)}|sept)\.?(?:\s+(\d{{1,2}})(?:st|nd|rd|th)?)?\b", re.I
+)
+_MONTHS_AHEAD = re.compile(r"\bin\s+(.+?)\s+months?\b", re.I)
+
+
+def resolve_start(text, today):
+    """
+    Turn a stated start ('2025-03-01', 'June 1', 'next month', 'in two months') into a date.
+
+    Dates without a year fall on their next occurrence from `today`; relative
+    starts begin on the first of the month. Returns None when nothing is recognized.
+    """
+    day = parse_date(text)
+    if day:
+        return day
+    lowered = text.lower()
+    first_of_month = date(today.year, today.month, 1)
+    if re.search(r"\b(?:immediately|today|now)\b", lowered):
+        return today
+    if "next month" in lowered:
+        return add_months(first_of_month, 1)
+    ahead = _MONTHS_AHEAD.search(lowered)
+    if ahead and parse_number(ahead.group(1)) is not None:
+        return add_months(first_of_month, parse_number(ahead.group(1)))
+    match = _MONTH_DAY.search(text)
+    if match:
+        month = [name[:3] for name in _MONTH_NAMES].index(match.group(1).lower()[:3]) + 1
+        for year in (today.year, today.year + 1):
+            try:
+                candidate = date(year, month, int(match.group(2) or 1))
+            except ValueError:
+                return None
+            if candidate >= today:
+                return candidate
+    return None
+
+
+def _number(value, kind):
+    try:
+        return kind(value) if value is not None and value != "" else None
+    except (TypeError, ValueError):
+        return None
+
+
+def normalize_terms(raw, today=None):
+    """
+    Validate the LLM's parsed terms and fill gaps with DEFAULT_TERMS.
+
+    Raises:
+        ValueError: if `raw` is not a JSON object (callers fall back to free-form generation)
+    """
+    if not isinstance(raw, dict):
+        raise ValueError("lease terms are not an object")
+    today = today or date.today()
+    terms = dict(DEFAULT_TERMS)
+    for name, kind, _ in LEASE_TERMS_FIELDS:
+        value = raw.get(name)
+        if kind == "INTEGER":
+            value = _number(value, float)
+            value = int(round(value)) if value is not None else None
+        elif kind == "NUMBER":
+            value = _number(value, float)
+        elif not isinstance(value, str) or not value.strip():
+            value = None
+        if value is not None and (kind == "STRING" or value >= 0):
+            terms[name] = value.strip() if kind == "STRING" else value
+
+    start = resolve_start(terms["commencement_date"], today) if terms.get("commencement_date") else None
+    # Default start: the first day of next month
+    terms["commencement"] = start or add_months(date(today.year, today.month, 1), 1)
+    terms["term_months"] = max(1, terms["term_months"] or DEFAULT_TERMS["term_months"])
+    terms["expiration"] = add_months(terms["commencement"], terms["term_months"]) - timedelta(days=1)
+    terms["property_type"] = terms["property_type"].lower()
+    if not terms["permitted_use"]:
+        terms["permitted_use"] = PERMITTED_USE_BY_TYPE.get(terms["property_type"], PERMITTED_USE_BY_TYPE["office"])
+    return terms
+
+
+def rent_schedule(terms):
+    """Yearly base rent rows (lease year, monthly rent) with the annual escalation compounded."""
+    years = -(-terms["term_months"] // 12)
+    return [
+        (year, round(terms["monthly_rent"] * (1 + terms["escalation_pct"] / 100) ** (year - 1), 2))
+        for year in range(1, years + 1)
+    ]
+
+
+def _term_text(months):
+    return _spelled(months // 12, "year") if months % 12 == 0 else _spelled(months, "month")
+
+
+def render_lease(terms):
+    """
+    Assemble the full agreement from CLAUSES for normalized terms.
+
+    Returns:
+        list[str]: The title block followed by one numbered clause per entry, ready to join or stream
+    """
+    values = dict(terms)
+    values.update({
+        "commencement": _long_date(terms["commencement"]),
+        "expiration": _long_date(terms["expiration"]),
+        "term_text": _term_text(terms["term_months"]),
+        "termination_notice_text": _spelled(terms["termination_notice_days"], "day"),
+        "renewal_notice_text": _spelled(terms["renewal_notice_days"], "day"),
+        "renewal_years_text": _spelled(terms["renewal_years"], "year") if terms["renewal_years"] else "",
+    })
+    if terms["monthly_rent"] is not None:
+        values["monthly_rent_text"] = _money(terms["monthly_rent"])
+        values["deposit_text"] = _money(terms["monthly_rent"] * terms["security_deposit_months"])
+        values["rent_schedule"] = "\n".join(f"    Lease year {year}: {_money(rent)} per month" for year, rent in rent_schedule(terms))
+    else:
+        values["deposit_text"] = f"an amount equal to {terms['security_deposit_months']:g} months of base rent"
+
+    parts = [
+        "COMMERCIAL LEASE AGREEMENT\n\n"
+        f"This Lease Agreement is made and entered into as of {_long_date(terms['commencement'])}, by and between "
+        f"{terms['landlord']} (\"Landlord\") and {terms['tenant']} (\"Tenant\").\n\n"
+    ]
+    number = 0
+    for heading, template, condition in CLAUSES:
+        if condition is not None and not condition(terms):
+            continue
+        number += 1
+        parts.append(f"{number}. {heading}\n{template.format(**values)}\n\n")
+    parts.append(
+        "IN WITNESS WHEREOF, the parties have executed this Lease Agreement as of the date first written above.\n\n"
+        f"LANDLORD: {terms['landlord']}\nBy: ______________________  Date: __________\n\n"
+        f"TENANT: {terms['tenant']}\nBy: ______________________  Date: __________\n"
+    )
+    return parts
+
+
+def lease_from_terms_json(response_text, today=None):
+    """
+    Render a lease from the terms-parsing call's JSON response.
+
+    Raises:
+        ValueError: if the response is not valid JSON terms
+    """
+    return render_lease(normalize_terms(json.loads(response_text), today))
@@ -0,0 +1,283 @@
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dotenv import load_dotenv
+
+from utils.gemini_client import MODEL_NAME, make_gemini_request, make_gemini_request_stream
+from utils.gemini_transport import post_json
+from utils.metrics import Histogram, collect_spans, incr, log_event, run_in_context, span
+from utils.response_cache import get_default_cache, make_cache_key
+
+# Load environment variables
+load_dotenv()
+
+# Candidate models per provider (comma-separated); OpenAI and Cohere are only used when their key is set
+ROUTER_GEMINI_MODELS = [m.strip() for m in os.getenv("CRE_ROUTER_GEMINI_MODELS", MODEL_NAME).split(",") if m.strip()]
+ROUTER_OPENAI_MODELS = [m.strip() for m in os.getenv("CRE_ROUTER_OPENAI_MODELS", "gpt-4o-mini").split(",") if m.strip()]
+ROUTER_COHERE_MODELS = [m.strip() for m in os.getenv("CRE_ROUTER_COHERE_MODELS", "command-r").split(",") if m.strip()]
+OPENAI_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1") + "/chat/completions"
+COHERE_URL = os.getenv("COHERE_BASE_URL", "https://api.cohere.com/v2") + "/chat"
+
+# Rolling statistics and health thresholds
+ROUTER_WINDOW = int(os.getenv("CRE_ROUTER_WINDOW", "50"))
+ROUTER_MIN_SAMPLES = int(os.getenv("CRE_ROUTER_MIN_SAMPLES", "5"))
+ROUTER_MAX_ERROR_RATE = float(os.getenv("CRE_ROUTER_MAX_ERROR_RATE", "0.5"))
+ROUTER_COOLDOWN = float(os.getenv("CRE_ROUTER_COOLDOWN", "30"))
+
+# Hedging: duplicate a call that has run past this percentile of its backend's latency
+HEDGE_PERCENTILE = float(os.getenv("CRE_HEDGE_PERCENTILE", "95"))
+HEDGE_DEFAULT_DELAY = float(os.getenv("CRE_HEDGE_DEFAULT_DELAY", "3"))  # seconds, until enough samples exist
+HEDGE_MIN_DELAY = float(os.getenv("CRE_HEDGE_MIN_DELAY", "0.05"))
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def _is_error(text):
+    return not isinstance(text, str) or text.startswith("Error:")
+
+
+def _cached_call(cache_model, prompt, use_cache, fetch):
+    """Serve a non-Gemini provider's answer from the shared response cache, fetching it on a miss."""
+    cache = get_default_cache() if use_cache else None
+    if cache is not None:
+        cache_key = make_cache_key(cache_model, None, prompt)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+    try:
+        text = fetch()
+    except Exception as e:
+        return f"Error: {str(e)}"
+    if cache is not None:
+        cache.set(cache_key, text, model=cache_model)
+    return text
+
+
+def _call_openai(model, prompt, use_cache=True):
+    def fetch():
+        response = post_json(
+            OPENAI_URL,
+            {"model": model, "messages": [{"role": "user", "content": prompt}], "temperature": 0.2},
+            headers={"Authorization": f"Bearer {os.getenv('OPENAI_API_KEY')}"},
+            backend="openai",
+        )
+        return response.json()["choices"][0]["message"]["content"]
+    return _cached_call(f"openai:{model}", prompt, use_cache, fetch)
+
+
+def _call_cohere(model, prompt, use_cache=True):
+    def fetch():
+        response = post_json(
+            COHERE_URL,
+            {"model": model, "messages": [{"role": "user", "content": prompt}], "temperature": 0.2},
+            headers={"Authorization": f"Bearer {os.getenv('COHERE_API_KEY')}"},
+            backend="cohere",
+        )
+        return response.json()["message"]["content"][0]["text"]
+    return _cached_call(f"cohere:{model}", prompt, use_cache, fetch)
+
+
+class Backend:
+    """
+    One provider/model pair and its rolling latency and error statistics.
+
+    Only Gemini backends support generationConfig (structured output) and
+    streaming; the others are used for plain text prompts.
+    """
+
+    def __init__(self, provider, model, call, structured=False, streaming=False, window=ROUTER_WINDOW):
+        self.provider = provider
+        self.model = model
+        self.name = f"{provider}:{model}"
+        self._call = call
+        self.structured = structured
+        self.streaming = streaming
+        self._latencies = Histogram(max_samples=window)
+        self._outcomes = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.unhealthy_since = None
+
+    def call(self, prompt, generation_config=None, use_cache=True, coalesce=True):
+        return self._call(self.model, prompt, generation_config, use_cache, coalesce)
+
+    def record(self, seconds, ok):
+        """Add one call's outcome; successful calls also feed the latency window."""
+        with self._lock:
+            self._outcomes.append(ok)
+            if ok:
+                self._latencies.observe(seconds)
+            healthy = self._is_healthy()
+            if not healthy and self.unhealthy_since is None:
+                self.unhealthy_since = time.monotonic()
+                log_event("router.unhealthy", backend=self.name, error_rate=self._error_rate())
+            elif healthy:
+                self.unhealthy_since = None
+
+    def _error_rate(self):
+        return self._outcomes.count(False) / len(self._outcomes) if self._outcomes else 0.0
+
+    def _is_healthy(self):
+        return len(self._outcomes) < ROUTER_MIN_SAMPLES or self._error_rate() <= ROUTER_MAX_ERROR_RATE
+
+    def available(self):
+        """Healthy, or unhealthy for longer than the cool-down (so it gets probed again)."""
+        with self._lock:
+            return self.unhealthy_since is None or time.monotonic() - self.unhealthy_since >= ROUTER_COOLDOWN
+
+    def latency(self, percentile=50):
+        with self._lock:
+            return self._latencies.percentile(percentile)
+
+    def samples(self):
+        with self._lock:
+            return self._latencies.count
+
+    def stats(self):
+        with self._lock:
+            return {
+                "backend": self.name,
+                "calls": len(self._outcomes),
+                "error_rate": round(self._error_rate(), 3),
+                "p50": self._latencies.percentile(50),
+                "p95": self._latencies.percentile(95),
+                "healthy": self.unhealthy_since is None,
+            }
+
+
+class LLMRouter:
+    """
+    Route each call to the fastest healthy backend, optionally hedging it.
+
+    Backends without latency samples are tried first so every backend gets
+    measured; after that the one with the lowest rolling median wins. A
+    backend whose error rate exceeds ROUTER_MAX_ERROR_RATE is skipped for
+    ROUTER_COOLDOWN seconds.
+    """
+
+    def __init__(self, backends, max_workers=16):
+        if not backends:
+            raise ValueError("LLMRouter needs at least one backend")
+        self.backends = backends
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="router")
+
+    def ranked(self, structured=False, streaming=False):
+        """Usable backends for this kind of call, best first."""
+        candidates = [b for b in self.backends if (b.structured or not structured) and (b.streaming or not streaming)]
+        available = [b for b in candidates if b.available()] or candidates
+
+        def score(backend):
+            # Unmeasured backends first, then by median latency
+            median = backend.latency(50)
+            return (backend.samples() >= ROUTER_MIN_SAMPLES, median if median is not None else 0.0)
+
+        return sorted(available, key=score)
+
+    def hedge_delay(self, backend):
+        """How long to wait on `backend` before sending a hedged duplicate."""
+        if backend.samples() < ROUTER_MIN_SAMPLES:
+            return HEDGE_DEFAULT_DELAY
+        return max(HEDGE_MIN_DELAY, backend.latency(HEDGE_PERCENTILE))
+
+    def _timed_call(self, backend, prompt, generation_config, use_cache, coalesce=True):
+        started = time.perf_counter()
+        with collect_spans() as spans:
+            text = backend.call(prompt, generation_config, use_cache, coalesce)
+        # Cache hits say nothing about the backend's latency
+        if not any(record.get("cache_hit") for record in spans):
+            backend.record(time.perf_counter() - started, not _is_error(text))
+        return text
+
+    def request(self, prompt, generation_config=None, use_cache=True, hedge=False):
+        """
+        Send one prompt through the best backend.
+
+        Args:
+            prompt (str): The prompt text
+            generation_config (dict, optional): Gemini generationConfig; restricts routing to Gemini backends
+            use_cache (bool): Serve identical requests from the response cache
+            hedge (bool): If the call outlives the backend's p95 latency, send a duplicate
+                to the next-best backend (or the same one) and return whichever answers first
+
+        Returns:
+            str: The response text, or "Error: ..." if every attempt failed
+        """
+        ranked = self.ranked(structured=generation_config is not None)
+        primary = ranked[0]
+        with span("router.request", backend=primary.name, hedge=hedge) as record:
+            if not hedge:
+                text = self._timed_call(primary, prompt, generation_config, use_cache)
+                record["winner"] = primary.name
+                return text
+
+            delay = self.hedge_delay(primary)
+            record["hedge_delay_s"] = round(delay, 4)
+            futures = {self._executor.submit(run_in_context(self._timed_call), primary, prompt, generation_config, use_cache): primary}
+            done, _ = wait(futures, timeout=delay)
+            if not done:
+                secondary = ranked[1] if len(ranked) > 1 else primary
+                # The duplicate must not coalesce into the identical call it is racing
+                futures[self._executor.submit(run_in_context(self._timed_call), secondary, prompt, generation_config, use_cache, False)] = secondary
+                record["hedged_to"] = secondary.name
+                incr("router.hedges")
+
+            pending = set(futures)
+            text = None
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    text = future.result()
+                    if not _is_error(text):
+                        record["winner"] = futures[future].name
+                        if futures[future] is not primary:
+                            incr("router.hedge_wins")
+                        # The slower duplicate keeps running in the background; its outcome still updates the stats
+                        return text
+            record["error"] = text
+            return text
+
+    def stream(self, prompt, generation_config=None, use_cache=True):
+        """Stream from the fastest healthy streaming backend, recording the full call's latency."""
+        backend = self.ranked(structured=generation_config is not None, streaming=True)[0]
+        cache = get_default_cache() if use_cache else None
+        # Cache hits say nothing about the backend's latency
+        cached = cache is not None and make_cache_key(backend.model, generation_config, prompt) in cache
+        started = time.perf_counter()
+        chunks = []
+        for chunk in make_gemini_request_stream(prompt, generation_config=generation_config, use_cache=use_cache, model=backend.model):
+            chunks.append(chunk)
+            yield chunk
+        if not cached:
+            backend.record(time.perf_counter() - started, not _is_error("".join(chunks)))
+
+    def stats(self):
+        return [backend.stats() for backend in self.backends]
+
+
+def default_backends():
+    """Gemini models from CRE_ROUTER_GEMINI_MODELS, plus OpenAI/Cohere models when their API keys are set."""
+    backends = [
+        Backend(
+            "gemini", model,
+            lambda model, prompt, config, use_cache, coalesce: make_gemini_request(prompt, config, use_cache=use_cache, model=model, coalesce=coalesce),
+            structured=True, streaming=True,
+        )
+        for model in ROUTER_GEMINI_MODELS
+    ]
+    if os.getenv("OPENAI_API_KEY"):
+        backends += [Backend("openai", model, lambda model, prompt, config, use_cache, coalesce: _call_openai(model, prompt, use_cache)) for model in ROUTER_OPENAI_MODELS]
+    if os.getenv("COHERE_API_KEY"):
+        backends += [Backend("cohere", model, lambda model, prompt, config, use_cache, coalesce: _call_cohere(model, prompt, use_cache)) for model in ROUTER_COHERE_MODELS]
+    return backends
+
+
+def get_router():
+    """Return the process-wide router, creating it on first use."""
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                _router = LLMRouter(default_backends())
+    return _router
@@ -0,0 +1,209 @@
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+# Log level for the structured "cre" logger (events are emitted at INFO, failures at WARNING)
+LOG_LEVEL = os.getenv("CRE_LOG_LEVEL", "WARNING").upper()
+# Samples kept per histogram for percentile estimates
+HISTOGRAM_SAMPLES = int(os.getenv("CRE_METRICS_SAMPLES", "2048"))
+
+logger = logging.getLogger("cre")
+if not logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s %(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(LOG_LEVEL)
+    logger.propagate = False
+
+# Spans finished in the current context are also appended to these lists (see collect_spans);
+# the value is a tuple of lists, innermost last, so collections can nest
+_collector = contextvars.ContextVar("cre_span_collector", default=())
+
+
+def log_event(event, level=logging.INFO, **fields):
+    """Emit one structured log line: the event name followed by its fields as JSON."""
+    if logger.isEnabledFor(level):
+        logger.log(level, "%s %s", event, json.dumps(fields, default=str, sort_keys=True))
+
+
+class Histogram:
+    """Count/sum/min/max plus a bounded window of recent samples for percentiles."""
+
+    def __init__(self, max_samples=HISTOGRAM_SAMPLES):
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self.samples = deque(maxlen=max_samples)
+
+    def observe(self, value):
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        self.samples.append(value)
+
+    def percentile(self, q):
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "sum": round(self.total, 6),
+            "min": self.min,
+            "max": self.max,
+            "mean": self.total / self.count if self.count else None,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+        }
+
+
+class MetricsRegistry:
+    """Thread-safe in-process counters and histograms, keyed by dotted metric name."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = defaultdict(float)
+        self._histograms = {}
+
+    def incr(self, name, value=1):
+        with self._lock:
+            self._counters[name] += value
+
+    def observe(self, name, value):
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram()
+            histogram.observe(value)
+
+    def counter(self, name):
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def histogram(self, name):
+        with self._lock:
+            histogram = self._histograms.get(name)
+            return histogram.summary() if histogram else None
+
+    def snapshot(self):
+        """Return {"counters": {...}, "histograms": {name: summary}} for reporting."""
+        with self._lock:
+            return {
+                "counters": dict(self._counters),
+                "histograms": {name: h.summary() for name, h in self._histograms.items()},
+            }
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+
+registry = MetricsRegistry()
+
+
+def incr(name, value=1):
+    registry.incr(name, value)
+
+
+def observe(name, value):
+    registry.observe(name, value)
+
+
+@contextmanager
+def span(name, **fields):
+    """
+    Time a block of work and record it.
+
+    The yielded dict can be filled in while the block runs (sizes, token
+    counts, cache hits). On exit the wall time is observed as the
+    `<name>.seconds` histogram, `<name>.calls` / `<name>.errors` are counted,
+    numeric fields ending in `_bytes`, `_chars` or `_tokens` are added to
+    counters of the same name, and a structured log line is written.
+
+    Example:
+        with span("pdf.extract", source=path) as s:
+            text = ...
+            s["output_chars"] = len(text)
+    """
+    record = dict(fields)
+    started = time.perf_counter()
+    try:
+        yield record
+    except GeneratorExit:
+        # A streaming consumer stopped early; not a failure
+        record["cancelled"] = True
+        raise
+    except BaseException as e:
+        record["error"] = repr(e)
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        record["seconds"] = round(elapsed, 6)
+        failed = "error" in record
+        registry.observe(f"{name}.seconds", elapsed)
+        registry.incr(f"{name}.calls")
+        if failed:
+            registry.incr(f"{name}.errors")
+        for key, value in record.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool) and key.endswith(("_bytes", "_chars", "_tokens")):
+                registry.incr(f"{name}.{key}", value)
+        for collected in _collector.get():
+            collected.append({"name": name, **record})
+        log_event(name, level=logging.WARNING if failed else logging.INFO, **record)
+
+
+@contextmanager
+def collect_spans():
+    """
+    Collect every span finished in this context (and in work it hands to
+    threads via run_in_context) into a list, e.g. for one request or lease.
+    Collections nest: an enclosing collect_spans() still sees every span.
+    """
+    spans = []
+    token = _collector.set(_collector.get() + (spans,))
+    try:
+        yield spans
+    finally:
+        _collector.reset(token)
+
+
+def run_in_context(func):
+    """Wrap `func` so it runs in a copy of the caller's context when handed to an executor."""
+    context = contextvars.copy_context()
+
+    def run(*args, **kwargs):
+        # One copy per call: a Context cannot be entered by two threads at once
+        return context.copy().run(func, *args, **kwargs)
+
+    return run
+
+
+def summarize_spans(spans):
+    """Aggregate collected spans by name: calls, total seconds and summed size/token fields."""
+    summary = {}
+    for record in spans:
+        entry = summary.setdefault(record["name"], {"calls": 0, "seconds": 0.0})
+        entry["calls"] += 1
+        entry["seconds"] += record.get("seconds", 0.0)
+        for key, value in record.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool) and key.endswith(("_bytes", "_chars", "_tokens")):
+                entry[key] = entry.get(key, 0) + value
+            elif key == "cache_hit" and value:
+                entry["cache_hits"] = entry.get("cache_hits", 0) + 1
+    return summary
+
+
+def total_tokens(spans):
+    """Sum the API-reported total token counts of the collected Gemini requests."""
+    return sum(record.get("total_tokens", 0) for record in spans)
@@ -0,0 +1,108 @@
+import numpy as np
+
+from utils.value_metrics import MAX_RISK_SCORE, VALUE_TEAMS
+
+# Percentiles reported for hours saved and error risk
+PERCENTILES = (50, 90, 99)
+# Leases at or above this error-risk score count as high risk
+HIGH_RISK_SCORE = 7
+
+
+class PortfolioMetrics:
+    """
+    Value metrics of many analyzed leases held as NumPy arrays.
+
+    Built once from batch records or lease store rows; summary() computes
+    totals, percentiles and per-team breakdowns in a single vectorized pass,
+    so tens of thousands of leases roll up without another LLM call.
+    """
+
+    def __init__(self, lease_ids, hours, risk, weights):
+        self.lease_ids = list(lease_ids)
+        self.hours = np.asarray(hours, dtype=float).reshape(-1)
+        self.risk = np.asarray(risk, dtype=float).reshape(-1)
+        self.weights = np.asarray(weights, dtype=float).reshape(-1, len(VALUE_TEAMS))
+
+    def __len__(self):
+        return len(self.lease_ids)
+
+    @classmethod
+    def from_results(cls, results):
+        """
+        Build from (lease id, analysis result) pairs; results without value metrics are skipped.
+
+        Args:
+            results (iterable): (lease_id, dict) pairs, e.g. batch JSONL records keyed by path
+        """
+        lease_ids, rows = [], []
+        for lease_id, result in results:
+            metrics = result.get("value_metrics")
+            if not metrics:
+                continue
+            lease_ids.append(lease_id)
+            rows.append(
+                [metrics["hours_saved_per_year"], metrics["error_risk_score"]]
+                + [metrics["team_weights"].get(key, 0.0) for key, _ in VALUE_TEAMS]
+            )
+        return cls._from_matrix(lease_ids, rows)
+
+    @classmethod
+    def from_store(cls, store):
+        """Build from every lease in a LeaseStore that has value metrics."""
+        rows = store.value_rows()
+        return cls._from_matrix([row[0] for row in rows], [row[1:] for row in rows])
+
+    @classmethod
+    def _from_matrix(cls, lease_ids, rows):
+        # Columns: hours, risk, then one weight per team; missing weights count as 0
+        matrix = np.array(rows, dtype=float).reshape(-1, 2 + len(VALUE_TEAMS))
+        matrix[:, 2:] = np.nan_to_num(matrix[:, 2:])
+        return cls(lease_ids, matrix[:, 0], matrix[:, 1], matrix[:, 2:])
+
+    def summary(self, percentiles=PERCENTILES, top=10):
+        """
+        Roll the portfolio up.
+
+        Args:
+            percentiles (tuple): Percentiles of hours saved and error risk to report
+            top (int): Number of highest-value leases to list
+
+        Returns:
+            dict: Lease count, totals, means and percentiles, high-risk count,
+                per-team hours/share/lead counts and the top leases by hours saved
+        """
+        count = len(self)
+        if not count:
+            return {"leases": 0, "total_hours_saved_per_year": 0.0, "teams": [], "top_leases": []}
+        # Each lease's hours are split across teams by its weights: (n, teams) -> (teams,)
+        team_hours = self.hours @ self.weights
+        # Risk-weighted hours: the same split, counting each hour by how much risk it removes
+        team_risk_hours = (self.hours * self.risk / MAX_RISK_SCORE) @ self.weights
+        leading = np.bincount(self.weights.argmax(axis=1), minlength=len(VALUE_TEAMS))
+        total_hours = float(self.hours.sum())
+        hour_percentiles = np.percentile(self.hours, percentiles)
+        risk_percentiles = np.percentile(self.risk, percentiles)
+        order = np.argsort(-self.hours, kind="stable")[:top]
+        return {
+            "leases": count,
+            "total_hours_saved_per_year": round(total_hours, 1),
+            "mean_hours_saved_per_year": round(float(self.hours.mean()), 1),
+            "hours_percentiles": {f"p{p}": round(float(v), 1) for p, v in zip(percentiles, hour_percentiles)},
+            "mean_error_risk_score": round(float(self.risk.mean()), 2),
+            "risk_percentiles": {f"p{p}": round(float(v), 2) for p, v in zip(percentiles, risk_percentiles)},
+            "high_risk_leases": int((self.risk >= HIGH_RISK_SCORE).sum()),
+            "teams": [
+                {
+                    "team": label,
+                    "hours_saved_per_year": round(float(team_hours[i]), 1),
+                    "share": round(float(team_hours[i] / total_hours), 4) if total_hours else 0.0,
+                    "risk_weighted_hours": round(float(team_risk_hours[i]), 1),
+                    "leases_led": int(leading[i]),
+                }
+                for i, (_, label) in enumerate(VALUE_TEAMS)
+            ],
+            "top_leases": [
+                {"lease_id": self.lease_ids[i], "hours_saved_per_year": round(float(self.hours[i]), 1), "error_risk_score": float(self.risk[i])}
+                for i in order
+            ],
+        }
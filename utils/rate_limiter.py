@@ -0,0 +1,247 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dotenv import load_dotenv
+
+from utils.metrics import incr, log_event, observe
+
+# Load environment variables
+load_dotenv()
+
+# Quota ceilings; 0 disables the corresponding bucket
+REQUESTS_PER_MINUTE = float(os.getenv("GEMINI_RPM", "0"))
+TOKENS_PER_MINUTE = float(os.getenv("GEMINI_TPM", "0"))
+# Seconds of quota that may be spent in one burst; small values pace requests evenly
+BURST_SECONDS = float(os.getenv("GEMINI_BURST_SECONDS", "1"))
+# Output tokens assumed per request until the response reports its real usage
+EXPECTED_OUTPUT_TOKENS = int(os.getenv("GEMINI_EXPECTED_OUTPUT_TOKENS", "800"))
+
+# AIMD concurrency control
+RATE_LIMITER_ENABLED = os.getenv("CRE_RATE_LIMITER", "1") != "0"
+INITIAL_CONCURRENCY = float(os.getenv("GEMINI_INITIAL_CONCURRENCY", os.getenv("GEMINI_POOL_SIZE", "10")))
+MIN_CONCURRENCY = float(os.getenv("GEMINI_MIN_CONCURRENCY", "1"))
+MAX_CONCURRENCY = float(os.getenv("GEMINI_MAX_CONCURRENCY", "64"))
+DECREASE_FACTOR = float(os.getenv("GEMINI_AIMD_DECREASE", "0.5"))
+# A response slower per token than this multiple of the smoothed seconds/token counts as congestion; 0 disables
+LATENCY_SPIKE_FACTOR = float(os.getenv("GEMINI_LATENCY_SPIKE_FACTOR", "3"))
+
+# Backend name -> its RateLimiter; each provider has its own quotas and congestion
+_limiters = {}
+_limiter_lock = threading.Lock()
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled continuously at `per_minute / 60` per second.
+
+    The balance may go negative when a request turns out to cost more than
+    was reserved; later callers then wait for the debt to be repaid.
+    """
+
+    def __init__(self, per_minute, burst_seconds=BURST_SECONDS):
+        self.rate = per_minute / 60.0
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, amount=1.0):
+        """Block until `amount` tokens are available, take them, and return the seconds waited."""
+        # A request larger than the burst size is admitted once the bucket is full and
+        # still charged in full: the negative balance makes later callers wait it off
+        needed = min(amount, self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= needed:
+                    self.tokens -= amount
+                    return waited
+                delay = (needed - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def adjust(self, amount):
+        """Charge (positive) or refund (negative) tokens after the fact."""
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens - amount)
+
+
+class AIMDConcurrency:
+    """
+    Concurrency limit that grows by about one slot per round of successful
+    requests and is cut multiplicatively on throttling or latency spikes.
+
+    Throttling is a 429 or 5xx answer. Response time grows with prompt and
+    output length, so latency spikes are judged per token: a request is a
+    spike when its seconds per estimated token exceed `spike_factor` times
+    the smoothed value. Cuts are applied at most once per smoothed round-trip,
+    so a burst of 429s from the same overloaded moment halves the limit once, not N times.
+    """
+
+    def __init__(self, initial=INITIAL_CONCURRENCY, minimum=MIN_CONCURRENCY, maximum=MAX_CONCURRENCY, decrease=DECREASE_FACTOR, spike_factor=LATENCY_SPIKE_FACTOR):
+        self.limit = min(max(initial, minimum), maximum)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.decrease = decrease
+        self.spike_factor = spike_factor
+        self.in_flight = 0
+        self.latency = None
+        self.token_latency = None  # smoothed seconds per estimated token
+        self._last_cut = 0.0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        """Block until a slot is free; return the seconds waited."""
+        started = time.monotonic()
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+        return time.monotonic() - started
+
+    def release(self, latency, throttled=False, tokens=0):
+        """
+        Free a slot and adapt the limit to the outcome of the request that held it.
+
+        Args:
+            latency (float): Seconds the request held the slot
+            throttled (bool): The request was answered with 429 or 5xx
+            tokens (int): Its estimated tokens; requests without an estimate are never spikes
+        """
+        with self._condition:
+            self.in_flight -= 1
+            per_token = latency / tokens if tokens else None
+            spike = (
+                not throttled and self.spike_factor and per_token is not None
+                and self.token_latency is not None
+                and per_token > self.spike_factor * self.token_latency
+            )
+            if throttled or spike:
+                now = time.monotonic()
+                if now - self._last_cut >= (self.latency or 0.0):
+                    self._last_cut = now
+                    self.limit = max(self.minimum, self.limit * self.decrease)
+                    log_event("ratelimit.decrease", limit=round(self.limit, 2), reason="throttled" if throttled else "latency")
+            else:
+                self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+            if not throttled:
+                # Spikes are folded in slowly so one outlier does not reset the baseline
+                weight = 0.05 if spike else 0.2
+                self.latency = latency if self.latency is None else (1 - weight) * self.latency + weight * latency
+                if per_token is not None:
+                    self.token_latency = per_token if self.token_latency is None else (1 - weight) * self.token_latency + weight * per_token
+            observe("ratelimit.concurrency_limit", self.limit)
+            self._condition.notify_all()
+
+
+class RateLimiter:
+    """
+    Admission control in front of one backend's requests.
+
+    Every request attempt takes a concurrency slot, one request from the
+    requests/min bucket and its estimated tokens from the tokens/min bucket;
+    the token estimate is corrected once the response reports real usage.
+    """
+
+    def __init__(self, rpm=REQUESTS_PER_MINUTE, tpm=TOKENS_PER_MINUTE, concurrency=None):
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self.concurrency = concurrency or AIMDConcurrency()
+
+    @contextmanager
+    def slot(self, estimated_tokens=0):
+        """
+        Hold admission for one request attempt.
+
+        The yielded dict's "throttled" key should be set when the attempt was
+        answered with 429 or 5xx; the elapsed time per estimated token is used
+        to detect latency spikes.
+        """
+        waited = self.concurrency.acquire()
+        if self.requests is not None:
+            waited += self.requests.acquire(1)
+        if self.tokens is not None and estimated_tokens:
+            waited += self.tokens.acquire(estimated_tokens)
+        if waited:
+            observe("ratelimit.wait_seconds", waited)
+        outcome = {"throttled": False, "waited_s": waited}
+        started = time.monotonic()
+        try:
+            yield outcome
+        finally:
+            if outcome["throttled"]:
+                incr("ratelimit.throttled")
+                # A rejected attempt consumed no quota tokens; its retry reserves them again
+                if self.tokens is not None and estimated_tokens:
+                    self.tokens.adjust(-estimated_tokens)
+            self.concurrency.release(time.monotonic() - started, outcome["throttled"], estimated_tokens)
+
+    def settle(self, estimated_tokens, actual_tokens):
+        """Charge or refund the difference between a request's reserved and reported tokens."""
+        if self.tokens is not None and actual_tokens:
+            self.tokens.adjust(actual_tokens - estimated_tokens)
+
+    def stats(self):
+        return {
+            "concurrency_limit": round(self.concurrency.limit, 2),
+            "in_flight": self.concurrency.in_flight,
+            "smoothed_latency_s": self.concurrency.latency,
+        }
+
+
+def estimate_request_tokens(body_bytes):
+    """Tokens to reserve for a request: its prompt (about 4 bytes per token) plus the expected output."""
+    return body_bytes // 4 + EXPECTED_OUTPUT_TOKENS
+
+
+def _backend_quota(backend, name, default):
+    # Gemini reads GEMINI_RPM/GEMINI_TPM; other backends e.g. OPENAI_RPM, COHERE_TPM
+    return float(os.getenv(f"{backend.upper()}_{name}", "0")) if backend != "gemini" else default
+
+
+def get_rate_limiter(backend="gemini"):
+    """
+    Return the process-wide limiter for `backend`, or None when CRE_RATE_LIMITER=0.
+
+    Args:
+        backend (str): Provider name ("gemini", "openai", "cohere"); each gets its own
+            quotas and concurrency limit, so one provider's 429s never slow another
+    """
+    if not RATE_LIMITER_ENABLED:
+        return None
+    limiter = _limiters.get(backend)
+    if limiter is None:
+        with _limiter_lock:
+            limiter = _limiters.get(backend)
+            if limiter is None:
+                limiter = _limiters[backend] = RateLimiter(
+                    _backend_quota(backend, "RPM", REQUESTS_PER_MINUTE),
+                    _backend_quota(backend, "TPM", TOKENS_PER_MINUTE),
+                )
+    return limiter
+
+
+def configure(rpm=None, tpm=None, initial_concurrency=None, max_concurrency=None, backend="gemini"):
+    """
+    Replace one backend's limiter with one using the given quotas (e.g. from batch flags).
+
+    Arguments left as None keep their environment defaults.
+    """
+    with _limiter_lock:
+        limiter = _limiters[backend] = RateLimiter(
+            _backend_quota(backend, "RPM", REQUESTS_PER_MINUTE) if rpm is None else rpm,
+            _backend_quota(backend, "TPM", TOKENS_PER_MINUTE) if tpm is None else tpm,
+            AIMDConcurrency(
+                INITIAL_CONCURRENCY if initial_concurrency is None else initial_concurrency,
+                maximum=MAX_CONCURRENCY if max_concurrency is None else max_concurrency,
+            ),
+        )
+    return limiter
@@ -0,0 +1,169 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from dotenv import load_dotenv
+
+from utils.metrics import incr
+
+# Load environment variables
+load_dotenv()
+
+# Cache settings
+CACHE_ENABLED = os.getenv("CRE_CACHE_ENABLED", "1") != "0"
+CACHE_DIR = os.getenv("CRE_CACHE_DIR", ".cre_cache")
+CACHE_MAX_BYTES = int(float(os.getenv("CRE_CACHE_MAX_MB", "256")) * 1024 * 1024)
+CACHE_TTL = float(os.getenv("CRE_CACHE_TTL", "0")) or None  # seconds; unset or 0 means no expiry
+
+
+def make_cache_key(model, generation_config, prompt):
+    """Content-address a request by model name, generation config and exact prompt text."""
+    material = json.dumps(
+        {"model": model, "generation_config": generation_config or {}, "prompt": prompt},
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Persistent on-disk LLM response cache with size-bounded LRU eviction.
+
+    Each entry is a small JSON file named by its content hash. File mtimes
+    track recency: a hit touches the file, and eviction removes the
+    least recently used files until the directory fits in `max_bytes`.
+    """
+
+    def __init__(self, directory=CACHE_DIR, max_bytes=CACHE_MAX_BYTES, ttl=CACHE_TTL):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._index = None  # key -> (size, mtime), loaded lazily from disk
+        self._total_bytes = 0
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def _load_index(self):
+        if self._index is not None:
+            return
+        self._index = {}
+        self._total_bytes = 0
+        if not os.path.isdir(self.directory):
+            return
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith(".json"):
+                    continue
+                stat = os.stat(os.path.join(root, name))
+                self._index[name[:-5]] = (stat.st_size, stat.st_mtime)
+                self._total_bytes += stat.st_size
+
+    def _remove(self, key):
+        size, _ = self._index.pop(key, (0, 0))
+        self._total_bytes -= size
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def get(self, key):
+        """Return the cached response text for `key`, or None on a miss or expired entry."""
+        with self._lock:
+            self._load_index()
+            path = self._path(key)
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    entry = json.load(f)
+            except (FileNotFoundError, ValueError):
+                if key in self._index:
+                    self._remove(key)
+                self.misses += 1
+                incr("cache.misses")
+                return None
+            if self.ttl is not None and time.time() - entry.get("created", 0) > self.ttl:
+                self._remove(key)
+                self.misses += 1
+                incr("cache.misses")
+                return None
+            now = time.time()
+            os.utime(path, (now, now))
+            size = self._index.get(key, (os.path.getsize(path), now))[0]
+            self._index[key] = (size, now)
+            self.hits += 1
+            incr("cache.hits")
+            return entry["response"]
+
+    def __contains__(self, key):
+        """Whether an entry exists for `key` (without counting a hit or refreshing its recency)."""
+        return os.path.exists(self._path(key))
+
+    def set(self, key, response, model=None):
+        """Store a response and evict least recently used entries beyond `max_bytes`."""
+        with self._lock:
+            self._load_index()
+            path = self._path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"created": time.time(), "model": model, "response": response}, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+            if key in self._index:
+                self._total_bytes -= self._index[key][0]
+            size = os.path.getsize(path)
+            self._index[key] = (size, time.time())
+            self._total_bytes += size
+            self._evict()
+
+    def _evict(self):
+        if self._total_bytes <= self.max_bytes:
+            return
+        for key, _ in sorted(self._index.items(), key=lambda item: item[1][1]):
+            if self._total_bytes <= self.max_bytes:
+                break
+            self._remove(key)
+            self.evictions += 1
+            incr("cache.evictions")
+
+    def clear(self):
+        """Delete every cached entry and reset the counters."""
+        with self._lock:
+            self._load_index()
+            for key in list(self._index):
+                self._remove(key)
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        """Return hit/miss/eviction counters and current size."""
+        with self._lock:
+            self._load_index()
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._index),
+                "bytes": self._total_bytes,
+            }
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_default_cache():
+    """Return the process-wide response cache, or None when caching is disabled."""
+    global _default_cache
+    if not CACHE_ENABLED:
+        return None
+    if _default_cache is None:
+        with _default_cache_lock:
+            if _default_cache is None:
+                _default_cache = ResponseCache()
+    return _default_cache
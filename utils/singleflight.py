@@ -0,0 +1,83 @@
+import threading
+
+from utils.metrics import incr
+
+
+class _Call:
+    """One in-flight call and the result its waiters will share."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent identical calls: the first caller for a key runs the
+    call, later callers for the same key block until it finishes and share
+    its result instead of making their own.
+
+    Nothing is remembered once a call completes; the response cache covers
+    repeats that are not concurrent.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def begin(self, key):
+        """
+        Join or start the call for `key`.
+
+        Returns:
+            tuple: (call, leader) where leader is True if the caller must run
+                the call and then pass the result to finish()
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                return call, False
+            call = self._calls[key] = _Call()
+            return call, True
+
+    def finish(self, key, call, value):
+        """Publish the leader's result (None if it did not complete) and wake the waiters."""
+        with self._lock:
+            if self._calls.get(key) is call:
+                del self._calls[key]
+        call.value = value
+        call.done.set()
+        if call.waiters:
+            incr("singleflight.shared", call.waiters)
+
+    def wait(self, call):
+        """Block until the leader finishes; return its result, or None if it gave up."""
+        call.done.wait()
+        return call.value
+
+    def do(self, key, fn):
+        """
+        Run `fn()` once for all concurrent callers with the same key.
+
+        Returns:
+            tuple: (result, shared) where shared is True if another caller's
+                result was reused; a follower whose leader did not complete
+                runs `fn()` itself
+        """
+        call, leader = self.begin(key)
+        if not leader:
+            value = self.wait(call)
+            if value is not None:
+                return value, True
+            return fn(), False
+        value = None
+        try:
+            value = fn()
+            return value, False
+        finally:
+            self.finish(key, call, value)
+
+    def __len__(self):
+        return len(self._calls)
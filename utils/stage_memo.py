@@ -0,0 +1,89 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+# Maximum number of memoized stage results kept per server process
+MEMO_MAX_ENTRIES = int(os.getenv("CRE_UI_MEMO_ENTRIES", "256"))
+
+
+def content_hash(data):
+    """SHA-256 of an uploaded file's bytes or of prompt/document text."""
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+
+class StageMemo:
+    """
+    Thread-safe, bounded LRU of per-stage results keyed by (stage, content hash).
+
+    One instance is shared by every Streamlit session in the server process,
+    so an identical upload or prompt is only analyzed once.
+    """
+
+    def __init__(self, max_entries=MEMO_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, stage, key):
+        with self._lock:
+            value = self._entries.get((stage, key))
+            if value is not None:
+                self._entries.move_to_end((stage, key))
+            return value
+
+    def put(self, stage, key, value):
+        with self._lock:
+            self._entries[(stage, key)] = value
+            self._entries.move_to_end((stage, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        """Drop every stage result stored for one document or prompt hash."""
+        with self._lock:
+            for entry in [entry for entry in self._entries if entry[1] == key]:
+                del self._entries[entry]
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def _is_error(value):
+    # Stages returning (text, extras) fail when their text does
+    if isinstance(value, tuple) and value:
+        value = value[0]
+    return isinstance(value, str) and value.startswith("Error:")
+
+
+def memoized(memo, stage, key, compute):
+    """Return the memoized result for (stage, key), computing and storing it on a miss."""
+    value = memo.get(stage, key)
+    if value is None:
+        value = compute()
+        if not _is_error(value):
+            memo.put(stage, key, value)
+    return value
+
+
+def memoized_stream(memo, stage, key, stream):
+    """
+    Yield a memoized stage result as a single chunk, or pass through a live stream.
+
+    `stream` is a zero-argument callable returning an iterator of text chunks;
+    it is only called on a miss, and the joined text is stored once the stream
+    completes without an error.
+    """
+    value = memo.get(stage, key)
+    if value is not None:
+        yield value
+        return
+    chunks = []
+    for chunk in stream():
+        chunks.append(chunk)
+        yield chunk
+    text = "".join(chunks)
+    if text and not _is_error(text):
+        memo.put(stage, key, text)
@@ -0,0 +1,100 @@
+import json
+
+# Teams the value stage splits the benefit across: (key, label)
+VALUE_TEAMS = [
+    ("leasing", "Leasing"),
+    ("legal", "Legal"),
+    ("finance", "Finance and Accounting"),
+    ("property_management", "Property Management"),
+    ("operations", "Operations and IT"),
+]
+# Scale of error_risk_score: 0 (nothing to go wrong) to MAX_RISK_SCORE (a costly miss is likely without automation)
+MAX_RISK_SCORE = 10
+
+VALUE_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "hours_saved_per_year": {"type": "NUMBER", "description": "Staff hours saved per year by the workflow"},
+        "error_risk_score": {"type": "NUMBER", "description": f"0-{MAX_RISK_SCORE}: risk of a costly error (missed deadline, billing mistake) the workflow avoids"},
+        "risk_avoided": {"type": "STRING", "description": "One sentence naming the risks or errors avoided"},
+        "team_weights": {
+            "type": "OBJECT",
+            "description": "Share of the benefit per team, summing to 1",
+            "properties": {key: {"type": "NUMBER"} for key, _ in VALUE_TEAMS},
+            "required": [key for key, _ in VALUE_TEAMS],
+        },
+    },
+    "required": ["hours_saved_per_year", "error_risk_score", "risk_avoided", "team_weights"],
+}
+
+VALUE_CONFIG = {
+    "responseMimeType": "application/json",
+    "responseSchema": VALUE_SCHEMA,
+}
+
+VALUE_INSTRUCTIONS = f"""Respond with a JSON object:
+    - hours_saved_per_year: staff hours saved per year by automating the manual tasks (a number)
+    - error_risk_score: 0-{MAX_RISK_SCORE}, how likely a costly error (missed deadline, billing mistake) is without the workflow
+    - risk_avoided: one sentence naming the risks or errors avoided
+    - team_weights: the share of the benefit for each of {", ".join(key for key, _ in VALUE_TEAMS)}, summing to 1"""
+
+
+def _number(value, name):
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"value field '{name}' is not a number")
+    return float(value)
+
+
+def normalize_value_metrics(data):
+    """
+    Validate a structured value estimate and bring it into range: hours are
+    non-negative, the risk score is clamped to 0-MAX_RISK_SCORE and team
+    weights are rescaled to sum to 1 (an all-zero split becomes an even one).
+
+    Raises:
+        ValueError: if `data` does not match VALUE_SCHEMA
+    """
+    if not isinstance(data, dict):
+        raise ValueError("value estimate is not an object")
+    weights = data.get("team_weights")
+    if not isinstance(weights, dict):
+        raise ValueError("value estimate has no team weights")
+    shares = [max(0.0, _number(weights.get(key), f"team_weights.{key}")) for key, _ in VALUE_TEAMS]
+    total = sum(shares)
+    shares = [share / total for share in shares] if total else [1 / len(VALUE_TEAMS)] * len(VALUE_TEAMS)
+    risk_avoided = data.get("risk_avoided")
+    return {
+        "hours_saved_per_year": max(0.0, _number(data.get("hours_saved_per_year"), "hours_saved_per_year")),
+        "error_risk_score": min(float(MAX_RISK_SCORE), max(0.0, _number(data.get("error_risk_score"), "error_risk_score"))),
+        "risk_avoided": risk_avoided.strip() if isinstance(risk_avoided, str) else "",
+        "team_weights": {key: round(share, 4) for (key, _), share in zip(VALUE_TEAMS, shares)},
+    }
+
+
+def format_value(metrics):
+    """Render value metrics as the three bullet points the value stage used to return as free text."""
+    teams = sorted(VALUE_TEAMS, key=lambda team: -metrics["team_weights"][team[0]])
+    split = ", ".join(f"{label} {metrics['team_weights'][key]:.0%}" for key, label in teams if metrics["team_weights"][key] > 0)
+    risk = f"{metrics['error_risk_score']:g}/{MAX_RISK_SCORE}"
+    return "\n".join([
+        f"- Hours saved per year: {metrics['hours_saved_per_year']:,.0f}",
+        f"- Error risk avoided ({risk}): {metrics['risk_avoided'] or 'not stated'}",
+        f"- Teams benefiting: {split}",
+    ])
+
+
+def parse_value(response_text):
+    """
+    Turn a VALUE_CONFIG response into (value text, metrics).
+
+    An "Error: ..." response is passed through with no metrics; a response
+    that is not valid against the schema becomes an "Error: ..." string, so
+    callers treat it like any other failed stage.
+    """
+    if response_text.startswith("Error:"):
+        return response_text, None
+    try:
+        metrics = normalize_value_metrics(json.loads(response_text))
+    except ValueError as e:
+        return f"Error: invalid value estimate ({e})", None
+    return format_value(metrics), metrics
@@ -1,14 +1,28 @@
 import streamlit as st
 import re
 import os
-import base64
-from io import BytesIO
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from utils.metrics import span
+from utils.stage_memo import StageMemo, content_hash
 try:
     import graphviz
     GRAPHVIZ_AVAILABLE = True
 except ImportError:
     GRAPHVIZ_AVAILABLE = False
 
+TOOLS = ["Salesforce", "DocuSign", "Google Drive", "Slack", "Email"]
+
+# Rendered diagrams keyed by workflow-text hash; entries are ("svg" | "html", markup)
+DIAGRAM_CACHE_ENTRIES = int(os.getenv("CRE_DIAGRAM_CACHE_ENTRIES", "128"))
+_diagram_cache = StageMemo(max_entries=DIAGRAM_CACHE_ENTRIES)
+
+@lru_cache(maxsize=1)
+def graphviz_available():
+    """Whether the graphviz package and the `dot` binary are both present (checked once per process)."""
+    return GRAPHVIZ_AVAILABLE and shutil.which("dot") is not None
+
 def extract_intro_and_steps(workflow_text):
     """
     Extract the intro/summary sentence and actual numbered steps from the workflow text.
@@ -26,10 +40,10 @@ def extract_intro_and_steps(workflow_text):
             intro = line
     return intro, steps
 
-def create_text_based_diagram(workflow_text):
-    intro, steps = extract_intro_and_steps(workflow_text)
+def create_text_based_diagram(workflow_text, parsed=None):
+    intro, steps = parsed or extract_intro_and_steps(workflow_text)
     # Assign steps to systems
-    tools = ["Salesforce", "DocuSign", "Google Drive", "Slack", "Email"]
+    tools = TOOLS
     system_steps = {tool: [] for tool in tools}
     for i, step in enumerate(steps):
         assigned = False
@@ -76,8 +90,113 @@ def create_text_based_diagram(workflow_text):
     html += '</div>'
     return intro, html
 
+def build_workflow_svg(steps):
+    """Build the swimlane diagram for parsed workflow steps and render it to SVG with Graphviz."""
+    dot = graphviz.Digraph()
+    dot.attr(rankdir="LR", size="16,8", dpi="100", ranksep="0.5", nodesep="0.5")
+    tools = TOOLS
+    tool_subgraphs = {}
+    for i, tool in enumerate(tools):
+        sg = graphviz.Digraph(name=f"cluster_{tool}")
+        sg.attr(label=tool, style="filled", fillcolor=f"lightblue{(i % 2) + 1}", fontsize="14", fontcolor="black", penwidth="2", fontname="Arial")
+        tool_subgraphs[tool.lower()] = sg
+    node_placements = {}
+    nodes = []
+    for i, step in enumerate(steps):
+        match = re.search(r"(\d+\.\s*)(.*)", step)
+        if match:
+            step_number = match.group(1).strip()
+            step_title = match.group(2).strip()
+        else:
+            step_number = f"{i+1}."
+            step_title = step[:30] + "..." if len(step) > 30 else step
+        if len(step_title) > 25:
+            step_title = step_title[:22] + "..."
+        assigned_tool = None
+        for tool in tools:
+            if tool.lower() in step.lower():
+                assigned_tool = tool.lower()
+                break
+        if assigned_tool is None:
+            assigned_tool = tools[i % len(tools)].lower()
+        node_id = f"step_{i}"
+        label = f"{step_number} {step_title}"
+        nodes.append((node_id, assigned_tool, i, label))
+        node_placements[node_id] = assigned_tool
+    for swimlane in tool_subgraphs:
+        swimlane_nodes = [n for n in nodes if n[1] == swimlane]
+        if not swimlane_nodes:
+            phantom_id = f"phantom_{swimlane}"
+            tool_subgraphs[swimlane].node(phantom_id, label="", shape="none", width="0", height="0", style="invis")
+        for node_id, _, step_num, label in swimlane_nodes:
+            tool_subgraphs[swimlane].node(
+                node_id, 
+                label=label, 
+                shape="box", 
+                style="filled", 
+                fillcolor="#ffffcc", 
+                fontsize="12",
+                fontname="Arial",
+                margin="0.15",
+                color="black",
+                penwidth="1.5"
+            )
+    for sg in tool_subgraphs.values():
+        dot.subgraph(sg)
+    for i in range(len(nodes) - 1):
+        current_node = nodes[i][0]
+        next_node = nodes[i + 1][0]
+        if node_placements[current_node] != node_placements[next_node]:
+            dot.edge(current_node, next_node, color="blue", penwidth="1.5", style="dashed")
+        else:
+            dot.edge(current_node, next_node, color="black", penwidth="1.5")
+    return dot.pipe(format="svg").decode("utf-8")
+
+def render_diagram(workflow_text, parsed=None):
+    """
+    Return ("svg", markup) or ("html", markup) for a workflow, cached by text hash.
+
+    Graphviz output is used when the `dot` binary is available; otherwise, or if
+    Graphviz fails, the HTML swimlane fallback is returned. Either way repeated
+    renders of the same workflow text reuse the cached markup.
+    """
+    with span("diagram.render") as record:
+        key = content_hash(workflow_text)
+        cached = _diagram_cache.get("diagram", key)
+        record["cache_hit"] = cached is not None
+        if cached is not None:
+            record["kind"] = cached[0]
+            return cached
+        intro, steps = parsed or extract_intro_and_steps(workflow_text)
+        diagram = None
+        if graphviz_available():
+            try:
+                diagram = ("svg", build_workflow_svg(steps))
+            except Exception as e:
+                record["graphviz_error"] = str(e)
+        if diagram is None:
+            diagram = ("html", create_text_based_diagram(workflow_text, (intro, steps))[1])
+        record["kind"] = diagram[0]
+        record["output_chars"] = len(diagram[1])
+        _diagram_cache.put("diagram", key, diagram)
+        return diagram
+
+def prerender_workflows(workflow_texts, max_workers=None):
+    """
+    Render many workflow diagrams in parallel, warming the diagram cache.
+
+    Graphviz work happens in `dot` subprocesses, so a thread pool is enough
+    to keep several renders in flight.
+
+    Returns:
+        list[tuple]: One ("svg" | "html", markup) pair per input, in input order
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(render_diagram, workflow_texts))
+
 def render_workflow(workflow_text):
-    intro, steps = extract_intro_and_steps(workflow_text)
+    parsed = extract_intro_and_steps(workflow_text)
+    intro = parsed[0]
     # Show the intro/summary sentence above the diagram if it exists
     if intro:
         st.info(intro)
@@ -85,79 +204,18 @@ def render_workflow(workflow_text):
         st.code(workflow_text)
     st.write("##### Swimlane Workflow Diagram")
     try:
-        if GRAPHVIZ_AVAILABLE and os.system("which dot") == 0:
-            dot = graphviz.Digraph()
-            dot.attr(rankdir="LR", size="16,8", dpi="100", ranksep="0.5", nodesep="0.5")
-            tools = ["Salesforce", "DocuSign", "Google Drive", "Slack", "Email"]
-            tool_subgraphs = {}
-            for i, tool in enumerate(tools):
-                sg = graphviz.Digraph(name=f"cluster_{tool}")
-                sg.attr(label=tool, style="filled", fillcolor=f"lightblue{(i % 2) + 1}", fontsize="14", fontcolor="black", penwidth="2", fontname="Arial")
-                tool_subgraphs[tool.lower()] = sg
-            node_placements = {}
-            nodes = []
-            for i, step in enumerate(steps):
-                match = re.search(r"(\d+\.\s*)(.*)", step)
-                if match:
-                    step_number = match.group(1).strip()
-                    step_title = match.group(2).strip()
-                else:
-                    step_number = f"{i+1}."
-                    step_title = step[:30] + "..." if len(step) > 30 else step
-                if len(step_title) > 25:
-                    step_title = step_title[:22] + "..."
-                assigned_tool = None
-                for tool in tools:
-                    if tool.lower() in step.lower():
-                        assigned_tool = tool.lower()
-                        break
-                if assigned_tool is None:
-                    assigned_tool = tools[i % len(tools)].lower()
-                node_id = f"step_{i}"
-                label = f"{step_number} {step_title}"
-                nodes.append((node_id, assigned_tool, i, label))
-                node_placements[node_id] = assigned_tool
-            for swimlane in tool_subgraphs:
-                swimlane_nodes = [n for n in nodes if n[1] == swimlane]
-                if not swimlane_nodes:
-                    phantom_id = f"phantom_{swimlane}"
-                    tool_subgraphs[swimlane].node(phantom_id, label="", shape="none", width="0", height="0", style="invis")
-                for node_id, _, step_num, label in swimlane_nodes:
-                    tool_subgraphs[swimlane].node(
-                        node_id, 
-                        label=label, 
-                        shape="box", 
-                        style="filled", 
-                        fillcolor="#ffffcc", 
-                        fontsize="12",
-                        fontname="Arial",
-                        margin="0.15",
-                        color="black",
-                        penwidth="1.5"
-                    )
-            for sg in tool_subgraphs.values():
-                dot.subgraph(sg)
-            for i in range(len(nodes) - 1):
-                current_node = nodes[i][0]
-                next_node = nodes[i + 1][0]
-                if node_placements[current_node] != node_placements[next_node]:
-                    dot.edge(current_node, next_node, color="blue", penwidth="1.5", style="dashed")
-                else:
-                    dot.edge(current_node, next_node, color="black", penwidth="1.5")
-            container = st.container()
-            with container:
-                svg_data = dot.pipe(format="svg").decode("utf-8")
-                st.components.v1.html(
-                    f'<div style="height: 600px; width: 100%; overflow: auto; background-color: white;">{svg_data}</div>',
-                    height=650,
-                    scrolling=True
-                )
-        else:
-            intro, html_diagram = create_text_based_diagram(workflow_text)
-            st.components.v1.html(html_diagram, height=500, scrolling=True)
-            st.info("Note: For a more detailed visualization, install Graphviz system binaries: `brew install graphviz` (macOS) or `apt-get install graphviz` (Linux)")
+        kind, markup = render_diagram(workflow_text, parsed)
     except Exception as e:
         st.error(f"Error creating diagram: {str(e)}")
-        intro, html_diagram = create_text_based_diagram(workflow_text)
-        st.components.v1.html(html_diagram, height=500, scrolling=True)
-        st.info("For a more detailed visualization, install Graphviz: `brew install graphviz` (macOS) or `apt-get install graphviz` (Linux)")
+        kind, markup = "html", create_text_based_diagram(workflow_text, parsed)[1]
+    if kind == "svg":
+        container = st.container()
+        with container:
+            st.components.v1.html(
+                f'<div style="height: 600px; width: 100%; overflow: auto; background-color: white;">{markup}</div>',
+                height=650,
+                scrolling=True
+            )
+    else:
+        st.components.v1.html(markup, height=500, scrolling=True)
+        st.info("Note: For a more detailed visualization, install Graphviz system binaries: `brew install graphviz` (macOS) or `apt-get install graphviz` (Linux)")